@@ -1,8 +1,16 @@
 import streamlit as st
 from nodes import run_query_direct, create_agent_executor
 from PIL import Image
+from artifacts import set_artifact_render
 
-agent_executor = create_agent_executor()
+# Cette interface n'affiche pas les cartes : elles sont écrites dès la réponse du tool
+set_artifact_render("eager")
+
+# Agent construit une seule fois par session, à la première requête qui en a besoin
+def get_agent_executor():
+    if "agent_executor" not in st.session_state:
+        st.session_state.agent_executor = create_agent_executor()
+    return st.session_state.agent_executor
 
 logo = Image.open("metaplanet_sas_logo.jpeg")
 st.markdown("<div style='text-align: center;'>", unsafe_allow_html=True)
@@ -23,7 +31,7 @@ if st.button("🔍 Rechercher") and user_input:
             if is_satellite_query(user_input):
                 result = run_query_direct(user_input)
             else:
-                response = translate_query_and_response(user_input, agent_executor, translate)
+                response = translate_query_and_response(user_input, get_agent_executor(), translate)
                 result = response["output"]
 
                 if "output" in response:
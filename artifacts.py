@@ -0,0 +1,163 @@
+#artifacts.py
+# Stockage adressé par contenu des cartes et images générées : chaque fichier est nommé d'après un hash
+# de ses entrées (identifiant stable), réutilisé si les mêmes entrées reviennent, et évincé par âge/taille.
+# Rendu paresseux par défaut : l'identifiant est renvoyé tout de suite, le fichier n'est produit qu'à sa première lecture.
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+ARTIFACT_DIR = os.getenv("ARTIFACT_DIR", "artifacts")
+ARTIFACT_MAX_BYTES = int(os.getenv("ARTIFACT_MAX_BYTES", 500 * 1024 * 1024))
+ARTIFACT_MAX_AGE = float(os.getenv("ARTIFACT_MAX_AGE", 30 * 24 * 3600))  # 30 jours
+ARTIFACT_RENDER = os.getenv("ARTIFACT_RENDER", "lazy")  # "lazy" : rendu à la demande ; "eager" : rendu immédiat
+ARTIFACT_PENDING_MAX = 64  # rendus en attente gardés en mémoire (les plus anciens sont abandonnés)
+ARTIFACT_PENDING_MAX_BYTES = int(os.getenv("ARTIFACT_PENDING_MAX_BYTES", 128 * 1024 * 1024))  # données retenues par ces rendus
+
+_ID_PATTERN = re.compile(r"^[\w\-]+\.(?:html|png)$")
+_pending = OrderedDict()  # art_id -> (writer, octets retenus par writer)
+_pending_bytes = 0
+_pending_lock = threading.Lock()
+
+
+def artifact_id(kind, inputs, ext="html"):
+    """Identifiant stable `<kind>_<hash>.<ext>` ; `kind` reste lisible (ex. "incendies_tunis_2025-07-28")."""
+    digest = hashlib.sha1(json.dumps(inputs, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+    prefix = re.sub(r"[^\w\-]+", "_", kind).strip("_").lower()
+    return f"{prefix}_{digest[:12]}.{ext}"
+
+def artifact_path(art_id):
+    if not _ID_PATTERN.match(art_id):
+        raise ValueError(f"Identifiant d'artefact invalide : {art_id}")
+    return os.path.join(ARTIFACT_DIR, art_id)
+
+def resolve_artifact(art_id, render=True):
+    """
+    Chemin du fichier correspondant à l'identifiant, ou None s'il n'existe pas (ou plus).
+    Un artefact en attente de rendu est produit à ce moment-là, sauf si render=False.
+    """
+    if not _ID_PATTERN.match(art_id):
+        return None
+    path = artifact_path(art_id)
+    if os.path.exists(path):
+        return path
+    if render:
+        writer = _pop_pending(art_id)
+        if writer is not None:
+            save_artifact(art_id, writer)
+            return path
+    return None
+
+def is_pending(art_id):
+    """True si l'artefact a été déclaré mais pas encore rendu."""
+    with _pending_lock:
+        return art_id in _pending
+
+def has_artifact(art_id):
+    """True si l'artefact existe déjà ; son horodatage est rafraîchi (éviction LRU)."""
+    path = resolve_artifact(art_id, render=False)
+    if path is None:
+        return False
+    os.utime(path)
+    return True
+
+def save_artifact(art_id, writer):
+    """
+    Écrit l'artefact via `writer(chemin)` (ex. `folium_map.save`, `lambda p: plt.imsave(p, ...)`).
+    Écriture dans un fichier temporaire puis renommage : deux requêtes simultanées ne se marchent pas dessus.
+    """
+    path = artifact_path(art_id)
+    os.makedirs(ARTIFACT_DIR, exist_ok=True)
+    tmp_path = os.path.join(ARTIFACT_DIR, f".tmp-{uuid.uuid4().hex}-{art_id}")
+    try:
+        writer(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    evict_artifacts()
+    return art_id
+
+def set_artifact_render(policy):
+    """Change la politique de rendu ("lazy" ou "eager"), ex. en mode eager pour les appelants sans interface."""
+    global ARTIFACT_RENDER
+    if policy not in ("lazy", "eager"):
+        raise ValueError(f"Politique de rendu inconnue : {policy}")
+    ARTIFACT_RENDER = policy
+
+@contextmanager
+def artifact_output(directory):
+    """
+    Artefacts rendus immédiatement dans `directory` le temps du bloc (ex. un répertoire par site pour les traitements
+    par lots, dans un processus de pool) ; répertoire et politique de rendu sont rétablis à la sortie.
+    """
+    global ARTIFACT_DIR, ARTIFACT_RENDER
+    saved = ARTIFACT_DIR, ARTIFACT_RENDER
+    ARTIFACT_DIR, ARTIFACT_RENDER = directory, "eager"
+    try:
+        yield directory
+    finally:
+        ARTIFACT_DIR, ARTIFACT_RENDER = saved
+
+def _pop_pending(art_id):
+    global _pending_bytes
+    with _pending_lock:
+        writer, nbytes = _pending.pop(art_id, (None, 0))
+        _pending_bytes -= nbytes
+    return writer
+
+def defer_artifact(art_id, writer, nbytes=0):
+    """
+    Déclare un artefact sans le produire (politique ARTIFACT_RENDER="lazy") : `writer` n'est appelé
+    qu'à la première résolution de l'identifiant (ex. affichage Streamlit). En mode "eager", équivaut à save_artifact.
+    `nbytes` : taille des données retenues par `writer` ; la file d'attente est bornée en nombre
+    (ARTIFACT_PENDING_MAX) et en octets (ARTIFACT_PENDING_MAX_BYTES), les plus anciens rendus sont abandonnés.
+    """
+    global _pending_bytes
+    if ARTIFACT_RENDER == "eager" or nbytes > ARTIFACT_PENDING_MAX_BYTES:
+        return save_artifact(art_id, writer)
+    if has_artifact(art_id):
+        return art_id
+    with _pending_lock:
+        _pending_bytes -= _pending.pop(art_id, (None, 0))[1]
+        _pending[art_id] = (writer, nbytes)
+        _pending_bytes += nbytes
+        while len(_pending) > ARTIFACT_PENDING_MAX or _pending_bytes > ARTIFACT_PENDING_MAX_BYTES:
+            _, (_, dropped) = _pending.popitem(last=False)
+            _pending_bytes -= dropped
+    return art_id
+
+def get_pending_stats():
+    """Rendus en attente : nombre et octets retenus en mémoire."""
+    with _pending_lock:
+        return {"pending": len(_pending), "pending_bytes": _pending_bytes}
+
+
+def evict_artifacts(max_bytes=ARTIFACT_MAX_BYTES, max_age=ARTIFACT_MAX_AGE):
+    """Supprime les artefacts trop anciens, puis les moins récemment utilisés jusqu'à repasser sous `max_bytes`."""
+    if not os.path.isdir(ARTIFACT_DIR):
+        return 0
+    now = time.time()
+    entries = []
+    for entry in os.scandir(ARTIFACT_DIR):
+        if entry.is_file() and not entry.name.startswith(".tmp-"):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    removed = 0
+    total = sum(size for _, size, _ in entries)
+    for mtime, size, path in sorted(entries):
+        if now - mtime <= max_age and total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    return removed
@@ -0,0 +1,30 @@
+#async_http.py
+# Client HTTP asynchrone partagé (httpx) utilisé par les variantes async des outils réseau.
+import asyncio
+import weakref
+
+import httpx
+
+HTTP_TIMEOUT = httpx.Timeout(30.0)
+HTTP_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10)
+
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client():
+    """
+    Client httpx.AsyncClient partagé (pool de connexions) pour la boucle d'événements courante.
+    Un client est lié à sa boucle : on en garde un par boucle.
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(timeout=HTTP_TIMEOUT, limits=HTTP_LIMITS, follow_redirects=True)
+        _clients[loop] = client
+    return client
+
+async def aclose_async_client():
+    """Ferme le client de la boucle courante (à appeler en fin de programme)."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
@@ -0,0 +1,137 @@
+#bench_async_tools.py
+# Test de charge des tools réseau (STAC, Open-Meteo, OSRM ; géocodage Nominatim en cache) contre un faux serveur
+# local à latence fixe : appels invoke séquentiels (ancien chemin bloquant) contre ainvoke simultanés de
+# plusieurs utilisateurs sur le client httpx partagé. Le serveur relève le nombre maximal de requêtes en cours.
+#   python bench/bench_async_tools.py [utilisateurs] [latence ms]
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import artifacts
+import itinerary
+import tools_geocode
+import tools_stac
+import weather
+from async_http import aclose_async_client
+from tools_risk import get_all_tools
+
+CITIES = ["Tunis", "Sousse", "Sfax", "Bizerte", "Nabeul", "Gabes", "Kairouan", "Monastir", "Mahdia", "Beja",
+          "Jendouba", "Medenine", "Tozeur", "Kebili", "Siliana", "Zaghouan"]
+
+class Stub:
+    def __init__(self, latency_s):
+        self.latency_s, self.in_flight, self.peak, self.requests = latency_s, 0, 0, 0
+        self.lock = threading.Lock()
+
+    def enter(self):
+        with self.lock:
+            self.in_flight += 1
+            self.requests += 1
+            self.peak = max(self.peak, self.in_flight)
+
+    def leave(self):
+        with self.lock:
+            self.in_flight -= 1
+
+def payload(path, query):
+    if path.startswith("/nominatim/search"):
+        k = CITIES.index(query["q"][0]) if query.get("q", [""])[0] in CITIES else 0
+        return [{"lat": str(33.0 + 0.3 * k), "lon": str(9.0 + 0.2 * k), "display_name": query.get("q", [""])[0]}]
+    if path.startswith("/stac/search"):
+        stamp = "2023-07-03T10:00:00Z"
+        return {"features": [{"properties": {"datetime": stamp, "eo:cloud_cover": 5.0},
+                              "assets": {"thumbnail": {"href": "https://stub/thumb.jpg"}}}], "links": []}
+    if path.startswith("/v1/forecast"):
+        return {"current_weather": {"temperature": 28.4, "windspeed": 12.2},
+                "daily": {"time": ["2025-07-01", "2025-07-02"], "temperature_2m_max": [33.1, 34.6],
+                          "temperature_2m_min": [22.5, 23.0], "precipitation_sum": [0.0, 0.0]}}
+    if path.startswith("/route/v1/driving"):
+        step = {"maneuver": {"type": "depart"}, "name": "A1", "distance": 1000.0,
+                "geometry": {"coordinates": [[10.1, 36.8], [10.6, 35.8]]}}
+        return {"code": "Ok", "routes": [{"distance": 140000.0, "duration": 5400.0,
+                                          "legs": [{"steps": [step, {**step, "maneuver": {"type": "arrive"}}]}]}]}
+    return {}
+
+def serve(stub):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def handle_request(self):
+            stub.enter()
+            try:
+                if self.headers.get("Content-Length"):
+                    self.rfile.read(int(self.headers["Content-Length"]))
+                time.sleep(stub.latency_s)
+                url = urlparse(self.path)
+                data = json.dumps(payload(url.path, parse_qs(url.query))).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            finally:
+                stub.leave()
+
+        do_GET = do_POST = handle_request
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def user_calls(i):
+    # Une question multi-outils par utilisateur : météo, images satellite, itinéraire
+    a, b = CITIES[(2 * i) % len(CITIES)], CITIES[(2 * i + 1) % len(CITIES)]
+    return [("weather_tool", {"city_name": a}),
+            ("query_stac_catalog", {"params": "10.1,36.7,10.3,36.9 2023-07-01 2023-07-10 sentinel-2-l2a"}),
+            ("get_route_info", {"query": f"{a} -> {b}"})]
+
+async def run_concurrent(tools, users):
+    results = await asyncio.gather(*(tools[name].ainvoke(args) for i in range(users) for name, args in user_calls(i)))
+    await aclose_async_client()
+    return results
+
+if __name__ == "__main__":
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    latency_s = (float(sys.argv[2]) if len(sys.argv) > 2 else 200.0) / 1000
+    stub = Stub(latency_s)
+    server = serve(stub)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    tools_geocode.NOMINATIM_URL = f"{base}/nominatim"
+    tools_stac.STAC_API_URL = f"{base}/stac"
+    weather.WEATHER_URL = f"{base}/v1/forecast"
+    itinerary.OSRM_URL = f"{base}/route/v1/driving"
+    tools = {t.name: t for t in get_all_tools()}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        artifacts.ARTIFACT_DIR = tmp
+        tools_geocode.GEOCODE_CACHE_DB = os.path.join(tmp, "geocode.sqlite")
+        # Géocodage mis en cache au préalable : le limiteur Nominatim (1 req/s) sérialise de toute façon ces appels
+        interval, tools_geocode.NOMINATIM_MIN_INTERVAL = tools_geocode.NOMINATIM_MIN_INTERVAL, 0.0
+        for city in CITIES:
+            tools_geocode.geocode_coordinates(city)
+        tools_geocode.NOMINATIM_MIN_INTERVAL = interval
+
+        calls = [call for i in range(users) for call in user_calls(i)]
+        print(f"{users} utilisateurs, {len(calls)} appels de tools, latence serveur {latency_s * 1000:.0f} ms")
+        print(f"{'mode':>26} {'requêtes HTTP':>14} {'en cours max':>13} {'durée s':>8}")
+        for label, run in (("invoke séquentiel", lambda: [tools[n].invoke(a) for n, a in calls]),
+                           ("ainvoke simultanés", lambda: asyncio.run(run_concurrent(tools, users)))):
+            stub.requests = stub.peak = 0
+            start = time.perf_counter()
+            results = run()
+            seconds = time.perf_counter() - start
+            assert not any("❌" in str(r) or "error" in str(r)[:20] for r in results), results
+            print(f"{label:>26} {stub.requests:>14} {stub.peak:>13} {seconds:>8.2f}")
+    server.shutdown()
@@ -0,0 +1,70 @@
+#bench_d8.py
+# D8 (directions + accumulation) vectorisé contre l'ancienne double boucle Python, de 100x100 à 5000x5000.
+# L'ancienne version n'est mesurée que jusqu'à LEGACY_MAX_SIDE (plusieurs minutes au-delà).
+#   python bench/bench_d8.py [côté ...]
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_dem import synthetic_dem
+from water_ingress import NO_FLOW, d8_flow_accumulation, d8_flow_direction
+
+LEGACY_MAX_SIDE = 500
+
+def legacy_d8(dem):
+    # Implémentation d'origine (boucles par cellule), référence de temps
+    neighbors = [(-1,-1),(-1,0),(-1,1),(0,-1),(0,1),(1,-1),(1,0),(1,1)]
+    h, w = dem.shape
+    dir_idx = np.full((h, w), -1, dtype=int)
+    for y in range(1, h-1):
+        for x in range(1, w-1):
+            z0 = dem[y, x]
+            zmin = z0
+            kmin = -1
+            for k, (dy, dx) in enumerate(neighbors):
+                z = dem[y + dy, x + dx]
+                if z < zmin:
+                    zmin = z
+                    kmin = k
+            dir_idx[y, x] = kmin
+    acc = np.ones_like(dem, dtype=np.float32)
+    indices = np.argsort(dem, axis=None)
+    ys, xs = np.unravel_index(indices, dem.shape)
+    for y, x in zip(ys, xs):
+        k = dir_idx[y, x]
+        if k >= 0:
+            dy, dx = neighbors[k]
+            yy, xx = y + dy, x + dx
+            if 0 <= yy < h and 0 <= xx < w:
+                acc[yy, xx] += acc[y, x]
+    return acc, dir_idx
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+if __name__ == "__main__":
+    sides = [int(s) for s in sys.argv[1:]] or [100, 250, 500, 1000, 2000, 5000]
+    print(f"{'côté':>6} {'cellules':>11} {'directions s':>13} {'accumulation s':>15} {'Mcellules/s':>12} "
+          f"{'ancienne s':>11} {'gain':>7} {'mêmes dir.':>10}")
+    for side in sides:
+        dem = synthetic_dem(side, side)
+        t_dir, dir_idx = timed(d8_flow_direction, dem)
+        t_acc, acc = timed(d8_flow_accumulation, dir_idx)
+        total = t_dir + t_acc
+        legacy = same = ""
+        if side <= LEGACY_MAX_SIDE:
+            t_legacy, (legacy_acc, legacy_dir) = timed(legacy_d8, dem)
+            legacy, gain = f"{t_legacy:.2f}", f"x{t_legacy / total:.0f}"
+            # Directions comparées (NO_FLOW valait -1) ; l'ancienne accumulation, parcourue des cellules basses vers
+            # les hautes, n'est pas une référence (voir path_accumulation dans tests/test_water_ingress.py)
+            same = str(bool(np.array_equal(legacy_dir, np.where(dir_idx == NO_FLOW, -1, dir_idx.astype(int)))))
+        else:
+            gain = ""
+        print(f"{side:>6} {dem.size:>11} {t_dir:>13.3f} {t_acc:>15.3f} {dem.size / total / 1e6:>12.2f} "
+              f"{legacy:>11} {gain:>7} {same:>10}")
@@ -0,0 +1,85 @@
+#bench_disaster_map.py
+# Génération de la carte des catastrophes pour N événements EM-DAT synthétiques, contre un faux Nominatim local :
+# cache de géocodage froid (SQLite vide), chaud sur disque (nouveau processus) et chaud en mémoire.
+# Le limiteur de débit Nominatim (1 req/s) est conservé : le cache froid coûte ~1 s par lieu distinct.
+#   python bench/bench_disaster_map.py [N ...]
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import flood_detection
+import tools_geocode
+
+PROVINCES = ["Sfax", "Sousse", "Nabeul", "Bizerte", "Kairouan", "Gabes", "Jendouba", "Beja", "Kasserine", "Medenine",
+             "Monastir", "Mahdia"]
+LATENCY_S = 0.05
+
+def events(n):
+    # 1 à 3 provinces par événement, coordonnées EM-DAT absentes (géocodage nécessaire)
+    return [{"location": ", ".join(PROVINCES[(i + k) % len(PROVINCES)] for k in range(1 + i % 3)),
+             "country": "Tunisia", "disastertype": "flood", "startday": 1, "startmonth": 1 + i % 12,
+             "startyear": 2000 + i % 20, "endday": 5, "endmonth": 1 + i % 12, "endyear": 2000 + i % 20}
+            for i in range(n)]
+
+def serve():
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(LATENCY_S)
+            query = parse_qs(urlparse(self.path).query).get("q", [""])[0]
+            place = query.split(",")[0]
+            k = PROVINCES.index(place) if place in PROVINCES else -1
+            found = [{"lat": str(33.0 + 0.4 * k), "lon": str(9.0 + 0.2 * k), "display_name": query}] if k >= 0 else []
+            data = json.dumps(found).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def reset_cache(db_path, keep_disk):
+    if tools_geocode._db is not None:
+        tools_geocode._db.close()
+    tools_geocode._db = None
+    if not keep_disk and os.path.exists(db_path):
+        os.remove(db_path)
+    tools_geocode._memory = OrderedDict()
+    tools_geocode._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+def render(evts, out_dir):
+    start = time.perf_counter()
+    flood_detection._render_disaster_map(evts, "flood", os.path.join(out_dir, "map.html"))
+    return time.perf_counter() - start, tools_geocode.get_cache_stats()["misses"]
+
+if __name__ == "__main__":
+    sizes = [int(s) for s in sys.argv[1:]] or [10, 40, 100]
+    server = serve()
+    tools_geocode.NOMINATIM_URL = f"http://127.0.0.1:{server.server_address[1]}"
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = tools_geocode.GEOCODE_CACHE_DB = os.path.join(tmp, "geocode.sqlite")
+        print(f"{'événements':>11} {'lieux cités':>12} {'requêtes':>9} {'froid s':>8} {'disque s':>9} {'mémoire s':>10}")
+        for n in sizes:
+            evts = events(n)
+            mentions = sum(len(flood_detection._event_places(e)) for e in evts)
+            reset_cache(db_path, keep_disk=False)
+            cold, requests_made = render(evts, tmp)
+            reset_cache(db_path, keep_disk=True)
+            disk, _ = render(evts, tmp)
+            memory, _ = render(evts, tmp)
+            print(f"{n:>11} {mentions:>12} {requests_made:>9} {cold:>8.2f} {disk:>9.2f} {memory:>10.2f}")
+        reset_cache(db_path, keep_disk=True)
+    server.shutdown()
@@ -0,0 +1,102 @@
+#bench_fan_out.py
+# Latence de bout en bout d'une question multi-aléas (météo, incendies, historique d'inondations pour un même lieu)
+# avec un faux LLM (durée fixe par appel) et des tools simulés (durée fixe par appel) :
+# ancien graphe à un nœud (agent ReAct, un appel LLM par tool) contre planner → fan-out parallèle → synthèse.
+#   python bench/bench_fan_out.py [durée LLM s] [durée tool s]
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.language_models.llms import LLM
+from langchain_core.tools import StructuredTool
+from langgraph.graph import END, StateGraph
+
+import graph_main
+import nodes
+from state_schema import MyStateSchema
+
+QUESTION = "Quel temps fait-il à Tunis, y a-t-il des incendies le 2025-07-21 et quelles inondations depuis janvier ?"
+PLAN = [{"tool": "weather_tool", "input": "Tunis"},
+        {"tool": "detect_fire_tool", "input": "incendies à Tunis le 2025-07-21"},
+        {"tool": "query_disaster_events_tool", "input": "Tunisia 2025-01-01 2025-07-21 flood"}]
+
+class FakeLLM(LLM):
+    """Réponses scriptées selon le prompt ; chaque appel dure `delay` secondes."""
+    delay: float = 1.0
+    calls: int = 0
+
+    @property
+    def _llm_type(self):
+        return "fake"
+
+    def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.delay)
+        return self._answer(prompt)
+
+    async def _acall(self, prompt, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.delay)
+        return self._answer(prompt)
+
+    def _answer(self, prompt):
+        self.calls += 1
+        if "You are the planning step" in prompt:
+            return json.dumps(PLAN)
+        if "Action:" not in prompt:
+            return "Synthèse : météo, incendies et inondations pour Tunis."
+        # Agent ReAct : un tool par tour, puis la réponse finale
+        done = prompt.split(f"Question: {QUESTION}")[-1].count("Observation:")
+        if done < len(PLAN):
+            action, action_input = PLAN[done]["tool"], PLAN[done]["input"]
+        else:
+            action, action_input = "Final Answer", "ok"
+        return "Thought: next step.\nAction:\n```\n" + json.dumps({"action": action, "action_input": action_input}) + "\n```"
+
+def stub_tools(delay):
+    def make(name):
+        def run(query: str) -> str:
+            time.sleep(delay)
+            return f"{name} : résultat pour {query}"
+
+        async def arun(query: str) -> str:
+            await asyncio.sleep(delay)
+            return f"{name} : résultat pour {query}"
+
+        return StructuredTool.from_function(func=run, coroutine=arun, name=name, description=f"Stub {name}.")
+    return [make(call["tool"]) for call in PLAN]
+
+def single_node_graph():
+    builder = StateGraph(state_schema=MyStateSchema)
+    builder.add_node("agent_executor", nodes.create_agent_executor())
+    builder.set_entry_point("agent_executor")
+    builder.add_edge("agent_executor", END)
+    return builder.compile()
+
+async def timed(app):
+    start = time.perf_counter()
+    await app.ainvoke({"input": QUESTION})
+    return time.perf_counter() - start
+
+if __name__ == "__main__":
+    llm_s = float(sys.argv[1]) if len(sys.argv) > 1 else 1.5
+    tool_s = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    llm, tools = FakeLLM(delay=llm_s), stub_tools(tool_s)
+    # Graphe de graph_main construit avec le faux LLM et les tools simulés
+    nodes.get_llm = lambda temperature=0.1: llm
+    nodes.get_all_tools = graph_main.get_all_tools = lambda: tools
+    graph_main.create_planner_llm = lambda: llm
+
+    print(f"LLM {llm_s} s par appel, tools {tool_s} s par appel, {len(PLAN)} tools indépendants")
+    print(f"{'graphe':>32} {'appels LLM':>11} {'durée s':>8}")
+    for label, build in (("agent seul (avant)", single_node_graph),
+                         ("planner + fan-out + synthèse", graph_main.get_app.__wrapped__)):
+        llm.calls = 0
+        app = build()
+        with contextlib.redirect_stdout(io.StringIO()):  # traces verbose de l'agent
+            seconds = asyncio.run(timed(app))
+        print(f"{label:>32} {llm.calls:>11} {seconds:>8.2f}")
@@ -0,0 +1,61 @@
+#bench_fire_radius.py
+# Filtre de rayon autour d'une ville sur des détections synthétiques réparties sur le globe (journée VIIRS) :
+# ancien apply ligne à ligne, filter_within_radius (bbox + haversine vectorisée), index FireGridIndex.
+# L'ancien filtre n'est mesuré que jusqu'à ROW_APPLY_MAX lignes (temps extrapolé au-delà).
+#   python bench/bench_fire_radius.py [nombre de détections ...]
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fire_detection import FireGridIndex, filter_within_radius, haversine
+
+ROW_APPLY_MAX = 1_000_000
+CITY = (36.8, 10.18, 100)  # Tunis, rayon 100 km
+
+def detections(n, seed=0):
+    # Détections regroupées par foyers (comme les feux réels) plutôt qu'uniformes
+    rng = np.random.default_rng(seed)
+    centers = np.column_stack([rng.uniform(-60, 70, 2000), rng.uniform(-180, 180, 2000)])
+    picks = centers[rng.integers(0, len(centers), n)]
+    lats = np.clip(picks[:, 0] + rng.normal(0, 1.5, n), -90, 90)
+    lons = (picks[:, 1] + rng.normal(0, 1.5, n) + 180) % 360 - 180
+    return pd.DataFrame({"latitude": lats, "longitude": lons, "bright_ti4": rng.uniform(300, 400, n)})
+
+def row_apply(df, lat, lon, radius_km):
+    # Ancien filtre de detect_fire_near_city
+    df = df.copy()
+    df["distance"] = df.apply(lambda row: haversine(lat, lon, row["latitude"], row["longitude"]), axis=1)
+    return df[df["distance"] <= radius_km]
+
+def timed(func, *args, repeat=1):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+if __name__ == "__main__":
+    sizes = [int(s) for s in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    print(f"{'détections':>11} {'apply s':>9} {'vectorisé ms':>13} {'gain':>7} {'index: construction ms':>23} "
+          f"{'requête ms':>11} {'trouvées':>9}")
+    for n in sizes:
+        df = detections(n)
+        t_vec, expected = timed(filter_within_radius, df, *CITY, repeat=5)
+        if n <= ROW_APPLY_MAX:
+            t_apply, old = timed(row_apply, df, *CITY)
+            assert list(old.index) == list(expected.index)
+            apply_text = f"{t_apply:.2f}"
+        else:
+            t_apply = timed(row_apply, df.iloc[:ROW_APPLY_MAX], *CITY)[0] * n / ROW_APPLY_MAX
+            apply_text = f"~{t_apply:.0f}"
+        t_build, index = timed(FireGridIndex, df)
+        t_query, found = timed(index.query, *CITY, repeat=5)
+        assert len(found) == len(expected)
+        print(f"{n:>11} {apply_text:>9} {t_vec * 1000:>13.1f} {f'x{t_apply / t_vec:.0f}':>7} "
+              f"{t_build * 1000:>23.1f} {t_query * 1000:>11.2f} {len(expected):>9}")
@@ -0,0 +1,129 @@
+#bench_llm_prompt.py
+# Tokens de prompt et temps avant premier token (TTFT) de l'agent, avant / après le client Ollama partagé et la
+# sélection d'exemples, contre un faux serveur Ollama local (/api/generate) qui reproduit :
+#   - le chargement du modèle (LOAD_MS) quand il n'est pas en mémoire ou que son keep_alive a expiré ;
+#   - le cache KV de préfixe : seuls les tokens après le préfixe commun avec le prompt précédent sont évalués ;
+#   - ~4 caractères par token, EVAL_MS_PER_TOKEN par token évalué (ordre de grandeur d'un 7B sur GPU).
+# Horloge virtuelle : IDLE_S secondes entre deux questions. Le faux modèle répond directement une Final Answer.
+# Tokens évalués et TTFT relevés par nodes.LLMStatsHandler, comme en production.
+#   python bench/bench_llm_prompt.py [idle en secondes ...]
+import contextlib
+import io
+import json
+import os
+import re
+import sys
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "tests"))
+
+LOAD_MS = 1500.0
+EVAL_MS_PER_TOKEN = 0.5
+CHARS_PER_TOKEN = 4
+DEFAULT_KEEP_ALIVE_S = 300  # keep_alive par défaut d'Ollama (5m)
+ANSWER = '```\n{"action": "Final Answer", "action_input": "ok"}\n```'
+
+def keep_alive_seconds(value):
+    if value is None:
+        return DEFAULT_KEEP_ALIVE_S
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([smh]?)", str(value))
+    return float(match[1]) * {"": 1, "s": 1, "m": 60, "h": 3600}[match[2]]
+
+class StubOllama:
+    """État du faux serveur : horloge virtuelle, modèle chargé jusqu'à `loaded_until`, dernier prompt (cache KV)."""
+
+    def __init__(self, idle_s):
+        self.idle_s, self.clock, self.loaded_until, self.last_prompt = idle_s, 0.0, None, ""
+        self.prompt_chars = []
+
+    def generate(self, request):
+        self.clock += self.idle_s
+        prompt = request.get("prompt", "")
+        self.prompt_chars.append(len(prompt))
+        load_ms = 0.0
+        if self.loaded_until is None or self.clock > self.loaded_until:
+            load_ms, self.last_prompt = LOAD_MS, ""  # modèle déchargé : cache KV perdu
+        self.loaded_until = self.clock + keep_alive_seconds(request.get("keep_alive"))
+
+        common = len(os.path.commonprefix([prompt, self.last_prompt]))
+        self.last_prompt = prompt
+        evaluated = -(-len(prompt) // CHARS_PER_TOKEN) - common // CHARS_PER_TOKEN
+        return {"model": request.get("model"), "created_at": datetime.now(timezone.utc).isoformat(),
+                "response": "", "done": True, "done_reason": "stop",
+                "load_duration": int(load_ms * 1e6), "prompt_eval_count": evaluated,
+                "prompt_eval_duration": int(evaluated * EVAL_MS_PER_TOKEN * 1e6),
+                "eval_count": 12, "eval_duration": int(12 * 20e6)}
+
+def serve(stub):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            final = stub.generate(request)
+            first = {"model": final["model"], "created_at": final["created_at"], "response": ANSWER, "done": False}
+            body = (json.dumps(first) + "\n" + json.dumps(final) + "\n").encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def run_before(queries, handler):
+    # Ancien chemin : un client OllamaLLM neuf par question, keep_alive par défaut, prompt few-shot complet
+    from langchain_ollama import OllamaLLM
+    import nodes
+    import prompts
+    for query in queries:
+        llm = OllamaLLM(model=nodes.OLLAMA_MODEL, temperature=0.1, callbacks=[handler])
+        llm.invoke(prompts.few_shot_prompt.format(input=query))
+
+def run_after(queries, handler):
+    # Chemin actuel : agent de create_agent_executor, client partagé (keep_alive), exemples sélectionnés
+    import nodes
+    nodes.get_llm.cache_clear()
+    llm = nodes.get_llm(0.1)
+    llm.callbacks = [handler]
+    agent = nodes.create_agent_executor()
+    for query in queries:
+        agent.invoke({"input": query})
+
+def summary(prompt_chars, calls):
+    tokens = [c["prompt_tokens"] for c in calls]
+    ttft = [c["ttft_ms"] for c in calls]
+    warm = ttft[1:] or ttft
+    return (sum(prompt_chars) / len(prompt_chars) / CHARS_PER_TOKEN, sum(tokens) / len(tokens), ttft[0],
+            sum(warm) / len(warm))
+
+if __name__ == "__main__":
+    from nodes import LLMStatsHandler
+    from test_prompts import EVAL_QUERIES
+
+    queries = [q for q, _ in EVAL_QUERIES]
+    idles = [float(a) for a in sys.argv[1:]] or [60.0, 600.0]
+    print(f"{len(queries)} questions ; chargement {LOAD_MS:.0f} ms, {EVAL_MS_PER_TOKEN} ms/token évalué")
+    print(f"{'version':>7} {'pause s':>8} {'tokens envoyés':>15} {'tokens évalués':>15} {'TTFT 1er appel ms':>18} "
+          f"{'TTFT suivants ms':>17}")
+    for idle_s in idles:
+        for label, run in (("avant", run_before), ("après", run_after)):
+            stub, handler = StubOllama(idle_s), LLMStatsHandler()
+            server = serve(stub)
+            os.environ["OLLAMA_HOST"] = f"http://127.0.0.1:{server.server_address[1]}"
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):  # traces verbose de l'agent
+                    run(queries, handler)
+            finally:
+                server.shutdown()
+            sent, evaluated, first, warm = summary(stub.prompt_chars, handler.calls)
+            print(f"{label:>7} {idle_s:>8.0f} {sent:>15.0f} {evaluated:>15.0f} {first:>18.0f} {warm:>17.0f}")
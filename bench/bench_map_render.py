@@ -0,0 +1,77 @@
+#bench_map_render.py
+# Durée de rendu (construction + m.save) et taille du HTML des cartes pour 10k et 100k points :
+# ancien rendu (un folium.CircleMarker par détection / par pixel à risque, rasterio.transform.xy pixel par pixel)
+# contre map_render (add_points_layer : GeoJSON ou FastMarkerCluster, add_mask_overlay : une image PNG).
+#   python bench/bench_map_render.py [nombre de points ...]
+import os
+import sys
+import tempfile
+import time
+
+import folium
+import numpy as np
+import pandas as pd
+import rasterio
+from rasterio.transform import from_origin
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from map_render import add_mask_overlay, add_points_layer
+
+LAT, LON = 36.8, 10.2
+
+def detections(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({"latitude": LAT + rng.uniform(-1, 1, n), "longitude": LON + rng.uniform(-1, 1, n),
+                         "brightness": rng.uniform(300, 400, n).round(1), "acq_date": "2024-07-01",
+                         "acq_time": rng.integers(0, 2359, n)})
+
+def risk_mask(n, seed=0):
+    # Masque carré contenant exactement n pixels à risque, résolution 1 arc-seconde comme les tuiles DEM
+    side = int(np.ceil(np.sqrt(4 * n)))
+    mask = np.zeros(side * side, dtype=bool)
+    mask[np.random.default_rng(seed).choice(side * side, n, replace=False)] = True
+    return mask.reshape(side, side), from_origin(LON - 0.5, LAT + 0.5, 1 / 3600, 1 / 3600)
+
+# ---------- Ancien rendu ----------
+def legacy_points(m, df):
+    for _, row in df.iterrows():
+        popup = f"Brightness: {row.get('brightness', row.get('bright_ti4', 'N/A'))}, Date: {row['acq_date']}, Time: {row['acq_time']}"
+        folium.CircleMarker(location=[row["latitude"], row["longitude"]], radius=5, color="red", fill=True,
+                            fill_color="red", fill_opacity=0.7, popup=popup).add_to(m)
+
+def legacy_mask(m, mask, transform):
+    for y, x in np.argwhere(mask):
+        rlon, rlat = rasterio.transform.xy(transform, y, x)
+        folium.CircleMarker(location=[rlat, rlon], radius=2, color="red", fill=True, fill_opacity=0.7).add_to(m)
+
+# ---------- Nouveau rendu ----------
+def bulk_points(m, df):
+    popups = ("Brightness: " + df["brightness"].astype(str) + ", Date: " + df["acq_date"].astype(str)
+              + ", Time: " + df["acq_time"].astype(str))
+    add_points_layer(m, df["latitude"].to_numpy(), df["longitude"].to_numpy(), popups=popups, name="Incendies")
+
+def bulk_mask(m, mask, transform):
+    add_mask_overlay(m, mask, transform, name="Zone à risque")
+
+def measure(draw, *args):
+    with tempfile.TemporaryDirectory() as out_dir:
+        path = os.path.join(out_dir, "carte.html")
+        start = time.perf_counter()
+        m = folium.Map(location=[LAT, LON], zoom_start=8)
+        draw(m, *args)
+        m.save(path)
+        return time.perf_counter() - start, os.path.getsize(path) / 1e6
+
+if __name__ == "__main__":
+    sizes = [int(n) for n in sys.argv[1:]] or [10_000, 100_000]
+    print(f"{'points':>8} {'carte':>9} {'rendu':>30} {'durée s':>9} {'HTML Mo':>9}")
+    for n in sizes:
+        df, (mask, transform) = detections(n), risk_mask(n)
+        cases = [("incendies", "CircleMarker par point", legacy_points, df),
+                 ("incendies", "add_points_layer", bulk_points, df),
+                 ("risque", "CircleMarker par pixel", legacy_mask, mask, transform),
+                 ("risque", "add_mask_overlay", bulk_mask, mask, transform)]
+        for kind, label, draw, *args in cases:
+            seconds, size_mb = measure(draw, *args)
+            print(f"{n:>8} {kind:>9} {label:>30} {seconds:>9.2f} {size_mb:>9.2f}", flush=True)
@@ -0,0 +1,44 @@
+#bench_prompt_examples.py
+# Sélection des exemples few-shot : taille du prompt d'exemples (liste complète vs sélection), durée de
+# sélection et précision hors ligne (tool attendu couvert / premier exemple) sur le jeu de tests/test_prompts.py.
+#   python bench/bench_prompt_examples.py
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "tests"))
+
+def per_call_us(fn, query, repeat=2000):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(query)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+if __name__ == "__main__":
+    import prompts
+    from test_prompts import EVAL_QUERIES
+
+    all_examples = prompts.few_shot_prompt.example_separator.join(prompts._formatted_examples)
+    legacy = prompts.few_shot_prompt.example_separator.join(prompts.example_template.format(**e) for e in prompts.examples)
+    print(f"{len(prompts.agent_examples)} exemples indexés, vocabulaire de {len(prompts._vocabulary)} termes")
+    print(f"liste examples (ancien prompt)         : {len(legacy):>7} caractères (~{len(legacy) // 4} tokens)")
+    print(f"tous les exemples agent                : {len(all_examples):>7} caractères (~{len(all_examples) // 4} tokens)")
+
+    sizes, rank_us, select_us, covered, top1 = [], [], [], 0, 0
+    for query, tool in EVAL_QUERIES:
+        ranked = prompts.rank_examples(query)
+        covered += any(tool in prompts.example_tools(i) for i in ranked)
+        top1 += bool(ranked) and tool in prompts.example_tools(ranked[0])
+        sizes.append(len(prompts.select_examples(query)))
+        rank_us.append(per_call_us(prompts.rank_examples, query))
+        select_us.append(per_call_us(prompts.select_examples, query))
+
+    n = len(EVAL_QUERIES)
+    print(f"sélection par requête (moyenne / max)  : {sum(sizes) / n:>7.0f} / {max(sizes)} caractères "
+          f"(~{sum(sizes) / n / 4:.0f} tokens)")
+    print(f"rank_examples                          : {sum(rank_us) / n:>7.1f} µs (max {max(rank_us):.1f})")
+    print(f"select_examples                        : {sum(select_us) / n:>7.1f} µs (max {max(select_us):.1f})")
+    print(f"tool attendu couvert                   : {covered}/{n}")
+    print(f"premier exemple avec le tool attendu   : {top1}/{n}")
@@ -0,0 +1,121 @@
+#bench_router.py
+# Rejoue un journal de requêtes (structurées et libres, FR/EN) à travers router.answer_query : part servie sans
+# appel LLM et distribution des latences par chemin. L'analyse d'intention est réelle ; les tools (mêmes messages
+# d'erreur de géocodage que les vrais) et l'agent de repli sont remplacés par des attentes fixes, sans réseau.
+# Avant le routeur, chaque requête passait par l'agent.
+#   python bench/bench_router.py [latence tool ms] [latence agent ms]
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import router
+from tools_parsing import extract_params_from_text
+
+# Lieux que le faux géocodeur connaît ; les autres donnent le message "❌ Ville '…' introuvable." des tools
+KNOWN_PLACES = {"Tunis", "Sousse", "Sfax", "Bizerte", "Nabeul", "Marseille", "Athens", "Paris", "Lyon", "Berlin",
+                "Madrid", "Lisbonne", "Casablanca", "France", "Morocco", "Maroc", "Turquie", "Italy"}
+
+QUERY_LOG = [
+    # Incendies
+    "Y a-t-il des incendies à Marseille le 2023-07-21 dans un rayon de 50 km ?",
+    "Wildfires in Athens on 2023-08-20 within 80 km",
+    "feux à Bizerte le 2024-07-03",
+    "Incendies autour de Sfax le 2024-08-12",
+    "fires near Madrid on 2022-07-15",
+    "Incendies près de Sfax hier",
+    "Y a-t-il eu des feux de forêt en Tunisie cet été ?",
+    # Itinéraires
+    "Tunis -> Sousse",
+    "Paris -> Lyon",
+    "Casablanca -> Marrakech",
+    "Itinéraire de Tunis à Sfax en voiture",
+    # Météo
+    "Météo à Tunis",
+    "weather forecast in Berlin",
+    "Prévisions météo pour Nabeul",
+    "Compare la météo de Tunis et de Sfax",
+    "Quel temps fera-t-il demain à Paris ?",
+    # Satellite
+    "Images Sentinel-2 de Tunis entre le 2023-06-01 et le 2023-06-30",
+    "NDVI MODIS sur Nabeul en juillet 2023",
+    "Produits VIIRS sur Sfax du 2024-01-01 au 2024-01-10",
+    # Catastrophes
+    "Inondations en France entre 2020-01-01 et 2020-12-31",
+    "earthquakes in Morocco between 2023-01-01 and 2023-12-31",
+    "Tempêtes en Italy entre 2019-01-01 et 2019-12-31",
+    "Séismes en Turquie en 2023",
+    "Y a-t-il eu des inondations récemment ?",
+    # Requêtes libres : agent
+    "Quels sont les risques naturels à Lisbonne ?",
+    "Combien font 125 / 5 ?",
+    "Donne-moi des infos géographiques sur le Canada",
+    "Quelle date était-il il y a 30 jours ?",
+    "Risque d'inondation à Tunis selon le MNT",
+    "Explique la différence entre NRT et archive FIRMS",
+    "What is the flood risk for a factory near Sousse?",
+    "Résume les dangers climatiques pour la Tunisie",
+]
+
+class FakeTool:
+    def __init__(self, name, latency_s):
+        self.name, self.latency_s = name, latency_s
+
+    def place(self, tool_input):
+        if self.name == "weather_tool":
+            return tool_input["city_name"]
+        if self.name == "get_route_info":
+            return next((p.strip() for p in tool_input.split("->") if p.strip() not in KNOWN_PLACES), None)
+        if self.name == "query_disaster_events_tool":
+            return tool_input.split()[0]
+        return extract_params_from_text(tool_input)[1]
+
+    def invoke(self, tool_input):
+        time.sleep(self.latency_s)
+        place = self.place(tool_input)
+        if self.name == "get_route_info":
+            return "❌ Lieu introuvable." if place else "✅ Itinéraire calculé."
+        if place not in KNOWN_PLACES:
+            return f"❌ Ville '{place}' introuvable."
+        return f"✅ {self.name} : {place}"
+
+def run(tool_s, agent_s):
+    names = ["detect_fire_tool", "get_route_info", "weather_tool", "query_disaster_events_tool"]
+    router._tools = {name: FakeTool(name, tool_s) for name in names}
+    router.run_query_direct = lambda text: time.sleep(tool_s) or "✅ Scènes STAC"
+    router._latencies.clear()
+
+    def agent(text):
+        time.sleep(agent_s)
+        return "Réponse de l'agent"
+
+    parse, paths = [], {}
+    for query in QUERY_LOG:
+        start = time.perf_counter()
+        router.route_query(query)
+        parse.append(time.perf_counter() - start)
+        paths[query] = router.answer_query(query, agent)[1]
+    return parse, paths
+
+if __name__ == "__main__":
+    tool_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 200
+    agent_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    for query in QUERY_LOG:  # imports différés (pycountry, dateparser) hors mesure
+        router.route_query(query)
+    parse, paths = run(tool_ms / 1000, agent_ms / 1000)
+
+    for query, path in paths.items():
+        print(f"{path:>10}  {query}")
+    stats = router.get_router_stats()
+    print(f"\n{stats['total']} requêtes, {stats['fast_path_ratio']:.0%} servies sans LLM "
+          f"(tool {tool_ms:.0f} ms, agent {agent_ms:.0f} ms)")
+    print(f"analyse d'intention : p50 {np.percentile(parse, 50) * 1000:.2f} ms, "
+          f"p95 {np.percentile(parse, 95) * 1000:.2f} ms, max {max(parse) * 1000:.2f} ms\n")
+    print(f"{'chemin':>10} {'requêtes':>9} {'p50 ms':>9} {'p95 ms':>9}")
+    for path, values in sorted(stats["latency"].items()):
+        print(f"{path:>10} {values['count']:>9} {values['p50'] * 1000:>9.1f} {values['p95'] * 1000:>9.1f}")
+    total = sum(sum(v) for v in router._latencies.values())
+    print(f"\ntotal {total:.2f} s avec routeur, {len(QUERY_LOG) * agent_ms / 1000:.2f} s tout par l'agent")
@@ -0,0 +1,41 @@
+#bench_screen_sites.py
+# Débit de screen_sites (sites/min) selon le nombre de processus, sur tuiles DEM synthétiques (DEM_FIXTURE_DIR) ;
+# sites répartis sur quelques tuiles pour que les groupes soient plus grands que le pool (découpage en lots).
+#   python bench/bench_screen_sites.py [nombre de sites] [--maps]
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+WEST, SOUTH, EAST, NORTH = 10.0, 36.0, 10.3, 36.2  # 6 tuiles de 0.1°
+
+def make_sites(count):
+    # Grille régulière de sites, à distance du bord de la zone couverte
+    side = int(count ** 0.5) + 1
+    lats = [SOUTH + 0.02 + (NORTH - SOUTH - 0.04) * i / (side - 1) for i in range(side)]
+    lons = [WEST + 0.02 + (EAST - WEST - 0.04) * j / (side - 1) for j in range(side)]
+    return [(round(lat, 4), round(lon, 4)) for lat in lats for lon in lons][:count]
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    count, maps = int(args[0]) if args else 96, "--maps" in sys.argv
+    with tempfile.TemporaryDirectory() as fixture_dir:
+        os.environ["DEM_FIXTURE_DIR"] = fixture_dir
+        from synthetic_dem import write_fixture_tiles
+        import water_ingress
+
+        write_fixture_tiles(fixture_dir, WEST, SOUTH, EAST, NORTH)
+        sites = make_sites(count)
+        print(f"{count} sites, cartes {'oui' if maps else 'non'}, {os.cpu_count()} CPU")
+        print(f"{'processus':>9} {'durée s':>8} {'sites/min':>10} {'erreurs':>8}")
+        for workers in (1, 4, 8):
+            with tempfile.TemporaryDirectory() as out_dir:
+                start = time.perf_counter()
+                table = water_ingress.screen_sites(sites, workers=workers, out_dir=out_dir if maps else None)
+                seconds = time.perf_counter() - start
+            errors = int(table["error"].notna().sum()) if "error" in table else 0
+            print(f"{workers:>9} {seconds:>8.2f} {60 * count / seconds:>10.0f} {errors:>8}")
@@ -0,0 +1,106 @@
+#bench_stac_search.py
+# Recherche STAC sur une plage de dates contre un faux serveur STAC local (latence fixe par requête) :
+# ancienne boucle jour par jour séquentielle, requêtes journalières parallèles, recherche paginée sur l'intervalle.
+#   python bench/bench_stac_search.py [latence ms]
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tools_stac
+
+FIRST_DAY = datetime(2023, 1, 1)
+ITEMS_PER_DAY = 3  # plusieurs tuiles Sentinel-2 sur la bbox les jours de passage
+REVISIT_DAYS = 2
+
+def catalogue(days=400):
+    items = []
+    for d in range(0, days, REVISIT_DAYS):
+        day = FIRST_DAY + timedelta(days=d)
+        for k in range(ITEMS_PER_DAY):
+            stamp = (day + timedelta(hours=10, minutes=k)).strftime("%Y-%m-%dT%H:%M:%SZ")
+            items.append({"id": f"S2_{stamp}_{k}", "properties": {"datetime": stamp, "eo:cloud_cover": 10.0 + k},
+                          "assets": {"thumbnail": {"href": f"https://stub/{stamp}_{k}.jpg"}}})
+    return items
+
+def serve(latency_s):
+    items = catalogue()
+    counter = {"requests": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # connexions réutilisées par les sessions
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            counter["requests"] += 1
+            time.sleep(latency_s)
+            start, end = body["datetime"].split("/")
+            matching = [i for i in items if start <= i["properties"]["datetime"] <= end]
+            offset, limit = int(body.get("token", 0)), body.get("limit", 10)
+            page = {"type": "FeatureCollection", "features": matching[offset:offset + limit], "links": []}
+            if offset + limit < len(matching):
+                page["links"].append({"rel": "next", "method": "POST", "merge": True,
+                                      "href": f"http://127.0.0.1:{self.server.server_address[1]}/search",
+                                      "body": {"token": str(offset + limit)}})
+            data = json.dumps(page).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/geo+json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, counter
+
+def legacy_per_day(bbox, start_date, end_date, collection):
+    # Ancienne boucle : un POST bloquant `limit: 1` par jour, sans session partagée
+    images = []
+    for date_str in tools_stac._day_list(start_date, end_date):
+        response = requests.post(f"{tools_stac.STAC_API_URL}/search",
+                                 json=tools_stac._day_body(bbox, date_str, collection), timeout=30)
+        items = response.json().get("features", [])
+        if items:
+            images.append(tools_stac._image_from_item(items[0], date_str))
+    return images
+
+if __name__ == "__main__":
+    latency_s = (float(sys.argv[1]) if len(sys.argv) > 1 else 80.0) / 1000
+    server, counter = serve(latency_s)
+    tools_stac.STAC_API_URL = f"http://127.0.0.1:{server.server_address[1]}"
+    session = requests.Session()
+    session.mount("http://", requests.adapters.HTTPAdapter(pool_connections=tools_stac.STAC_MAX_WORKERS,
+                                                           pool_maxsize=tools_stac.STAC_MAX_WORKERS))
+    modes = [
+        ("jour par jour (ancien)", legacy_per_day),
+        (f"journalier ×{tools_stac.STAC_MAX_WORKERS}",
+         lambda *a: tools_stac.search_stac_per_day(*a, session=session)),
+        ("intervalle paginé", lambda *a: tools_stac.search_stac_interval(*a, session=session)),
+    ]
+    bbox = [10.1, 36.7, 10.3, 36.9]
+    print(f"latence serveur {latency_s * 1000:.0f} ms par requête, {ITEMS_PER_DAY} items tous les {REVISIT_DAYS} jours, "
+          f"pages de {tools_stac.STAC_PAGE_LIMIT}")
+    print(f"{'jours':>6} {'mode':>24} {'requêtes':>9} {'durée s':>8} {'images':>7}")
+    for days in (7, 31, 90, 365):
+        start = FIRST_DAY.strftime("%Y-%m-%d")
+        end = (FIRST_DAY + timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        reference = None
+        for label, search in modes:
+            counter["requests"] = 0
+            t0 = time.perf_counter()
+            images = search(bbox, start, end, "sentinel-2-l2a")
+            seconds = time.perf_counter() - t0
+            reference = reference or images
+            assert images == reference, label  # même sortie images/urls
+            print(f"{days:>6} {label:>24} {counter['requests']:>9} {seconds:>8.2f} {len(images):>7}")
+    server.shutdown()
@@ -0,0 +1,54 @@
+#bench_startup.py
+# Démarrage à froid de `import graph_main` : `python -X importtime` dans un processus neuf par mesure,
+# durée cumulée de l'import (médiane), pic RSS (ru_maxrss) et modules lourds déjà chargés.
+# Des révisions git peuvent être comparées à l'arbre courant (extraites via `git archive` dans un dossier temporaire).
+#   python bench/bench_startup.py [mesures] [révision git ...]
+import os
+import re
+import subprocess
+import sys
+import tarfile
+import tempfile
+
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["rasterio", "matplotlib", "pandas", "folium", "geopy", "dateparser", "pycountry", "langchain_ollama"]
+
+CHILD = """
+import resource, sys
+import graph_main
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, ",".join(heavy) or "-")
+"""
+
+# Ligne `import time:` du module graph_main : self et cumulé en microsecondes
+_IMPORT_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s*graph_main$", re.MULTILINE)
+
+def measure(source_dir):
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", CHILD.format(heavy=HEAVY_MODULES)],
+                          cwd=source_dir, capture_output=True, text=True, check=True)
+    cumulative_us = int(_IMPORT_LINE.search(proc.stderr).group(2))
+    rss_kb, heavy = proc.stdout.split()
+    return cumulative_us / 1e6, int(rss_kb) / 1024, heavy
+
+def checkout(ref, target):
+    archive = os.path.join(target, "src.tar")
+    subprocess.run(["git", "archive", "-o", archive, ref], cwd=REPO_DIR, check=True)
+    with tarfile.open(archive) as tar:
+        tar.extractall(os.path.join(target, "src"))
+    return os.path.join(target, "src")
+
+def report(label, source_dir, runs):
+    samples = [measure(source_dir) for _ in range(runs)]
+    seconds, rss = np.median([s[0] for s in samples]), np.median([s[1] for s in samples])
+    print(f"{label:>14} {seconds:>12.2f} {rss:>9.0f}  {samples[-1][2]}")
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    refs = sys.argv[2:]
+    print(f"{'arbre':>14} {'import s':>12} {'RSS Mo':>9}  modules lourds chargés (médiane de {runs})")
+    for ref in refs:
+        with tempfile.TemporaryDirectory() as tmp:
+            report(ref, checkout(ref, tmp), runs)
+    report("courant", REPO_DIR, runs)
@@ -0,0 +1,106 @@
+#bench_translate.py
+# Temps de traduction par réponse sur une session de questions françaises : ancien chemin (langdetect puis un appel
+# GoogleTranslator par question et par réponse entière) contre translate.py (cache SQLite par segment, lots),
+# cache vide puis cache déjà rempli (redémarrage). Le backend est un faux traducteur à latence fixe par appel
+# plus un coût par caractère ; les réponses reprennent le format réel des événements EM-DAT.
+#   python bench/bench_translate.py [questions] [latence ms par appel]
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from langdetect import detect
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import translate
+from flood_detection import format_event_human_readable
+
+PER_CHAR_S = 20e-6
+LOCATIONS = ["Tunis", "Nabeul", "Bizerte", "Sfax", "Sousse", "Jendouba", "Beja", "Kairouan", "Gabes", "Monastir"]
+COUNTRIES = ["Tunisie", "Maroc", "Algérie"]
+
+class StubTranslator:
+    def __init__(self, latency_s):
+        self.latency_s, self.calls, self.chars = latency_s, 0, 0
+
+    def __call__(self, texts, source, target):
+        results = []
+        for text in texts:
+            self.calls += 1
+            self.chars += len(text)
+            time.sleep(self.latency_s + PER_CHAR_S * len(text))
+            results.append("\n".join(f"[{target}] {line}" for line in text.split("\n")))
+        return results
+
+def events(country, n=40, seed=0):
+    rng = np.random.default_rng(seed)
+    return [{"disastertype": "flood", "country": country, "location": LOCATIONS[k % len(LOCATIONS)],
+             "startday": int(rng.integers(1, 28)), "startmonth": int(rng.integers(1, 12)), "startyear": 2000 + k // 2,
+             "endday": int(rng.integers(1, 28)), "endmonth": int(rng.integers(1, 12)), "endyear": 2000 + k // 2,
+             "totaldeaths": int(rng.integers(0, 30)) if k % 3 else "Non précisé"} for k in range(n)]
+
+def session(n_queries):
+    # Fenêtres de dates qui se recouvrent : une partie des événements revient d'une réponse à l'autre
+    pools = {c: events(c, seed=i) for i, c in enumerate(COUNTRIES)}
+    pairs = []
+    for i in range(n_queries):
+        country = COUNTRIES[i % len(COUNTRIES)]
+        first = 2 * (i // len(COUNTRIES))
+        start, end = 2000 + first // 2, 2004 + first // 2
+        question = f"Quelles inondations ont touché la {country} entre {start} et {end} ?"
+        answer = (f"✅ Événements 'flood' trouvés en {country} entre {start}-01-01 et {end}-12-31 :\n\n"
+                  + "\n".join(format_event_human_readable(e) for e in pools[country][first:first + 10])
+                  + f"\n\n🗺️ Carte : flood_map_{country}_{start}-01-01.html\n"
+                  + "The events above are the recorded floods for the requested period.")
+        pairs.append((question, answer))
+    return pairs
+
+def legacy(pairs, backend):
+    times = []
+    for question, answer in pairs:
+        start = time.perf_counter()
+        lang = detect(question)
+        backend([question], "auto", "en")
+        backend([answer], "en", lang)
+        times.append(time.perf_counter() - start)
+    return times
+
+def cached(pairs):
+    times = []
+    for question, answer in pairs:
+        start = time.perf_counter()
+        lang = translate.detect_language(question)
+        translate.translate_to_english(question)
+        translate.translate_from_english(answer, lang)
+        times.append(time.perf_counter() - start)
+    return times
+
+def report(label, times, backend):
+    ms = np.array(times) * 1000
+    print(f"{label:>22} {ms.mean():>9.0f} {np.percentile(ms, 50):>9.0f} {np.percentile(ms, 95):>9.0f} "
+          f"{backend.calls:>9} {backend.chars:>12}")
+
+if __name__ == "__main__":
+    n_queries = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    latency_s = (float(sys.argv[2]) if len(sys.argv) > 2 else 250) / 1000
+    pairs = session(n_queries)
+    print(f"{n_queries} questions, réponse moyenne {np.mean([len(a) for _, a in pairs]):.0f} caractères, "
+          f"{latency_s * 1000:.0f} ms par appel + {PER_CHAR_S * 1e6:.0f} µs par caractère\n")
+    print(f"{'':>22} {'moy. ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'appels':>9} {'caractères':>12}")
+    detect(pairs[0][0])  # chargement des profils langdetect hors mesure
+
+    backend = StubTranslator(latency_s)
+    report("avant", legacy(pairs, backend), backend)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        translate.TRANSLATE_CACHE_DB = os.path.join(cache_dir, "translate_cache.sqlite")
+        for label in ("cache vide", "cache rempli"):
+            # Nouveau processus simulé : connexion SQLite et cache langdetect repartent de zéro
+            translate._db = None
+            translate.detect_language.cache_clear()
+            backend = StubTranslator(latency_s)
+            translate.set_translation_backend(backend)
+            report(label, cached(pairs), backend)
+        translate._db.close()
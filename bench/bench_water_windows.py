@@ -0,0 +1,52 @@
+#bench_water_windows.py
+# Pic de mémoire (RSS) et durée de estimate_surface_water_ingress sur grille entière et par fenêtres,
+# tuiles DEM synthétiques servies par DEM_FIXTURE_DIR ; un processus neuf par mesure (ru_maxrss).
+#   python bench/bench_water_windows.py [demi-côté en degrés ...]
+import os
+import subprocess
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+LAT, LON = 36.8, 10.2
+
+CHILD = """
+import resource, sys, time
+import water_ingress
+base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+result = water_ingress.estimate_surface_water_ingress(({lat}, {lon}), buffer_deg={buffer_deg}, describe_location=False,
+                                                      memory_mb={memory_mb})
+print(result["DEM_shape"], time.perf_counter() - start, base, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+      round(result["Risk_zone_percent"], 4))
+"""
+
+def measure(buffer_deg, memory_mb, fixture_dir):
+    env = dict(os.environ, DEM_FIXTURE_DIR=fixture_dir, ARTIFACT_RENDER="lazy")
+    code = CHILD.format(lat=LAT, lon=LON, buffer_deg=buffer_deg, memory_mb=memory_mb)
+    out = subprocess.run([sys.executable, "-c", code], env=env, cwd=os.path.dirname(BENCH_DIR),
+                         capture_output=True, text=True, check=True).stdout.split()
+    shape = out[0] + out[1]
+    seconds, base_kb, peak_kb, risk = float(out[2]), int(out[3]), int(out[4]), out[5]
+    return shape, seconds, base_kb / 1024, peak_kb / 1024, risk
+
+if __name__ == "__main__":
+    from synthetic_dem import write_fixture_tiles
+    from water_ingress import window_side
+
+    buffers = [float(b) for b in sys.argv[1:]] or [0.1, 0.5, 1.0]
+    print(f"{'zone':>6} {'DEM':>12} {'mode':>22} {'durée s':>8} {'RSS import Mo':>14} {'pic RSS Mo':>11} "
+          f"{'calcul Mo':>10} {'risque %':>9}")
+    with tempfile.TemporaryDirectory() as fixture_dir:
+        write_fixture_tiles(fixture_dir, LON - max(buffers), LAT - max(buffers), LON + max(buffers), LAT + max(buffers))
+        for buffer_deg in buffers:
+            side = round(2 * buffer_deg * 1200)
+            modes = [("grille entière", 1e6)] + [(f"fenêtres {mb} Mo ({window_side(mb)} px)", mb)
+                                                  for mb in (4, 16, 64) if window_side(mb) < side]
+            for label, memory_mb in modes:
+                shape, seconds, base, peak, risk = measure(buffer_deg, memory_mb, fixture_dir)
+                print(f"{2 * buffer_deg:>5}° {shape:>12} {label:>22} {seconds:>8.2f} {base:>14.0f} {peak:>11.0f} "
+                      f"{peak - base:>10.0f} {risk:>9}")
@@ -0,0 +1,28 @@
+#synthetic_dem.py
+# Relief synthétique pour les benchmarks (pas de réseau) : collines, vallées et bruit arrondis au mètre
+# comme les altitudes SRTM, avec dépressions et plats.
+import numpy as np
+
+def synthetic_dem(rows, cols, seed=0):
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:rows, 0:cols].astype(np.float32)
+    relief = 80 * np.sin(x / 60) + 60 * np.cos(y / 45) + 25 * np.sin((x + y) / 17)
+    relief += rng.normal(size=(rows, cols)).astype(np.float32).cumsum(axis=0) * 0.3
+    return np.round(relief + 200).astype(np.float32)
+
+def write_fixture_tiles(directory, west, south, east, north, seed=0):
+    """Tuiles GeoTIFF SRTMGL3 synthétiques (nommage de dem_tiles) couvrant la fenêtre, pour DEM_FIXTURE_DIR."""
+    import rasterio
+    from rasterio.transform import from_origin
+
+    from dem_tiles import tile_bounds, tile_name, tiles_for_window
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:120, 0:120]
+    for row, col in tiles_for_window(west, south, east, north):
+        tile_west, _, _, tile_north = tile_bounds(row, col)
+        gy, gx = row * 120 + 119 - y, col * 120 + x
+        relief = 80 * np.sin(gx / 60) + 60 * np.cos(gy / 45) + 25 * np.sin((gx + gy) / 17) + rng.normal(size=(120, 120))
+        with rasterio.open(f"{directory}/{tile_name(row, col)}", "w", driver="GTiff", height=120, width=120, count=1,
+                           dtype="float32", crs="EPSG:4326", nodata=np.nan,
+                           transform=from_origin(tile_west, tile_north, 1 / 1200, 1 / 1200)) as dst:
+            dst.write(np.round(relief + 200).astype(np.float32), 1)
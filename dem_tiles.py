@@ -0,0 +1,120 @@
+#dem_tiles.py
+# Cache local du DEM en tuiles de DEM_TILE_DEG degrés (GeoTIFF tuilés et compressés) :
+# chaque tuile n'est téléchargée qu'une fois, toute fenêtre est lue par mosaïque des tuiles qu'elle recoupe.
+import math
+import os
+import uuid
+
+import numpy as np
+import rasterio
+import rasterio.shutil
+import requests
+from rasterio.merge import merge
+
+OPENTOP_API_KEY = os.getenv("OPENTOPO_API_KEY", "811d1f7cbb4522dc7e623ec70a657ed1")
+OPENTOP_URL = "https://portal.opentopography.org/API/globaldem"
+DEM_TYPE = "SRTMGL3"
+DEM_TILE_DEG = 0.1
+DEM_TILE_DIR = os.getenv("DEM_TILE_DIR", "dem_tiles")
+# Répertoire de tuiles locales (même nommage) utilisé à la place de l'API OpenTopography, ex. pour les tests
+DEM_FIXTURE_DIR = os.getenv("DEM_FIXTURE_DIR")
+
+_stats = {"tile_hits": 0, "tile_downloads": 0}
+
+
+def tile_name(row, col):
+    return f"{DEM_TYPE}_{row}_{col}.tif"
+
+def tile_bounds(row, col):
+    """(west, south, east, north) de la tuile (row, col) de la grille fixe."""
+    south, west = row * DEM_TILE_DEG, col * DEM_TILE_DEG
+    return west, south, west + DEM_TILE_DEG, south + DEM_TILE_DEG
+
+def tiles_for_window(west, south, east, north):
+    # Arrondi pour éviter qu'une borne tombant exactement sur la grille n'ajoute une tuile vide
+    eps = 1e-9
+    rows = range(math.floor(south / DEM_TILE_DEG + eps), math.ceil(north / DEM_TILE_DEG - eps))
+    cols = range(math.floor(west / DEM_TILE_DEG + eps), math.ceil(east / DEM_TILE_DEG - eps))
+    return [(r, c) for r in rows for c in cols]
+
+
+def _download_tile(row, col, path):
+    west, south, east, north = tile_bounds(row, col)
+    params = {
+        "demtype": DEM_TYPE,
+        "west": west, "south": south, "east": east, "north": north,
+        "outputFormat": "GTiff", "API_Key": OPENTOP_API_KEY
+    }
+    r = requests.get(OPENTOP_URL, params=params, stream=True, timeout=120)
+    if r.status_code != 200:
+        raise ValueError(f"Impossible de télécharger le DEM. Statut: {r.status_code}")
+
+    # Téléchargement dans un fichier temporaire, conversion en GeoTIFF tuilé/compressé, puis renommage atomique
+    os.makedirs(DEM_TILE_DIR, exist_ok=True)
+    raw_path = os.path.join(DEM_TILE_DIR, f".raw-{uuid.uuid4().hex}.tif")
+    tmp_path = os.path.join(DEM_TILE_DIR, f".tmp-{uuid.uuid4().hex}.tif")
+    try:
+        with open(raw_path, "wb") as f:
+            for chunk in r.iter_content(chunk_size=8192):
+                if chunk:
+                    f.write(chunk)
+        rasterio.shutil.copy(raw_path, tmp_path, driver="GTiff", tiled=True, compress="deflate")
+        os.replace(tmp_path, path)
+    finally:
+        for p in (raw_path, tmp_path):
+            if os.path.exists(p):
+                os.remove(p)
+
+def get_tile(row, col):
+    """Chemin local de la tuile (row, col) : cache, puis répertoire de fixtures ou téléchargement."""
+    name = tile_name(row, col)
+    if DEM_FIXTURE_DIR:
+        path = os.path.join(DEM_FIXTURE_DIR, name)
+        if not os.path.exists(path):
+            raise ValueError(f"Tuile DEM absente des fixtures : {name}")
+        return path
+
+    path = os.path.join(DEM_TILE_DIR, name)
+    if os.path.exists(path):
+        _stats["tile_hits"] += 1
+        return path
+    _download_tile(row, col, path)
+    _stats["tile_downloads"] += 1
+    return path
+
+
+def read_dem_window(west, south, east, north):
+    """
+    DEM (float32, NaN hors données) couvrant la fenêtre demandée, et sa transformation affine.
+    Seules les parties des tuiles recoupant la fenêtre sont lues (lectures fenêtrées de rasterio.merge).
+    """
+    paths = [get_tile(r, c) for r, c in tiles_for_window(west, south, east, north)]
+    dem, transform = merge(paths, bounds=(west, south, east, north), nodata=np.nan, dtype="float32")
+    return dem[0], transform
+
+def dem_window_shape(west, south, east, north):
+    """(lignes, colonnes) du DEM que read_dem_window retournerait, sans lire les données (résolution de la 1re tuile)."""
+    with rasterio.open(get_tile(*tiles_for_window(west, south, east, north)[0])) as src:
+        res_x, res_y = src.res
+    return int(round((north - south) / res_y)), int(round((east - west) / res_x))
+
+def write_dem_window(west, south, east, north, path, mem_limit=64):
+    """
+    Comme read_dem_window, mais la mosaïque est écrite dans le GeoTIFF `path` par blocs d'au plus `mem_limit` Mo
+    (grandes zones). Retourne la transformation affine.
+    """
+    paths = [get_tile(r, c) for r, c in tiles_for_window(west, south, east, north)]
+    # Cache de blocs GDAL (5 % de la RAM par défaut) borné lui aussi
+    with rasterio.Env(GDAL_CACHEMAX=mem_limit):
+        merge(paths, bounds=(west, south, east, north), nodata=np.nan, dtype="float32", dst_path=path,
+              mem_limit=mem_limit, dst_kwds={"compress": "NONE", "tiled": True, "blockxsize": 256, "blockysize": 256})
+    with rasterio.open(path) as src:
+        return src.transform
+
+def read_dem_around(lat, lon, buffer_deg=0.01):
+    """Raccourci : fenêtre de ± buffer_deg degrés autour d'un point."""
+    return read_dem_window(lon - buffer_deg, lat - buffer_deg, lon + buffer_deg, lat + buffer_deg)
+
+def get_dem_stats():
+    """Compteurs du cache de tuiles DEM (hits, téléchargements)."""
+    return dict(_stats)
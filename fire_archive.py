@@ -0,0 +1,158 @@
+#fire_archive.py
+# Stockage colonne (Parquet) des archives FIRMS : partitionné par date d'acquisition
+# puis par case spatiale de SPATIAL_BUCKET_DEG degrés, avec un manifeste reconstruit seulement si le répertoire change.
+import json
+import math
+import os
+from datetime import datetime
+from functools import lru_cache
+
+import pandas as pd
+
+ARCHIVE_DIR = os.getenv("FIRE_ARCHIVE_DIR", r"C:\Users\DELL\Desktop\fire_archives")
+STORE_DIR = os.path.join(ARCHIVE_DIR, "parquet")
+MANIFEST_FILE = os.path.join(ARCHIVE_DIR, "manifest.json")
+SPATIAL_BUCKET_DEG = 10
+
+
+def _bucket(value):
+    return int(math.floor(value / SPATIAL_BUCKET_DEG) * SPATIAL_BUCKET_DEG)
+
+def _archive_period(filename):
+    # fire_archive_<annee_debut>_<annee_fin>.csv couvre du 21/01 au 20/01 de l'année suivante
+    parts = filename.replace(".csv", "").split("_")
+    start_year, end_year = int(parts[2]), int(parts[3])
+    return datetime(start_year, 1, 21).date(), datetime(end_year, 1, 20).date()
+
+
+# ---------- Manifeste ----------
+def _scan_archives():
+    archives = {}
+    if os.path.isdir(ARCHIVE_DIR):
+        for filename in sorted(os.listdir(ARCHIVE_DIR)):
+            if filename.endswith(".csv") and "fire_archive_" in filename:
+                try:
+                    start, end = _archive_period(filename)
+                except (IndexError, ValueError):
+                    continue
+                archives[filename] = {"start": start.isoformat(), "end": end.isoformat(), "ingested": False}
+
+    previous = _read_manifest_file()
+    for filename, entry in archives.items():
+        entry["ingested"] = previous.get(filename, {}).get("ingested", False)
+    return archives
+
+def build_manifest():
+    """Parcourt ARCHIVE_DIR et enregistre la période couverte par chaque archive (utilisé par l'ingestion)."""
+    archives = _scan_archives()
+    _write_manifest_file(archives)
+    _manifest_for.cache_clear()
+    return archives
+
+def _read_manifest_file():
+    if not os.path.exists(MANIFEST_FILE):
+        return {}
+    with open(MANIFEST_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _write_manifest_file(archives):
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    with open(MANIFEST_FILE, "w", encoding="utf-8") as f:
+        json.dump(archives, f, indent=2)
+
+def _dir_mtime():
+    try:
+        return os.stat(ARCHIVE_DIR).st_mtime_ns
+    except OSError:
+        return None
+
+@lru_cache(maxsize=1)
+def _manifest_for(dir_mtime):
+    # Lecture seule : ni création du répertoire ni écriture du manifeste.
+    # Archives ajoutées ou retirées depuis l'écriture du manifeste : reconstruction en mémoire.
+    if dir_mtime is None:
+        return {}
+    archives = _read_manifest_file()
+    current = _scan_archives()
+    return archives if archives and set(archives) == set(current) else current
+
+def load_manifest():
+    """Manifeste en mémoire, relu dès que le contenu de ARCHIVE_DIR change (mtime du répertoire)."""
+    return _manifest_for(_dir_mtime())
+
+def find_archive_for_date(date_obj):
+    """Retourne (nom_fichier, entrée_manifeste) de l'archive couvrant la date, ou (None, None)."""
+    iso = date_obj.isoformat()
+    for filename, entry in load_manifest().items():
+        if entry["start"] <= iso <= entry["end"]:
+            return filename, entry
+    return None, None
+
+
+# ---------- Ingestion ----------
+def ingest_archive(filename):
+    """Convertit une archive CSV FIRMS en Parquet partitionné acq_date / lat_bucket / lon_bucket."""
+    df = pd.read_csv(os.path.join(ARCHIVE_DIR, filename))
+    df["lat_bucket"] = (df["latitude"] // SPATIAL_BUCKET_DEG * SPATIAL_BUCKET_DEG).astype(int)
+    df["lon_bucket"] = (df["longitude"] // SPATIAL_BUCKET_DEG * SPATIAL_BUCKET_DEG).astype(int)
+    df.to_parquet(STORE_DIR, partition_cols=["acq_date", "lat_bucket", "lon_bucket"], index=False)
+
+    archives = dict(load_manifest())
+    archives[filename] = {**archives.get(filename, {}), "ingested": True}
+    _write_manifest_file(archives)
+    _manifest_for.cache_clear()
+    return len(df)
+
+def ingest_all():
+    """Ingère toutes les archives du manifeste qui ne l'ont pas encore été."""
+    counts = {}
+    for filename, entry in build_manifest().items():
+        if not entry["ingested"]:
+            counts[filename] = ingest_archive(filename)
+    return counts
+
+
+# ---------- Lecture ----------
+def _lon_ranges(lon_min, lon_max):
+    """Intervalles de longitude dans [-180, 180] ; une bbox à cheval sur l'antiméridien est coupée en deux."""
+    if lon_max - lon_min >= 360:
+        return [(-180.0, 180.0)]
+    if lon_min < -180:
+        return [(lon_min + 360.0, 180.0), (-180.0, lon_max)]
+    if lon_max > 180:
+        return [(lon_min, 180.0), (-180.0, lon_max - 360.0)]
+    return [(lon_min, lon_max)]
+
+def read_fires(date_str, bbox=None):
+    """
+    Charge uniquement les partitions de `date_str` couvrant `bbox` (lon_min, lat_min, lon_max, lat_max).
+    Retourne None si la date n'a pas été ingérée.
+    """
+    date_dir = os.path.join(STORE_DIR, f"acq_date={date_str}")
+    if not os.path.isdir(date_dir):
+        return None
+
+    if bbox is None:
+        paths = [date_dir]
+    else:
+        lon_min, lat_min, lon_max, lat_max = bbox
+        paths = [
+            os.path.join(date_dir, f"lat_bucket={lat_b}", f"lon_bucket={lon_b}")
+            for lat_b in range(_bucket(lat_min), _bucket(lat_max) + 1, SPATIAL_BUCKET_DEG)
+            for west, east in _lon_ranges(lon_min, lon_max)
+            for lon_b in range(_bucket(west), _bucket(east) + 1, SPATIAL_BUCKET_DEG)
+        ]
+        paths = [p for p in dict.fromkeys(paths) if os.path.isdir(p)]
+
+    frames = [pd.read_parquet(p) for p in paths]
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=["latitude", "longitude", "acq_date"])
+    df = pd.concat(frames, ignore_index=True)
+    df["acq_date"] = date_str
+    return df.drop(columns=["lat_bucket", "lon_bucket"], errors="ignore")
+
+
+if __name__ == "__main__":
+    for name, n in ingest_all().items():
+        print(f"✅ {name} : {n} détections ingérées")
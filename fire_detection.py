@@ -1,13 +1,15 @@
 #fire_detection.py
 from datetime import datetime, timedelta, date
 import pandas as pd
-import requests
 import folium
 import numpy as np
 import os
-
-MAP_KEY = 'f44596f0cc01c26985abd6bfff78ac92'
-ARCHIVE_DIR = r"C:\Users\DELL\Desktop\fire_archives"
+from tools_geocode import geocode_coordinates
+from map_render import add_points_layer
+from artifacts import artifact_id, defer_artifact
+from fire_archive import ARCHIVE_DIR, find_archive_for_date, read_fires
+from fire_nrt import NRT_SOURCE, load_nrt_day, nrt_slice_version
+from tools_parsing import extract_params_from_text
 
 def haversine(lat1, lon1, lat2, lon2):
     R = 6371
@@ -18,114 +20,191 @@ def haversine(lat1, lon1, lat2, lon2):
     return 2 * R * np.arcsin(np.sqrt(a))
 
 def get_city_coordinates(city_name):
-    url = f'https://nominatim.openstreetmap.org/search?q={city_name}&format=json&limit=1'
     try:
-        response = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'})
-        data = response.json()
-        if not data:
-            return None, None
-        return float(data[0]['lat']), float(data[0]['lon'])
+        return geocode_coordinates(city_name)
     except:
         return None, None
 
 def find_archive_file_for_date(date_obj):
-    for filename in sorted(os.listdir(ARCHIVE_DIR)):
-        if filename.endswith(".csv") and "fire_archive_" in filename:
-            try:
-                parts = filename.replace(".csv", "").split("_")
-                start_year = int(parts[2])
-                end_year = int(parts[3])
-                start_date = datetime(start_year, 1, 21).date()
-                end_date = datetime(end_year, 1, 20).date()
-                if start_date <= date_obj <= end_date:
-                    return os.path.join(ARCHIVE_DIR, filename)
-            except:
-                continue
-    return None
+    filename, _ = find_archive_for_date(date_obj)
+    return os.path.join(ARCHIVE_DIR, filename) if filename else None
+
+def bbox_around(lat, lon, radius_km):
+    """Bbox (lon_min, lat_min, lon_max, lat_max) englobant le cercle de rayon radius_km."""
+    dlat = radius_km / 111.0
+    dlon = radius_km / (111.0 * max(np.cos(np.radians(lat)), 1e-6))
+    return lon - dlon, max(lat - dlat, -90.0), lon + dlon, min(lat + dlat, 90.0)
+
+def filter_within_radius(df, lat, lon, radius_km):
+    """
+    Garde les détections à moins de radius_km de (lat, lon) et ajoute la colonne `distance`.
+    Pré-filtre bbox peu coûteux (écart de longitude ramené dans [-180, 180]) puis haversine vectorisée.
+    """
+    lats = df["latitude"].to_numpy(dtype=float)
+    lons = df["longitude"].to_numpy(dtype=float)
+    _, lat_min, _, lat_max = bbox_around(lat, lon, radius_km)
+    dlon_max = radius_km / (111.0 * max(np.cos(np.radians(max(abs(lat_min), abs(lat_max)))), 1e-6))
+    dlon = (lons - lon + 180.0) % 360.0 - 180.0
+    candidates = np.flatnonzero((lats >= lat_min) & (lats <= lat_max) & (np.abs(dlon) <= dlon_max))
+
+    distances = haversine(lat, lon, lats[candidates], lons[candidates])
+    keep = distances <= radius_km
+    out = df.iloc[candidates[keep]].copy()
+    out["distance"] = distances[keep]
+    return out
 
 def should_use_api(input_date_str):
     input_date = datetime.strptime(input_date_str, "%Y-%m-%d").date()
     return input_date >= (date.today() - timedelta(days=7))
 
-def detect_fire_near_city(date_str, city_name, radius_km=100):
-    date_obj = datetime.strptime(date_str, "%Y-%m-%d").date()
-    lat_city, lon_city = get_city_coordinates(city_name)
-    if lat_city is None:
-        return None
+def fire_source_for_date(date_str):
+    """Source FIRMS d'une date : flux NRT pour les 7 derniers jours, sinon nom de l'archive (ou None)."""
+    if should_use_api(date_str):
+        return f"{NRT_SOURCE}@{nrt_slice_version(date_str)}"
+    filename, _ = find_archive_for_date(datetime.strptime(date_str, "%Y-%m-%d").date())
+    return filename
 
-    use_api = should_use_api(date_str)
+def load_fire_day(date_str, bbox=None):
+    """
+    Charge les détections FIRMS d'une journée (API NRT ou archive), limitées à `bbox` si possible.
+    Retourne (source, df) ou (None, None) si aucune donnée n'est disponible.
+    """
+    date_obj = datetime.strptime(date_str, "%Y-%m-%d").date()
 
-    if use_api:
-        url = f'https://firms.modaps.eosdis.nasa.gov/api/area/csv/{MAP_KEY}/VIIRS_NOAA20_NRT/world/3'
+    if should_use_api(date_str):
+        source = f"{NRT_SOURCE}@{nrt_slice_version(date_str)}"
         try:
-            df = pd.read_csv(url)
+            # Tranche du jour en cache local ; seule la zone demandée est téléchargée si possible
+            df = load_nrt_day(date_str, bbox)
         except:
-            return None
+            return None, None
     else:
-        file_path = find_archive_file_for_date(date_obj)
-        if not file_path:
-            return None
+        filename, entry = find_archive_for_date(date_obj)
+        if not filename:
+            return None, None
+        source = filename
         try:
-            df = pd.read_csv(file_path)
+            if entry.get("ingested"):
+                # Archive convertie : on ne lit que les partitions de la date et de la zone
+                df = read_fires(date_str, bbox)
+                if df is None:
+                    return None, None
+            else:
+                df = pd.read_csv(os.path.join(ARCHIVE_DIR, filename))
         except:
-            return None
+            return None, None
 
     if "acq_date" not in df.columns or "latitude" not in df.columns or "longitude" not in df.columns:
-        return None
+        return None, None
 
-    df = df[df["acq_date"] == date_str].copy()
+    df = df[df["acq_date"] == date_str].reset_index(drop=True)
     if df.empty:
+        return None, None
+    return source, df
+
+def detect_fire_near_city(date_str, city_name, radius_km=100):
+    lat_city, lon_city = get_city_coordinates(city_name)
+    if lat_city is None:
         return None
 
-    df["distance"] = df.apply(lambda row: haversine(lat_city, lon_city, row["latitude"], row["longitude"]), axis=1)
-    df_filtered = df[df["distance"] <= radius_km]
-
-    m = folium.Map(location=[lat_city, lon_city], zoom_start=7)
-    for _, row in df_filtered.iterrows():
-        popup = f"Brightness: {row.get('brightness', row.get('bright_ti4', 'N/A'))}, Date: {row['acq_date']}, Time: {row['acq_time']}"
-        folium.CircleMarker(
-            location=[row['latitude'], row['longitude']],
-            radius=5,
-            color='red',
-            fill=True,
-            fill_color='red',
-            fill_opacity=0.7,
-            popup=popup
-        ).add_to(m)
-
-    filename = f"incendies_{city_name.lower().replace(' ', '_')}_{date_str}.html"
-    m.save(filename)
-    return filename, len(df_filtered)
-
-import re
-
-def extract_params_from_text(text):
+    _, df = load_fire_day(date_str, bbox_around(lat_city, lon_city, radius_km))
+    if df is None:
+        return None
+
+    df_filtered = filter_within_radius(df, lat_city, lon_city, radius_km)
+
+    # Même ville / date / rayon / version des données → carte déjà générée réutilisée
+    map_id = artifact_id(f"incendies_{city_name}_{date_str}", {
+        "date": date_str, "lat": round(lat_city, 5), "lon": round(lon_city, 5),
+        "radius_km": radius_km, "source": fire_source_for_date(date_str),
+    })
+
+    # Carte produite à la première consultation seulement (voir artifacts.ARTIFACT_RENDER)
+    def render(path):
+        m = folium.Map(location=[lat_city, lon_city], zoom_start=7)
+        brightness_col = "brightness" if "brightness" in df_filtered else "bright_ti4" if "bright_ti4" in df_filtered else None
+        brightness = df_filtered[brightness_col].astype(str) if brightness_col else "N/A"
+        popups = ("Brightness: " + brightness + ", Date: " + df_filtered["acq_date"].astype(str)
+                  + ", Time: " + df_filtered["acq_time"].astype(str))
+        add_points_layer(m, df_filtered["latitude"].to_numpy(), df_filtered["longitude"].to_numpy(), popups=popups, name="Incendies")
+        m.save(path)
+
+    defer_artifact(map_id, render, nbytes=int(df_filtered.memory_usage(deep=True).sum()))
+    return map_id, len(df_filtered)
+
+# ---------- Index spatial par journée (requêtes multi-villes) ----------
+class FireGridIndex:
     """
-    Extrait une date (YYYY-MM-DD), une ville, et un rayon depuis un texte libre.
+    Grille de cellules de CELL_DEG degrés sur les détections d'une journée :
+    les points sont triés par cellule, une requête de rayon ne regarde que les cellules
+    touchées par sa bbox (recherche dichotomique) puis applique le filtre haversine.
     """
-    date_match = re.search(r'\b(\d{4}-\d{2}-\d{2})\b', text)
-    date_str = date_match.group(1) if date_match else None
-
-    rayon_match = re.search(r'(\d+)\s?km', text)
-    rayon_km = int(rayon_match.group(1)) if rayon_match else 100  # défaut 100 km
-
-    # 🔁 Amélioration : recherche du mot de type ville au début si pas de préposition détectée
-    ville_match = re.search(r"(?:à|dans|autour de|près de|proche de|vers)\s+([A-Za-zÀ-ÖØ-öø-ÿ\s\-']+)", text)
-    
-    if not ville_match:
-        # Si pas de préposition, on tente de prendre le premier mot alphabétique avant la date
-        if date_match:
-            possible_ville = text[:date_match.start()].strip()
-            if possible_ville:
-                ville = possible_ville
-            else:
-                ville = None
+    CELL_DEG = 1.0
+
+    def __init__(self, df):
+        self.n_lon = int(round(360 / self.CELL_DEG))
+        cells = self._cell_ids(df["latitude"].to_numpy(dtype=float), df["longitude"].to_numpy(dtype=float))
+        order = np.argsort(cells, kind="stable")
+        self.cells = cells[order]
+        self.df = df.iloc[order].reset_index(drop=True)
+
+    def _cell_ids(self, lats, lons):
+        row = np.floor((np.clip(lats, -90, 89.999) + 90) / self.CELL_DEG).astype(np.int64)
+        col = np.floor(((lons + 180) % 360) / self.CELL_DEG).astype(np.int64)
+        return row * self.n_lon + col
+
+    def query(self, lat, lon, radius_km):
+        _, lat_min, _, lat_max = bbox_around(lat, lon, radius_km)
+        rows = np.arange(np.floor((lat_min + 90) / self.CELL_DEG), np.floor((min(lat_max, 89.999) + 90) / self.CELL_DEG) + 1, dtype=np.int64)
+        dlon = radius_km / (111.0 * max(np.cos(np.radians(max(abs(lat_min), abs(lat_max)))), 1e-6))
+        if 2 * dlon >= 360:
+            cols = np.arange(self.n_lon, dtype=np.int64)
         else:
-            ville = None
-    else:
-        ville = ville_match.group(1).strip()
+            first = np.floor(((lon - dlon + 180) % 360) / self.CELL_DEG)
+            cols = (first + np.arange(int(np.ceil(2 * dlon / self.CELL_DEG)) + 2)).astype(np.int64) % self.n_lon
+        wanted = np.unique((rows[:, None] * self.n_lon + cols[None, :]).ravel())
+
+        starts = np.searchsorted(self.cells, wanted, side="left")
+        ends = np.searchsorted(self.cells, wanted, side="right")
+        hits = ends > starts
+        if not hits.any():
+            return self.df.iloc[0:0].assign(distance=pd.Series(dtype=float))
+        candidates = np.concatenate([np.arange(s, e) for s, e in zip(starts[hits], ends[hits])])
+        return filter_within_radius(self.df.iloc[candidates], lat, lon, radius_km)
+
+_fire_index_cache = {}
+FIRE_INDEX_CACHE_SIZE = 8
+
+def get_fire_index(date_str):
+    """Index spatial des détections du jour, construit une fois par (source, date) et mis en cache."""
+    key = (fire_source_for_date(date_str), date_str)
+    if key[0] is None:
+        return None
+    if key not in _fire_index_cache:
+        _, df = load_fire_day(date_str)
+        if df is None:
+            return None
+        if len(_fire_index_cache) >= FIRE_INDEX_CACHE_SIZE:
+            _fire_index_cache.pop(next(iter(_fire_index_cache)))
+        _fire_index_cache[key] = FireGridIndex(df)
+    return _fire_index_cache[key]
+
+def detect_fires_for_cities(date_str, cities):
+    """
+    Version batch de detect_fire_near_city : `cities` est une liste de (ville, rayon_km).
+    Retourne une liste de dicts {city, radius_km, count, points} (points = DataFrame des détections).
+    """
+    index = get_fire_index(date_str)
+    results = []
+    for city_name, radius_km in cities:
+        lat_city, lon_city = get_city_coordinates(city_name)
+        if lat_city is None or index is None:
+            results.append({"city": city_name, "radius_km": radius_km, "count": None, "points": None})
+            continue
+        points = index.query(lat_city, lon_city, radius_km)
+        results.append({"city": city_name, "radius_km": radius_km, "count": len(points), "points": points})
+    return results
 
-    return date_str, ville, rayon_km
 
 from langchain.tools import tool
 
@@ -159,6 +238,8 @@ def detect_fire_tool(query_text: str) -> str:
 
         if not date_str or not ville:
             return "❌ Veuillez préciser une **ville** et une **date au format YYYY-MM-DD** dans votre requête."
+        if get_city_coordinates(ville)[0] is None:
+            return f"❌ Ville '{ville}' introuvable."
 
         resultat = detect_fire_near_city(date_str, ville, rayon_km)
         if not resultat:
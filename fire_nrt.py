@@ -0,0 +1,131 @@
+#fire_nrt.py
+# Cache local des détections FIRMS NRT : une tranche CSV par jour (ou par jour + bbox),
+# une tranche est rafraîchie (requêtes conditionnelles) tant qu'elle n'a pas été téléchargée après la clôture
+# de sa journée UTC (acq_date FIRMS) plus la latence de traitement NRT.
+import json
+import math
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import requests
+
+FIRMS_API_URL = os.getenv("FIRMS_API_URL", "https://firms.modaps.eosdis.nasa.gov/api/area/csv")
+MAP_KEY = os.getenv("FIRMS_MAP_KEY", "f44596f0cc01c26985abd6bfff78ac92")
+NRT_SOURCE = "VIIRS_NOAA20_NRT"
+NRT_CACHE_DIR = os.getenv("FIRMS_NRT_CACHE_DIR", "firms_nrt_cache")
+NRT_REFRESH_SECONDS = 3 * 3600  # le jour courant est re-vérifié au plus toutes les 3 h
+NRT_FINAL_LATENCY = 6 * 3600  # délai après minuit UTC au-delà duquel une journée NRT est considérée complète
+
+_session = requests.Session()
+_stats = {"requests": 0, "not_modified": 0, "bytes_downloaded": 0, "cache_hits": 0, "stale_served": 0}
+
+
+def _area_key(bbox):
+    if bbox is None:
+        return "world"
+    # Arrondi vers l'extérieur au dixième de degré : des bbox voisines partagent la même tranche
+    lon_min, lat_min, lon_max, lat_max = bbox
+    if lon_min < -180 or lon_max > 180:
+        return "world"  # bbox à cheval sur l'antiméridien
+    return ",".join(f"{v:.1f}" for v in (
+        max(-180.0, math.floor(lon_min * 10) / 10), max(-90.0, math.floor(lat_min * 10) / 10),
+        min(180.0, math.ceil(lon_max * 10) / 10), min(90.0, math.ceil(lat_max * 10) / 10)))
+
+def _slice_paths(date_str, area):
+    base = os.path.join(NRT_CACHE_DIR, date_str, area.replace(",", "_"))
+    return base + ".csv", base + ".json"
+
+def _final_after(date_str):
+    """Horodatage à partir duquel la journée UTC `date_str` est complète côté FIRMS."""
+    day_end = datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=timezone.utc) + timedelta(days=1)
+    return day_end.timestamp() + NRT_FINAL_LATENCY
+
+def nrt_slice_version(date_str):
+    """Identifiant de fraîcheur d'une journée NRT : stable pour les jours complets, change à chaque période de rafraîchissement sinon."""
+    if time.time() >= _final_after(date_str):
+        return "final"
+    return str(int(time.time() // NRT_REFRESH_SECONDS))
+
+def _check_firms_csv(content):
+    # Pages d'erreur (clé invalide, quota dépassé, HTML) : jamais mises en cache
+    header = content.split(b"\n", 1)[0].lower()
+    if b"latitude" not in header or b"longitude" not in header:
+        raise ValueError(f"Réponse FIRMS invalide : {content[:200].decode('utf-8', 'replace')}")
+
+
+def _fetch_slice(date_str, area):
+    csv_path, meta_path = _slice_paths(date_str, area)
+    meta = {}
+    if os.path.exists(meta_path):
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+    headers = {}
+    if os.path.exists(csv_path):
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    url = f"{FIRMS_API_URL}/{MAP_KEY}/{NRT_SOURCE}/{area}/1/{date_str}"
+    response = _session.get(url, headers=headers, timeout=60)
+    _stats["requests"] += 1
+    if response.status_code == 304:
+        _stats["not_modified"] += 1
+    else:
+        response.raise_for_status()
+        _check_firms_csv(response.content)
+        _stats["bytes_downloaded"] += len(response.content)
+        os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+        with open(csv_path, "wb") as f:
+            f.write(response.content)
+        meta = {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
+
+    # Contenu confirmé à jour à cet instant (téléchargé ou 304)
+    meta["checked"] = meta["fetched_at"] = time.time()
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    return csv_path
+
+def _is_fresh(date_str, area):
+    csv_path, meta_path = _slice_paths(date_str, area)
+    if not os.path.exists(csv_path) or not os.path.exists(meta_path):
+        return False
+    with open(meta_path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    # Tranche définitive seulement si elle a été obtenue après la clôture de la journée
+    if meta.get("fetched_at", 0) >= _final_after(date_str):
+        return True
+    return time.time() - meta.get("checked", 0) < NRT_REFRESH_SECONDS
+
+
+def load_nrt_day(date_str, bbox=None):
+    """
+    Détections NRT d'une journée. Si la tranche mondiale du jour est en cache, elle sert pour toute bbox ;
+    sinon, quand une bbox est fournie, seule la zone demandée est téléchargée.
+    """
+    if _is_fresh(date_str, "world"):
+        _stats["cache_hits"] += 1
+        return pd.read_csv(_slice_paths(date_str, "world")[0])
+
+    area = _area_key(bbox)
+    if _is_fresh(date_str, area):
+        _stats["cache_hits"] += 1
+        return pd.read_csv(_slice_paths(date_str, area)[0])
+
+    try:
+        return pd.read_csv(_fetch_slice(date_str, area))
+    except (requests.RequestException, ValueError):
+        # FIRMS indisponible ou réponse invalide : on sert la dernière tranche connue (zone, puis monde)
+        for cached in (area, "world"):
+            csv_path = _slice_paths(date_str, cached)[0]
+            if os.path.exists(csv_path):
+                _stats["stale_served"] += 1
+                return pd.read_csv(csv_path)
+        raise
+
+def get_nrt_stats():
+    """Compteurs du cache NRT (requêtes, 304, octets téléchargés, hits, tranches expirées servies)."""
+    return dict(_stats)
@@ -1,13 +1,20 @@
 # flood.py
 import requests
 import pycountry
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
 import dateparser
 from datetime import datetime
 from typing import Optional
 import folium
 import re
-from geopy.geocoders import Nominatim
-import time
+import asyncio
+from async_http import get_async_client
+from tools_geocode import geocode_coordinates
+from artifacts import artifact_id, defer_artifact
 from langchain.tools import tool
 
 # ✅ Tous les types de catastrophes pris en charge
@@ -33,37 +40,139 @@ def get_emdat_by_iso3(iso3_code):
     except Exception:
         return None
 
-def filter_disasters_between_dates(events, start_date, end_date, disaster_type="flood"):
-    filtered = []
-    for event in events:
-        # Gestion spéciale pour accidents industriels et transport
-        if disaster_type == "industrial accident":
-            if event.get("subgroupname", "").lower() != "industrial accident":
-                continue
-        elif disaster_type == "transport":
-            if event.get("subgroupname", "").lower() != "transport":
-                continue
-        else:
-            if event.get("disastertype", "").lower() != disaster_type:
+async def aget_emdat_by_iso3(iso3_code):
+    """Variante async de get_emdat_by_iso3."""
+    url = f"https://www.gdacs.org/gdacsapi/api/Emdat/getemdatbyiso3?iso3={iso3_code}"
+    try:
+        response = await get_async_client().get(url, timeout=10)
+        response.raise_for_status()
+        return response.json()
+    except Exception:
+        return None
+
+# ---------- Table d'événements pré-normalisée (cache par ISO3) ----------
+EMDAT_CACHE_DIR = os.getenv("EMDAT_CACHE_DIR", "emdat_cache")
+EMDAT_CACHE_TTL = 7 * 24 * 3600  # les données EM-DAT évoluent peu : rafraîchissement hebdomadaire
+EMDAT_RETRY_SECONDS = 15 * 60  # copie expirée servie faute de GDACS : nouvel essai après ce délai
+
+def _event_dates(event):
+    start_event = datetime(
+        event.get("startyear", 0),
+        event.get("startmonth", 0),
+        event.get("startday", 0) or 1
+    ).date()
+    end_event = datetime(
+        event.get("endyear", 0) or event.get("startyear", 0),
+        event.get("endmonth", 0) or event.get("startmonth", 0),
+        event.get("endday", 0) or event.get("startday", 0) or 1
+    ).date()
+    return start_event, end_event
+
+def _type_key(disaster_type):
+    # Accidents industriels et transport sont filtrés sur le sous-groupe, les autres sur le type
+    if disaster_type in ("industrial accident", "transport"):
+        return "subgroupname", disaster_type
+    return "disastertype", disaster_type
+
+
+class EmdatEventTable:
+    """
+    Événements EM-DAT d'un pays sous forme colonne : dates de début/fin déjà parsées,
+    type et sous-groupe normalisés, et pour chaque type un index trié par date de début :
+    une requête d'intervalle coupe par dichotomie puis ne compare que les dates de fin restantes.
+    """
+
+    def __init__(self, events):
+        rows = []
+        for i, event in enumerate(events):
+            try:
+                start_event, end_event = _event_dates(event)
+            except Exception:
                 continue
+            rows.append({
+                "row": i,
+                "disastertype": (event.get("disastertype") or "").strip().lower(),
+                "subgroupname": (event.get("subgroupname") or "").strip().lower(),
+                "start": np.datetime64(start_event, "D"),
+                "end": np.datetime64(end_event, "D"),
+            })
+        self.events = events
+        self.table = pd.DataFrame(rows, columns=["row", "disastertype", "subgroupname", "start", "end"])
+        self._index = {}
+        for column in ("disastertype", "subgroupname"):
+            for value, group in self.table.groupby(column):
+                group = group.sort_values("start", kind="stable")
+                starts = group["start"].to_numpy(dtype="datetime64[D]")
+                ends = group["end"].to_numpy(dtype="datetime64[D]")
+                self._index[(column, value)] = (starts, ends, group["row"].to_numpy())
+
+    def filter(self, start_date, end_date, disaster_type="flood"):
+        entry = self._index.get(_type_key(disaster_type))
+        if entry is None:
+            return []
+        starts, ends, rows = entry
+        # Événements commençant au plus tard à end_date, puis ceux qui finissent après start_date
+        stop = np.searchsorted(starts, np.datetime64(end_date, "D"), side="right")
+        keep = ends[:stop] >= np.datetime64(start_date, "D")
+        return [self.events[r] for r in np.sort(rows[:stop][keep])]
+
+
+_emdat_tables = {}
+
+def _cached_emdat_table(iso3_code):
+    """Table encore valide en mémoire ou sur disque, sinon None (il faut interroger GDACS)."""
+    cached = _emdat_tables.get(iso3_code)
+    if cached and time.time() - cached[0] < EMDAT_CACHE_TTL:
+        return cached[1]
+
+    cache_file = os.path.join(EMDAT_CACHE_DIR, f"{iso3_code}.json")
+    if os.path.exists(cache_file) and time.time() - os.path.getmtime(cache_file) < EMDAT_CACHE_TTL:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            events = json.load(f)
+        if events:
+            table = EmdatEventTable(events)
+            _emdat_tables[iso3_code] = (os.path.getmtime(cache_file), table)
+            return table
+    return None
 
-        try:
-            start_event = datetime(
-                event.get("startyear", 0),
-                event.get("startmonth", 0),
-                event.get("startday", 0) or 1
-            ).date()
-            end_event = datetime(
-                event.get("endyear", 0) or event.get("startyear", 0),
-                event.get("endmonth", 0) or event.get("startmonth", 0),
-                event.get("endday", 0) or event.get("startday", 0) or 1
-            ).date()
-        except Exception:
-            continue
-
-        if start_event <= end_date and end_event >= start_date:
-            filtered.append(event)
-    return filtered
+def _store_emdat_table(iso3_code, events):
+    """Enregistre la réponse GDACS et construit la table ; sert la copie expirée si GDACS n'a rien renvoyé."""
+    cache_file = os.path.join(EMDAT_CACHE_DIR, f"{iso3_code}.json")
+    fetched = time.time()
+    if events:
+        os.makedirs(EMDAT_CACHE_DIR, exist_ok=True)
+        with open(cache_file, "w", encoding="utf-8") as f:
+            json.dump(events, f)
+    elif os.path.exists(cache_file):
+        # GDACS indisponible : on sert la copie expirée plutôt que rien, considérée valide
+        # seulement EMDAT_RETRY_SECONDS (et non un TTL complet) avant d'interroger à nouveau GDACS
+        with open(cache_file, "r", encoding="utf-8") as f:
+            events = json.load(f)
+        fetched = time.time() - EMDAT_CACHE_TTL + EMDAT_RETRY_SECONDS
+
+    if not events:
+        return None
+    table = EmdatEventTable(events)
+    _emdat_tables[iso3_code] = (fetched, table)
+    return table
+
+def get_emdat_table(iso3_code):
+    """Table d'événements pour un ISO3 : mémoire, puis cache disque (TTL), puis GDACS."""
+    table = _cached_emdat_table(iso3_code)
+    if table is not None:
+        return table
+    return _store_emdat_table(iso3_code, get_emdat_by_iso3(iso3_code))
+
+async def aget_emdat_table(iso3_code):
+    """Variante async de get_emdat_table."""
+    table = _cached_emdat_table(iso3_code)
+    if table is not None:
+        return table
+    return _store_emdat_table(iso3_code, await aget_emdat_by_iso3(iso3_code))
+
+def filter_disasters_between_dates(events, start_date, end_date, disaster_type="flood"):
+    table = events if isinstance(events, EmdatEventTable) else EmdatEventTable(events)
+    return table.filter(start_date, end_date, disaster_type)
 
 def format_event_human_readable(event):
     start_date = f"{event.get('startday', '?')}/{event.get('startmonth', '?')}/{event.get('startyear', '?')}"
@@ -117,18 +226,62 @@ def extract_dates_from_text(date_text: str) -> Optional[tuple[datetime.date, dat
     
     return None
 
-def generate_disaster_map(events, disaster_type="flood", country="Unknown", start_date=None, map_filename=None):
-    # Forcer toujours le nom du fichier à 'map.html'
-    map_filename = "map.html"
+def _event_places(event):
+    location_name = event.get("location")
+    if not location_name:
+        return []
+    country_name = event.get("country", "")
+    return [f"{p.strip()}, {country_name}" for p in re.split(',|;', location_name) if p.strip()]
 
-    map_ = folium.Map(location=[45, 10], zoom_start=4)
-    geolocator = Nominatim(user_agent="disaster_mapper")
+def resolve_event_locations(events):
+    """
+    Étape de résolution avant la carte : une position (lat, lon) ou None par événement.
+    Les coordonnées fournies par EM-DAT sont utilisées telles quelles ; sinon les lieux de l'événement
+    sont essayés dans l'ordre, chaque nom distinct n'étant géocodé qu'une fois (cache persistant partagé).
+    """
+    resolved = {}
 
+    def lookup(place):
+        if place not in resolved:
+            try:
+                resolved[place] = geocode_coordinates(place)
+            except Exception as e:
+                print(f"Erreur géocodage pour {place}: {e}")
+                resolved[place] = (None, None)
+        return resolved[place]
+
+    positions = []
     for event in events:
+        position = None
+        lat, lon = event.get("latitude"), event.get("longitude")
+        if lat and lon:
+            try:
+                position = (float(lat), float(lon))
+            except (TypeError, ValueError):
+                pass
+        if position is None:
+            for place in _event_places(event):
+                place_lat, place_lon = lookup(place)
+                if place_lat is not None:
+                    position = (place_lat, place_lon)
+                    break
+        positions.append(position)
+    return positions
+
+def generate_disaster_map(events, disaster_type="flood", country="Unknown", start_date=None, map_filename=None):
+    # Identifiant dérivé des événements affichés : une requête identique réutilise la carte existante.
+    # Géocodage des lieux et rendu différés jusqu'à la consultation de la carte (voir artifacts.ARTIFACT_RENDER).
+    map_filename = artifact_id(f"{disaster_type}_map_{country}_{start_date or 'unknown_date'}",
+                               {"type": disaster_type, "country": country, "events": events})
+    return defer_artifact(map_filename, lambda path: _render_disaster_map(events, disaster_type, path))
+
+def _render_disaster_map(events, disaster_type, map_filename):
+    positions = resolve_event_locations(events)
+    map_ = folium.Map(location=[45, 10], zoom_start=4)
+
+    for event, position in zip(events, positions):
         location_name = event.get("location")
         country_name = event.get("country", "")
-        lat = event.get("latitude")
-        lon = event.get("longitude")
 
         start = f"{event.get('startday', '?')}/{event.get('startmonth', '?')}/{event.get('startyear', '?')}"
         end = f"{event.get('endday', '?')}/{event.get('endmonth', '?')}/{event.get('endyear', '?')}"
@@ -144,37 +297,14 @@ def generate_disaster_map(events, disaster_type="flood", country="Unknown", star
             "transport": "purple"
         }.get(disaster_type, "gray")
 
-        if lat and lon:
-            try:
-                folium.Marker(
-                    location=[float(lat), float(lon)],
-                    popup=popup_text,
-                    icon=folium.Icon(color=icon_color, icon='info-sign')
-                ).add_to(map_)
-                continue
-            except:
-                pass
-
-        if location_name:
-            places = [p.strip() for p in re.split(',|;', location_name) if p.strip()]
-            for place in places:
-                try:
-                    loc = geolocator.geocode(f"{place}, {country_name}", timeout=10)
-                    if loc:
-                        folium.Marker(
-                            location=[loc.latitude, loc.longitude],
-                            popup=popup_text,
-                            icon=folium.Icon(color=icon_color, icon='info-sign')
-                        ).add_to(map_)
-                        time.sleep(1)
-                        break
-                except Exception as e:
-                    print(f"Erreur géocodage pour {place}: {e}")
-                    continue
+        if position:
+            folium.Marker(
+                location=list(position),
+                popup=popup_text,
+                icon=folium.Icon(color=icon_color, icon='info-sign')
+            ).add_to(map_)
 
     map_.save(map_filename)
-    print(f"✅ Carte générée : {map_filename} (ouvrez-la dans un navigateur)")
-    return map_filename
 
 
 @tool
@@ -186,6 +316,27 @@ def query_disaster_events_tool(params: str) -> str:
     
     params : texte libre comme "France 2015-06-29 temperature"
     """
+    query = _parse_disaster_query(params)
+    if isinstance(query, str):
+        return query
+
+    events = get_emdat_table(query[1])
+    return _disaster_answer(*query, events)
+
+
+async def aquery_disaster_events_tool(params: str) -> str:
+    """Implémentation async de query_disaster_events_tool (utilisée via ainvoke)."""
+    query = _parse_disaster_query(params)
+    if isinstance(query, str):
+        return query
+
+    events = await aget_emdat_table(query[1])
+    # La carte (géocodage limité à 1 req/s, écriture HTML) reste hors de la boucle d'événements
+    return await asyncio.to_thread(_disaster_answer, *query, events)
+
+
+def _parse_disaster_query(params):
+    """(pays, iso3, date_début, date_fin, type) ou message d'erreur."""
     # -----------------------
     # Parse du texte libre
     # -----------------------
@@ -222,15 +373,17 @@ def query_disaster_events_tool(params: str) -> str:
     if not dates:
         return f"❌ Impossible d'interpréter la date ou la plage de dates à partir de : '{date_expression}'"
     start_date, end_date = dates
+    return country_name, iso3, start_date, end_date, disaster_type
+
 
+def _disaster_answer(country_name, iso3, start_date, end_date, disaster_type, events):
     # -----------------------
     # Récupération des événements
     # -----------------------
-    events = get_emdat_by_iso3(iso3)
     if not events:
         return f"❌ Aucune donnée trouvée pour le pays '{country_name}' (code {iso3})."
 
-    filtered = filter_disasters_between_dates(events, start_date, end_date, disaster_type)
+    filtered = events.filter(start_date, end_date, disaster_type)
     if not filtered:
         return f"✅ Aucun événement '{disaster_type}' trouvé en {country_name} entre {start_date} et {end_date}."
 
@@ -249,6 +402,6 @@ def query_disaster_events_tool(params: str) -> str:
         result += format_event_human_readable(e) + "\n"
 
     if map_file:
-        result += f"\n🗺️ Une carte a été générée : {map_file}"
+        result += f"\n🗺️ Carte : {map_file}"
 
     return result
\ No newline at end of file
@@ -1,5 +1,8 @@
 import requests
+import httpx
 from langchain.tools import tool
+from tools_geocode import nominatim_search, anominatim_search
+from async_http import get_async_client
 
 # --- Infos Pays ---
 def get_country_info(country_name: str):
@@ -8,7 +11,16 @@ def get_country_info(country_name: str):
     response = requests.get(url)
     if response.status_code != 200:
         return None
-    data = response.json()[0]
+    return _country_info(response.json()[0])
+
+async def aget_country_info(country_name: str):
+    """Variante async de get_country_info."""
+    response = await get_async_client().get(f"https://restcountries.com/v3.1/name/{country_name}")
+    if response.status_code != 200:
+        return None
+    return _country_info(response.json()[0])
+
+def _country_info(data):
     info = {
         "Type": "Pays",
         "Nom": data.get("name", {}).get("common"),
@@ -26,13 +38,13 @@ def get_country_info(country_name: str):
 # --- Infos Ville (Nominatim + Wikidata) ---
 def get_city_info(city_name: str):
     """Retourne les informations principales d'une ville via Nominatim + Wikidata (population)"""
-    url = f"https://nominatim.openstreetmap.org/search?city={city_name}&format=json&addressdetails=1&limit=1&extratags=1"
-    headers = {"User-Agent": "GeoApp/1.0"}  # requis par Nominatim
-    response = requests.get(url, headers=headers)
-    if response.status_code != 200 or not response.json():
+    try:
+        results = nominatim_search(city=city_name, addressdetails=1, extratags=1)
+    except requests.RequestException:
         return None
-    data = response.json()[0]
-    address = data.get("address", {})
+    if not results:
+        return None
+    data = results[0]
 
     # population via Nominatim si dispo
     population = data.get("extratags", {}).get("population")
@@ -44,15 +56,43 @@ def get_city_info(city_name: str):
             wikidata_url = f"https://www.wikidata.org/wiki/Special:EntityData/{wikidata_id}.json"
             r = requests.get(wikidata_url)
             if r.status_code == 200:
-                wd = r.json()
-                entity = wd.get("entities", {}).get(wikidata_id, {})
-                claims = entity.get("claims", {})
-                pop_claims = claims.get("P1082")  # P1082 = population
-                if pop_claims:
-                    population = pop_claims[0].get("mainsnak", {}).get("datavalue", {}).get("value", {}).get("amount")
-                    if population:
-                        population = int(population.replace("+", ""))
+                population = _wikidata_population(r.json(), wikidata_id)
 
+    return _city_info(data, population)
+
+async def aget_city_info(city_name: str):
+    """Variante async de get_city_info."""
+    try:
+        results = await anominatim_search(city=city_name, addressdetails=1, extratags=1)
+    except httpx.HTTPError:
+        return None
+    if not results:
+        return None
+    data = results[0]
+
+    population = data.get("extratags", {}).get("population")
+    if not population:
+        wikidata_id = data.get("extratags", {}).get("wikidata")
+        if wikidata_id:
+            wikidata_url = f"https://www.wikidata.org/wiki/Special:EntityData/{wikidata_id}.json"
+            r = await get_async_client().get(wikidata_url)
+            if r.status_code == 200:
+                population = _wikidata_population(r.json(), wikidata_id)
+
+    return _city_info(data, population)
+
+def _wikidata_population(wd, wikidata_id):
+    entity = wd.get("entities", {}).get(wikidata_id, {})
+    claims = entity.get("claims", {})
+    pop_claims = claims.get("P1082")  # P1082 = population
+    if pop_claims:
+        population = pop_claims[0].get("mainsnak", {}).get("datavalue", {}).get("value", {}).get("amount")
+        if population:
+            return int(population.replace("+", ""))
+    return None
+
+def _city_info(data, population):
+    address = data.get("address", {})
     info = {
         "Type": "Ville",
         "Nom": data.get("display_name"),
@@ -97,3 +137,16 @@ def geo_info_tool(name: str) -> str:
     return summary
 
 
+
+
+async def ageo_info_tool(name: str) -> str:
+    """Implémentation async de geo_info_tool (utilisée via ainvoke)."""
+    info = await aget_country_info(name)
+    if not info:
+        info = await aget_city_info(name)
+
+    if not info:
+        return f"Aucun résultat trouvé pour '{name}'."
+
+    summary = "\n".join([f"{k} : {v}" for k, v in info.items()])
+    return summary
@@ -1,21 +1,44 @@
 #graph_main.py
-from langgraph.graph import StateGraph
-from nodes import create_agent_executor
+import asyncio
+import threading
+import time
+from functools import lru_cache
+from langgraph.graph import StateGraph, END
+from artifacts import set_artifact_render
+from async_http import aclose_async_client
+from nodes import (create_agent_executor, create_planner_llm, create_planner_node,
+                   create_fan_out_node, create_synthesis_node, route_after_planner)
+from tools_risk import get_all_tools
 from state_schema import MyStateSchema
 from translate import detect_language, translate_to_english, translate_from_english
+from response_cache import acached_answer, lookup_answer, store_answer, find_artifacts, note_agent_tools
+from router import route_query, aanswer_query
 
 
-graph_builder = StateGraph(state_schema=MyStateSchema)
+@lru_cache(maxsize=None)
+def get_app():
+    """Graphe compilé, construit à la première requête passant par le LLM (et non à l'import)."""
+    graph_builder = StateGraph(state_schema=MyStateSchema)
 
-graph_builder.add_node("agent_executor", create_agent_executor())
-graph_builder.set_entry_point("agent_executor")
-graph_builder.set_finish_point("agent_executor")
+    # planner → (fan_out → synthesize) si les appels sont indépendants, sinon agent ReAct
+    planner_llm = create_planner_llm()
+    tools = get_all_tools()
+    graph_builder.add_node("planner", create_planner_node(planner_llm, tools))
+    graph_builder.add_node("fan_out", create_fan_out_node(tools))
+    graph_builder.add_node("synthesize", create_synthesis_node(planner_llm))
+    graph_builder.add_node("agent_executor", create_agent_executor())
 
-app = graph_builder.compile()
+    graph_builder.set_entry_point("planner")
+    graph_builder.add_conditional_edges("planner", route_after_planner, ["fan_out", "agent_executor"])
+    graph_builder.add_edge("fan_out", "synthesize")
+    graph_builder.add_edge("synthesize", END)
+    graph_builder.add_edge("agent_executor", END)
+
+    return graph_builder.compile()
 
 def format_output(result):
     output = result.get("output", "")
-    intermediate = result.get("intermediate_steps", [])
+    intermediate = result.get("intermediate_steps") or []
     urls = []
 
     for step in intermediate:
@@ -33,16 +56,140 @@ def format_output(result):
     return output
 
 
-if __name__ == "__main__":
+async def arun_query(query: str):
+    """
+    Réponse en cache si la même intention a déjà été traitée. Requêtes structurées : tool direct via le routeur. Sinon `get_app().ainvoke` : les tools réseau
+    passent par leurs variantes async (client httpx partagé), plusieurs questions peuvent
+    donc être traitées en parallèle.
+    """
+    result, _ = await acached_answer(query, arun_agent)
+    return result
+
+
+async def arun_agent(query: str) -> str:
+    """Traduction + graphe LLM complet."""
+    lang = await asyncio.to_thread(detect_language, query)
+    translated_input = await asyncio.to_thread(translate_to_english, query)
+    result = await get_app().ainvoke({"input": translated_input})
+    note_agent_tools(result.get("intermediate_steps"))
+    output = format_output(result)
+    return await asyncio.to_thread(translate_from_english, output, lang)
+
+
+# ---------- Streaming ----------
+_stream_timings = []
+
+async def astream_query(query: str):
+    """
+    Version streaming de arun_query. Produit des événements dict au fil de l'exécution :
+    tool_start / tool_end, token (texte partiel du LLM, en anglais), artifact (carte HTML),
+    puis final (réponse traduite) avec le temps avant premier événement et la latence totale.
+    """
+    start = time.perf_counter()
+    first_event = None
+
+    def event(kind, **data):
+        nonlocal first_event
+        elapsed = time.perf_counter() - start
+        if first_event is None:
+            first_event = elapsed
+        return {"type": kind, "elapsed": elapsed, **data}
+
+    key, ttl_kind, result = await asyncio.to_thread(lookup_answer, query)
+    if result is None and route_query(query):
+        result, _ = await aanswer_query(query, None)
+        if result is not None:
+            store_answer(key, ttl_kind, result)
+
+    if result is None:
+        lang = await asyncio.to_thread(detect_language, query)
+        translated_input = await asyncio.to_thread(translate_to_english, query)
+        final_state = {}
+        tools_called = []
+        async for ev in get_app().astream_events({"input": translated_input}, version="v2"):
+            kind = ev["event"]
+            if kind == "on_tool_start":
+                tools_called.append(ev["name"])
+                yield event("tool_start", tool=ev["name"], input=ev["data"].get("input"))
+            elif kind == "on_tool_end":
+                output = ev["data"].get("output")
+                yield event("tool_end", tool=ev["name"])
+                for name in find_artifacts(str(output)):
+                    yield event("artifact", path=name)
+            elif kind == "on_llm_stream" and ev.get("metadata", {}).get("langgraph_node") != "planner":
+                chunk = ev["data"]["chunk"]
+                yield event("token", text=getattr(chunk, "text", str(chunk)))
+            elif kind == "on_chain_end" and not ev.get("parent_ids"):
+                final_state = ev["data"].get("output") or {}
+
+        result = await asyncio.to_thread(translate_from_english, format_output(final_state), lang)
+        store_answer(key, ttl_kind, result, tools=tools_called)
+
+    final = event("final", output=result)
+    final["ttfb"] = first_event
+    _stream_timings.append((first_event, final["elapsed"]))
+    yield final
+
+_stream_loop = None
+_stream_loop_lock = threading.Lock()
+_STREAM_DONE = object()
+
+def _get_stream_loop():
+    # Boucle unique, dans un thread dédié, pour toute la durée du processus : les clients liés à une boucle
+    # (httpx partagé, client async de l'OllamaLLM mis en cache par get_llm) restent valides d'une requête à l'autre.
+    global _stream_loop
+    with _stream_loop_lock:
+        if _stream_loop is None:
+            _stream_loop = asyncio.new_event_loop()
+            threading.Thread(target=_stream_loop.run_forever, name="stream-loop", daemon=True).start()
+    return _stream_loop
+
+def stream_query(query: str):
+    """Itérateur synchrone sur astream_query (pour Streamlit), exécuté sur la boucle d'événements partagée."""
+    loop = _get_stream_loop()
+    events = astream_query(query)
+
+    async def next_event():
+        try:
+            return await events.__anext__()
+        except StopAsyncIteration:
+            return _STREAM_DONE
+
+    try:
+        while True:
+            ev = asyncio.run_coroutine_threadsafe(next_event(), loop).result()
+            if ev is _STREAM_DONE:
+                break
+            yield ev
+    finally:
+        asyncio.run_coroutine_threadsafe(events.aclose(), loop).result()
+
+def get_stream_stats():
+    """Temps moyen avant premier événement (TTFB) et latence totale moyenne, en secondes."""
+    if not _stream_timings:
+        return {"queries": 0, "ttfb": 0.0, "total": 0.0}
+    return {
+        "queries": len(_stream_timings),
+        "ttfb": sum(t for t, _ in _stream_timings) / len(_stream_timings),
+        "total": sum(t for _, t in _stream_timings) / len(_stream_timings),
+    }
+
+
+async def main():
+    # Aucune interface n'affichera les cartes : elles sont écrites dès la réponse du tool
+    set_artifact_render("eager")
     print("🌍 Agent prêt, pose ta question (exit pour quitter)")
 
-    while True:
-        query = input("🧑 Toi : ")
-        if query.lower() in ["exit", "quit", "q"]:
-            break
-        lang = detect_language(query)
-        translated_input = translate_to_english(query)
-        result = app.invoke({"input": translated_input})
-        output = format_output(result)
-        translated_output = translate_from_english(output, lang)
-        print(f"✅ Réponse : {translated_output}")
\ No newline at end of file
+    try:
+        while True:
+            query = await asyncio.to_thread(input, "🧑 Toi : ")
+            if query.lower() in ["exit", "quit", "q"]:
+                break
+            translated_output = await arun_query(query)
+            print(f"✅ Réponse : {translated_output}")
+    finally:
+        await aclose_async_client()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
\ No newline at end of file
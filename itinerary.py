@@ -1,30 +1,37 @@
+import asyncio
 import requests
+import httpx
 import folium
 from langchain.tools import tool
+from tools_geocode import geocode_coordinates, ageocode_coordinates
+from map_render import simplify_line
+from artifacts import artifact_id, has_artifact, save_artifact
+from async_http import get_async_client
+
+OSRM_URL = "http://router.project-osrm.org/route/v1/driving"
+OSRM_PARAMS = {
+    "overview": "false",
+    "steps": "true",
+    "alternatives": "false",
+    "geometries": "geojson"
+}
 
 # ---------- Géocodage via Nominatim (OSM) ----------
 def geocode_place(place_name):
-    url = "https://nominatim.openstreetmap.org/search"
-    params = {"q": place_name, "format": "json", "limit": 1}
-    r = requests.get(url, params=params, headers={"User-Agent": "route-steps-app"})
-    r.raise_for_status()
-    data = r.json()
-    if not data:
-        return None, None
-    return float(data[0]["lat"]), float(data[0]["lon"])
+    return geocode_coordinates(place_name)
 
 
 # ---------- Itinéraire via OSRM (driving) ----------
 def get_route(origin, destination):
-    base = "http://router.project-osrm.org/route/v1/driving"
-    url = f"{base}/{origin[1]},{origin[0]};{destination[1]},{destination[0]}"
-    params = {
-        "overview": "false",
-        "steps": "true",
-        "alternatives": "false",
-        "geometries": "geojson"
-    }
-    r = requests.get(url, params=params, headers={"User-Agent": "route-steps-app"})
+    url = f"{OSRM_URL}/{origin[1]},{origin[0]};{destination[1]},{destination[0]}"
+    r = requests.get(url, params=OSRM_PARAMS, headers={"User-Agent": "route-steps-app"})
+    r.raise_for_status()
+    return r.json()
+
+async def aget_route(origin, destination):
+    """Variante async de get_route."""
+    url = f"{OSRM_URL}/{origin[1]},{origin[0]};{destination[1]},{destination[0]}"
+    r = await get_async_client().get(url, params=OSRM_PARAMS, headers={"User-Agent": "route-steps-app"})
     r.raise_for_status()
     return r.json()
 
@@ -111,6 +118,10 @@ def format_step(step):
 
 # ---------- Génération de carte ----------
 def create_map(lat1, lon1, lat2, lon2, route_data, start, end):
+    file_name = artifact_id(f"itineraire_{start}_{end}", [round(v, 5) for v in (lat1, lon1, lat2, lon2)])
+    if has_artifact(file_name):
+        return file_name
+
     m = folium.Map(location=[lat1, lon1], zoom_start=12)
     for leg in route_data.get("routes", []):
         for l in leg.get("legs", []):
@@ -118,14 +129,14 @@ def create_map(lat1, lon1, lat2, lon2, route_data, start, end):
             for step in l.get("steps", []):
                 geom = step.get("geometry", {}).get("coordinates", [])
                 coords.extend([(lat, lon) for lon, lat in geom])
+            coords = simplify_line(coords)
             if coords:
                 folium.PolyLine(coords, color="blue", weight=5, opacity=0.8).add_to(m)
 
     folium.Marker([lat1, lon1], tooltip=f"Départ: {start}", icon=folium.Icon(color="green")).add_to(m)
     folium.Marker([lat2, lon2], tooltip=f"Arrivée: {end}", icon=folium.Icon(color="red")).add_to(m)
 
-    file_name = "itineraire.html"
-    m.save(file_name)
+    save_artifact(file_name, m.save)
     return file_name
 
 
@@ -154,6 +165,29 @@ def get_route_info(query: str) -> str:
     except requests.RequestException as e:
         return f"❌ Erreur réseau : {e}"
 
+    return _route_summary(start, end, lat1, lon1, lat2, lon2, data)
+
+
+async def aget_route_info(query: str) -> str:
+    """Implémentation async de get_route_info (utilisée via ainvoke)."""
+    if "->" not in query:
+        return "Format attendu: 'Lieu de départ -> Destination'."
+
+    start, end = [x.strip() for x in query.split("->")]
+
+    (lat1, lon1), (lat2, lon2) = await asyncio.gather(ageocode_coordinates(start), ageocode_coordinates(end))
+    if not lat1 or not lon1 or not lat2 or not lon2:
+        return "❌ Lieu introuvable."
+
+    try:
+        data = await aget_route((lat1, lon1), (lat2, lon2))
+    except httpx.HTTPError as e:
+        return f"❌ Erreur réseau : {e}"
+
+    return await asyncio.to_thread(_route_summary, start, end, lat1, lon1, lat2, lon2, data)
+
+
+def _route_summary(start, end, lat1, lon1, lat2, lon2, data):
     if not data or data.get("code") != "Ok" or not data.get("routes"):
         return "❌ Impossible de calculer l'itinéraire."
 
@@ -0,0 +1,54 @@
+#map_render.py
+# Rendu léger des cartes Folium : un seul calque GeoJSON (ou FastMarkerCluster) pour un nuage de points,
+# une seule image PNG superposée pour un raster, au lieu d'un marqueur par point/pixel.
+import numpy as np
+import folium
+from folium.plugins import FastMarkerCluster
+from rasterio.transform import array_bounds
+
+POINT_CLUSTER_THRESHOLD = 20000  # au-delà, regroupement côté navigateur (FastMarkerCluster, sans popups)
+COORD_DECIMALS = 5  # ~1 m : suffisant pour l'affichage, réduit la taille du HTML
+
+
+def add_points_layer(m, lats, lons, popups=None, color="red", radius=5, name=None):
+    """Ajoute un nuage de points à la carte `m` sous forme d'une FeatureCollection GeoJSON (coordonnées en bloc)."""
+    lats = np.round(np.asarray(lats, dtype=float), COORD_DECIMALS)
+    lons = np.round(np.asarray(lons, dtype=float), COORD_DECIMALS)
+    if len(lats) == 0:
+        return m
+
+    if len(lats) > POINT_CLUSTER_THRESHOLD:
+        FastMarkerCluster(np.column_stack([lats, lons]).tolist(), name=name).add_to(m)
+        return m
+
+    coords = np.column_stack([lons, lats]).tolist()
+    popups = [None] * len(coords) if popups is None else list(popups)
+    features = [
+        {"type": "Feature", "geometry": {"type": "Point", "coordinates": c}, "properties": {"popup": p}}
+        for c, p in zip(coords, popups)
+    ]
+    folium.GeoJson(
+        {"type": "FeatureCollection", "features": features},
+        name=name,
+        marker=folium.CircleMarker(radius=radius, color=color, fill=True, fill_color=color, fill_opacity=0.7),
+        popup=folium.GeoJsonPopup(fields=["popup"], labels=False) if any(p is not None for p in popups) else None,
+    ).add_to(m)
+    return m
+
+def add_mask_overlay(m, mask, transform, color=(255, 0, 0), opacity=0.7, name=None):
+    """Superpose un masque booléen (raster géoréférencé par `transform`) sous forme d'une seule image PNG."""
+    height, width = mask.shape
+    west, south, east, north = array_bounds(height, width, transform)
+    rgba = np.zeros((height, width, 4), dtype=np.uint8)
+    rgba[mask] = (*color, int(255 * opacity))
+    folium.raster_layers.ImageOverlay(rgba, bounds=[[south, west], [north, east]], name=name).add_to(m)
+    return m
+
+def simplify_line(coords):
+    """Arrondit les coordonnées (lat, lon) d'une polyligne et supprime les points consécutifs identiques."""
+    if not coords:
+        return []
+    points = np.round(np.asarray(coords, dtype=float), COORD_DECIMALS)
+    keep = np.ones(len(points), dtype=bool)
+    keep[1:] = np.any(points[1:] != points[:-1], axis=1)
+    return points[keep].tolist()
@@ -1,9 +1,20 @@
 # nodes.py
+import asyncio
+import json
+import os
+import re
+from functools import lru_cache
 from langchain.tools import tool
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import RunnableLambda
 from langchain_ollama import OllamaLLM
 from langchain.agents import initialize_agent, AgentType
 from tools_risk import get_all_tools
-from prompts import get_prompt_config
+from prompts import system_prompt, select_examples, planner_prompt, synthesis_prompt
+
+PLANNER_MAX_CALLS = 4
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "mistral")
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")  # modèle gardé en mémoire entre deux requêtes
 
 
 from tools_risk import extract_bbox_and_dates, query_stac_catalog_with_retry
@@ -27,34 +38,137 @@ def build_query_params_from_input(user_input: str) -> str:
 
 
 
-def create_agent_executor():
-    # Récupérer le prompt
-    prompt_template = get_prompt_config("few_shot")
-    # Si c'est un PromptTemplate, on le formate, sinon on passe l'objet directement
-    if hasattr(prompt_template, "format") and callable(prompt_template.format):
-        system_prompt_str = prompt_template.format(input="Votre question ici")
-    else:
-        system_prompt_str = prompt_template
-
-    llm = OllamaLLM(
-        model="mistral",
-        temperature=0.1,
-        system_prompt=system_prompt_str,
-    )
+# ---------- Client LLM partagé ----------
+class LLMStatsHandler(BaseCallbackHandler):
+    """Relève, pour chaque appel Ollama, les tokens de prompt évalués et le temps avant le premier token."""
+
+    def __init__(self):
+        self.calls = []
+
+    def on_llm_end(self, response, **kwargs):
+        for generations in response.generations:
+            for generation in generations:
+                info = generation.generation_info or {}
+                if "prompt_eval_count" in info:
+                    # Durées Ollama en nanosecondes ; un préfixe déjà en cache KV n'est pas réévalué
+                    self.calls.append({
+                        "prompt_tokens": info.get("prompt_eval_count", 0),
+                        "ttft_ms": (info.get("load_duration", 0) + info.get("prompt_eval_duration", 0)) / 1e6,
+                    })
+
+_llm_stats = LLMStatsHandler()
 
+@lru_cache(maxsize=None)
+def get_llm(temperature=0.1):
+    """Client Ollama unique par température, réutilisé par l'agent, le planner et la synthèse."""
+    return OllamaLLM(model=OLLAMA_MODEL, temperature=temperature, keep_alive=OLLAMA_KEEP_ALIVE, callbacks=[_llm_stats])
+
+def get_llm_stats():
+    """Moyennes des tokens de prompt évalués et du temps avant premier token (ms) sur les appels LLM."""
+    calls = _llm_stats.calls
+    if not calls:
+        return {"calls": 0, "prompt_tokens": 0.0, "ttft_ms": 0.0}
+    return {
+        "calls": len(calls),
+        "prompt_tokens": sum(c["prompt_tokens"] for c in calls) / len(calls),
+        "ttft_ms": sum(c["ttft_ms"] for c in calls) / len(calls),
+    }
+
+
+def _with_examples(inputs):
+    query = inputs["input"] if isinstance(inputs, dict) else inputs.input
+    return {"input": query, "examples": select_examples(query)}
+
+def create_agent_executor():
+    # Préfixe système constant (réutilisé dans le cache KV d'Ollama d'un appel à l'autre) ;
+    # seuls les exemples few-shot proches de la question sont ajoutés, après ce préfixe.
     tools = get_all_tools()
 
     agent_executor = initialize_agent(
-        llm=llm,
+        llm=get_llm(0.1),
         tools=tools,
         agent=AgentType.STRUCTURED_CHAT_ZERO_SHOT_REACT_DESCRIPTION,
+        agent_kwargs={
+            "prefix": system_prompt,
+            "human_message_template": "Examples:\n{examples}\n\nQuestion: {input}\n\n{agent_scratchpad}",
+            "input_variables": ["input", "examples", "agent_scratchpad"],
+        },
         verbose=True,
         handle_parsing_errors=True,
         return_intermediate_steps=True,
         max_iterations=6  
     )
 
-    return agent_executor
+    return RunnableLambda(_with_examples) | agent_executor
+
+# ---------- Planification + exécution parallèle des tools ----------
+def create_planner_llm():
+    # Sans system prompt ReAct : le planner et la synthèse ont leurs propres prompts
+    return get_llm(0.0)
+
+def parse_plan(text, tool_names):
+    """Extrait la liste JSON d'appels [{tool, input}] produite par le planner ; [] si invalide."""
+    match = re.search(r"\[.*\]", text or "", re.DOTALL)
+    if not match:
+        return []
+    try:
+        calls = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return []
+
+    plan = []
+    for call in calls if isinstance(calls, list) else []:
+        if not isinstance(call, dict) or call.get("tool") not in tool_names:
+            continue
+        tool_input = call.get("input", "")
+        if not isinstance(tool_input, (str, dict)):
+            tool_input = str(tool_input)
+        entry = {"tool": call["tool"], "input": tool_input}
+        if entry not in plan:
+            plan.append(entry)
+    return plan[:PLANNER_MAX_CALLS]
+
+def create_planner_node(llm, tools):
+    tool_names = {t.name for t in tools}
+    tools_text = "\n".join(f"- {t.name}: {(t.description or '').strip().splitlines()[0]}" for t in tools)
+
+    async def planner(state):
+        text = await llm.ainvoke(planner_prompt.format(tools=tools_text, input=state.input))
+        return {"plan": parse_plan(text, tool_names)}
+
+    return planner
+
+def create_fan_out_node(tools):
+    tools_by_name = {t.name: t for t in tools}
+
+    async def fan_out(state):
+        async def run(call):
+            try:
+                return await tools_by_name[call["tool"]].ainvoke(call["input"])
+            except Exception as e:
+                return f"❌ Erreur lors de l'appel à {call['tool']} : {str(e)}"
+
+        # Appels indépendants : exécutés simultanément, résultats fusionnés dans l'état
+        observations = await asyncio.gather(*(run(call) for call in state.plan))
+        return {"intermediate_steps": list(zip(state.plan, observations))}
+
+    return fan_out
+
+def create_synthesis_node(llm):
+    async def synthesize(state):
+        results = "\n\n".join(
+            f"[{call['tool']}({call['input']})]\n{observation}"
+            for call, observation in state.intermediate_steps or []
+        )
+        text = await llm.ainvoke(synthesis_prompt.format(input=state.input, results=results))
+        return {"output": text.replace("Final Answer:", "").strip()}
+
+    return synthesize
+
+def route_after_planner(state):
+    """Plan exploitable → exécution parallèle ; sinon, l'agent ReAct habituel."""
+    return "fan_out" if state.plan else "agent_executor"
+
 
 from tools_risk import extract_bbox_and_dates, query_stac_catalog_with_retry
 
@@ -3,6 +3,11 @@
 prompts.py - Contains all prompt templates and examples for the satellite imagery assistant
 """
 
+import json
+import re
+import unicodedata
+
+import numpy as np
 from langchain.prompts import FewShotPromptTemplate, PromptTemplate
 
 # System prompt (can be imported as 'system_prompt')
@@ -646,6 +651,256 @@ Réponse (utilise le même format Action/Observation/Final Answer):
     example_separator="\n" + "-"*50 + "\n"
 )
 
+# Examples for the ReAct agent (STRUCTURED_CHAT): same JSON action blobs and tool names as the agent must emit.
+# Each step is (tool name, action_input, observation); observations copy the real tool output format.
+# No "answer" when the last tool is return_direct (think_hazard, get_route_info): the agent stops on its output.
+agent_examples = [
+    {"question": "Quelle est la date et l'heure actuelle ?",
+     "steps": [("get_date", {}, "Today's date is 01/07/2025."), ("get_time", {}, "The current time is 14h30.")],
+     "answer": "Nous sommes le 01/07/2025 et il est 14h30."},
+    {"question": "what time is it?",
+     "steps": [("get_time", {}, "The current time is 15h42.")],
+     "answer": "It is 15h42."},
+    {"question": "Calcule 23 * 17 et donne-moi la météo à Tunis",
+     "steps": [("calculator", {"expression": "23*17"}, "391"),
+               ("weather_tool", {"city_name": "Tunis"},
+                "📍 Météo actuelle à Tunis : 28.4°C, vent 12.2 km/h.\n\nPrévisions pour les 5 prochains jours :\n"
+                "2025-07-01 : Max 33.1°C / Min 22.5°C / Pluie 0.0 mm\n2025-07-02 : Max 34.6°C / Min 23.0°C / Pluie 0.0 mm\n"
+                "2025-07-03 : Max 32.8°C / Min 22.1°C / Pluie 0.0 mm\n2025-07-04 : Max 31.9°C / Min 21.7°C / Pluie 0.2 mm\n"
+                "2025-07-05 : Max 33.5°C / Min 22.4°C / Pluie 0.0 mm\n")],
+     "answer": "23 * 17 = 391. Météo actuelle à Tunis : 28.4°C, vent 12.2 km/h ; de 32 à 35°C les prochains jours, sans pluie notable."},
+    {"question": "What is the weather forecast in Berlin?",
+     "steps": [("weather_tool", {"city_name": "Berlin"},
+                "📍 Météo actuelle à Berlin : 19.3°C, vent 8.4 km/h.\n\nPrévisions pour les 5 prochains jours :\n"
+                "2025-07-01 : Max 23.2°C / Min 13.8°C / Pluie 0.0 mm\n2025-07-02 : Max 24.1°C / Min 14.2°C / Pluie 0.0 mm\n"
+                "2025-07-03 : Max 21.7°C / Min 15.0°C / Pluie 4.6 mm\n2025-07-04 : Max 20.5°C / Min 13.1°C / Pluie 1.2 mm\n"
+                "2025-07-05 : Max 22.8°C / Min 12.9°C / Pluie 0.0 mm\n")],
+     "answer": "Current weather in Berlin: 19.3°C, wind 8.4 km/h. Next days: 20 to 24°C, rain expected on 2025-07-03 (4.6 mm) and 2025-07-04 (1.2 mm)."},
+    {"question": "Images Sentinel-2 de Paris entre le 1er et 15 juin 2023",
+     "steps": [("query_stac_catalog_with_retry", {"params": "2.22,48.81,2.47,48.90 2023-06-01 2023-06-15 sentinel-2-l2a"},
+                "{'collection': 'sentinel-2-l2a', 'bbox': '2.22,48.81,2.47,48.90', 'start_date': '2023-06-01', "
+                "'end_date': '2023-06-15', 'images': [{'date': '2023-06-05', 'cloud_cover': 2.4, 'thumbnail': "
+                "'https://sentinel-cogs.s3.us-west-2.amazonaws.com/sentinel-s2-l2a-cogs/31/U/DQ/2023/6/S2A_31UDQ_20230605_0_L2A/thumbnail.jpg'}], "
+                "'urls': ['https://sentinel-cogs.s3.us-west-2.amazonaws.com/sentinel-s2-l2a-cogs/31/U/DQ/2023/6/S2A_31UDQ_20230605_0_L2A/thumbnail.jpg']}")],
+     "answer": "Image Sentinel-2 disponible pour Paris le 2023-06-05 (couverture nuageuse 2.4 %) : "
+               "https://sentinel-cogs.s3.us-west-2.amazonaws.com/sentinel-s2-l2a-cogs/31/U/DQ/2023/6/S2A_31UDQ_20230605_0_L2A/thumbnail.jpg"},
+    {"question": "Y a-t-il des incendies à Bizerte le 2025-07-21 ?",
+     "steps": [("detect_fire_tool", {"query_text": "incendies à Bizerte le 2025-07-21"},
+                "✅ 3 incendie(s) détecté(s) autour de Bizerte le 2025-07-21 dans un rayon de 100 km.\n🗺️ Carte : incendies_bizerte_2025-07-21_0a1b2c3d4e5f.html")],
+     "answer": "3 incendies détectés autour de Bizerte le 2025-07-21 (rayon 100 km). Carte : incendies_bizerte_2025-07-21_0a1b2c3d4e5f.html"},
+    {"question": "Quelles inondations en France en juin 2023 ?",
+     "steps": [("query_disaster_events_tool", {"params": "France 2023-06-01 2023-06-30 flood"},
+                "✅ Événements 'flood' trouvés en France entre 2023-06-01 et 2023-06-30 :\n\n"
+                "🌊 **Flood en France (Pas-de-Calais)**\n📍 Lieu : Pas-de-Calais\n📅 Du 12/6/2023 au 16/6/2023\n"
+                "☠️ Décès : 1\n👥 Personnes affectées : 1200\n🧭 Origine : Heavy rains\n"
+                "--------------------------------------------------\n\n"
+                "🗺️ Carte : flood_map_france_2023-06-01_0a1b2c3d4e5f.html")],
+     "answer": "1 inondation recensée en France en juin 2023 : Pas-de-Calais, du 12 au 16/06/2023 (1 décès, 1200 personnes affectées). Carte : flood_map_france_2023-06-01_0a1b2c3d4e5f.html"},
+    {"question": "Earthquakes in Chile between January and March 2010",
+     "steps": [("query_disaster_events_tool", {"params": "Chile 2010-01-01 2010-03-31 earthquake"},
+                "✅ Événements 'earthquake' trouvés en Chile entre 2010-01-01 et 2010-03-31 :\n\n"
+                "🏔️ **Earthquake en Chile (Maule, Biobio)**\n📍 Lieu : Maule, Biobio\n📅 Du 27/2/2010 au 27/2/2010\n"
+                "☠️ Décès : 562\n👥 Personnes affectées : 2671556\n🧭 Origine : Non précisée\n"
+                "--------------------------------------------------\n\n"
+                "🗺️ Carte : earthquake_map_chile_2010-01-01_0a1b2c3d4e5f.html")],
+     "answer": "One earthquake was recorded in Chile between January and March 2010: Maule and Biobio on 27/02/2010, 562 deaths and about 2.7 million people affected. Map: earthquake_map_chile_2010-01-01_0a1b2c3d4e5f.html"},
+    {"question": "Quel est le risque d'infiltration d'eau de surface à Paris ?",
+     "steps": [("estimate_surface_water_ingress_tool", {"location_input": "Paris"},
+                "{'Ingress_paths_estimate': 'L’eau suit les lignes d’écoulement (D8) vers les points bas.', 'Mitigation_actions': "
+                "[{'description': 'Planter des bandes végétalisées (bioswales).', 'resource': "
+                "'https://www.ecologie.gouv.fr/sites/default/files/documents/Gestion_durable_des_eaux_pluviales_le_plan_daction.pdf'}, "
+                "{'description': 'Diriger les descentes de gouttières loin des fondations.', 'resource': "
+                "'https://www.georisques.gouv.fr/reduire-la-vulnerabilite-de-ma-maison-aux-inondations'}, "
+                "{'description': 'Nettoyer régulièrement les grilles, caniveaux et regards.', 'resource': "
+                "'https://www.environnement.gouv.qc.ca/eau/pluviales/guide-gestion-eaux-pluviales.pdf'}, "
+                "{'description': 'Vérifier l’étanchéité des seuils et joints.', 'resource': "
+                "'https://www.ecologie.gouv.fr/politiques-publiques/prevention-inondations'}], "
+                "'Statistics': {'DEM_shape': (24, 24), 'Elevation_min': 28.0, 'Elevation_max': 61.0, "
+                "'Elevation_mean': 38.41493055555556, 'Slope_mean': 0.03518224436044693, 'Risk_zone_percent': 6.25}, "
+                "'Maps': {'Elevation': 'map_elevation_77071b28a8b9.png', 'Slope': 'map_slope_77071b28a8b9.png', "
+                "'FlowAccumulation': 'map_flowacc_77071b28a8b9.png', 'Risk': 'map_risk_77071b28a8b9.png', "
+                "'Risk_Folium': 'map_risk_folium_77071b28a8b9.html'}, 'Explanation': '📊 Comment lire les cartes :\\n"
+                "1. Carte d’altitude : relief (zones sombres = basses).\\n2. Carte de pente : pentes fortes = écoulement rapide.\\n"
+                "3. Carte de flux : chemins probables de l’eau.\\n4. Carte de risque : zones rouges = accumulation probable.', "
+                "'error': None}")],
+     "answer": "À Paris, 6.25 % de la zone analysée est à risque d'accumulation d'eau de surface (altitude 28 à 61 m, "
+               "pente moyenne 3.5 %). Actions conseillées : bandes végétalisées, descentes de gouttières éloignées "
+               "des fondations, entretien des grilles et caniveaux, étanchéité des seuils. Carte interactive : "
+               "map_risk_folium_77071b28a8b9.html"},
+    {"question": "What natural hazards threaten Tokyo?",
+     "steps": [("think_hazard", {"query": "Tokyo"},
+                "Top 5 hazards for this location (Tokyo, Japan):\n- Earthquake: High\n- Urban flood: High\n"
+                "- Storm surge: Medium\n- Extreme heat: Medium\n- Landslide: Low\n\n--------------------------------------------------")]},
+    {"question": "Donne-moi des informations sur le Japon",
+     "steps": [("geo_info_tool", {"name": "Japan"},
+                "Type : Pays\nNom : Japan\nCapital : Tokyo\nPopulation : 125836021\nSuperficie (km²) : 377930.0\n"
+                "Région : Asia\nSous-région : Eastern Asia\nLangues : ['Japanese']\nMonnaie : Japanese yen\n"
+                "Drapeau : https://flagcdn.com/w320/jp.png")],
+     "answer": "Japon : capitale Tokyo, environ 125,8 millions d'habitants, 377 930 km², langue japonaise, monnaie le yen."},
+    {"question": "Itinéraire de Marseille à Nice",
+     "steps": [("get_route_info", {"query": "Marseille -> Nice"},
+                "🚗 Itinéraire de Marseille à Nice\nDistance totale : 200.7 km\nDurée estimée   : 2 h 20 min\n\n"
+                "1. Départ sur Boulevard Rabatau.\n2. Prenez la bretelle à droite sur A50 (1.4 km).\n"
+                "3. Continuez sur A8 (186.2 km).\n4. Vous êtes arrivé.\n\n"
+                "🗺️ Carte enregistrée dans le fichier : itineraire_marseille_nice_0a1b2c3d4e5f.html")]},
+    {"question": "Quelle date était-il 38 jours avant le 2025-12-31 ?",
+     "steps": [("date_subtract", {"query": "2025-12-31 - 38"}, "2025-11-23")],
+     "answer": "38 jours avant le 2025-12-31, nous étions le 2025-11-23."},
+    {"question": "Quelle est la veille du 01/03/2024 ?",
+     "steps": [("adjust_date", {"user_input": "01/03/2024"}, "2024-02-29")],
+     "answer": "La veille du 01/03/2024 est le 29/02/2024."},
+    {"question": "Combien font 125 / 5 ?",
+     "steps": [("calculator", {"expression": "125/5"}, "25.0")],
+     "answer": "125 / 5 = 25."},
+    {"question": "How do I drive from New York to Boston?",
+     "steps": [("get_route_info", {"query": "New York -> Boston"},
+                "🚗 Itinéraire de New York à Boston\nDistance totale : 346.5 km\nDurée estimée   : 3 h 45 min\n\n"
+                "1. Départ sur FDR Drive.\n2. Prenez la bretelle à droite sur I 95 (1.2 km).\n3. Vous êtes arrivé.\n\n"
+                "🗺️ Carte enregistrée dans le fichier : itineraire_new_york_boston_0a1b2c3d4e5f.html")]},
+    {"question": "Are there any wildfires near Marseille on 2023-07-21?",
+     "steps": [("detect_fire_tool", {"query_text": "fires near Marseille on 2023-07-21"},
+                "✅ 12 incendie(s) détecté(s) autour de Marseille le 2023-07-21 dans un rayon de 100 km.\n"
+                "🗺️ Carte : incendies_marseille_2023-07-21_0a1b2c3d4e5f.html")],
+     "answer": "12 fires were detected within 100 km of Marseille on 2023-07-21. Map: incendies_marseille_2023-07-21_0a1b2c3d4e5f.html"},
+    {"question": "What date was it 10 days before 2025-03-05?",
+     "steps": [("date_subtract", {"query": "2025-03-05 - 10"}, "2025-02-23")],
+     "answer": "10 days before 2025-03-05 it was 2025-02-23."},
+    {"question": "Quels sont les risques naturels à Lisbonne ?",
+     "steps": [("think_hazard", {"query": "Lisbonne"},
+                "Top 5 hazards for this location (Lisbon, Portugal):\n- Earthquake: High\n- Urban flood: Medium\n"
+                "- Extreme heat: High\n- Wildfire: Medium\n- Storm surge: Low\n\n--------------------------------------------------")]},
+    {"question": "Tell me about Canada",
+     "steps": [("geo_info_tool", {"name": "Canada"},
+                "Type : Pays\nNom : Canada\nCapital : Ottawa\nPopulation : 38005238\nSuperficie (km²) : 9984670.0\n"
+                "Région : Americas\nSous-région : North America\nLangues : ['English', 'French']\nMonnaie : Canadian dollar\n"
+                "Drapeau : https://flagcdn.com/w320/ca.png")],
+     "answer": "Canada: capital Ottawa, population about 38 million, area 9,984,670 km², official languages English and French, currency the Canadian dollar."},
+]
+
+def _format_agent_example(example):
+    def blob(action, action_input):
+        return "Action:\n```\n" + json.dumps({"action": action, "action_input": action_input}, ensure_ascii=False) + "\n```"
+
+    lines = [f"Question: {example['question']}"]
+    for tool_name, tool_input, observation in example["steps"]:
+        lines += [f"Thought: I need {tool_name}.", blob(tool_name, tool_input), f"Observation: {observation}"]
+    if "answer" in example:
+        lines += ["Thought: I know what to respond.", blob("Final Answer", example["answer"])]
+    return "\n".join(lines)
+
+# Per-query example selection. Only intent terms count: words of the example questions plus bilingual
+# (FR/EN) keywords of the tools each example calls, so place names ("Tunis", "Paris") and filler words never
+# drive the choice and a French example can serve an English query. TF-IDF index built once at import
+# (L2-normalised NumPy matrix), queried by cosine similarity within a character budget.
+PROMPT_EXAMPLE_K = 4
+PROMPT_EXAMPLE_BUDGET = 3000  # characters of examples per query
+PROMPT_LANGUAGE_BONUS = 0.05  # tie-break towards examples written in the language of the query
+
+TOOL_INTENT_TERMS = {
+    "get_date": "date jour aujourd today day",
+    "get_time": "heure time hour clock",
+    "calculator": "calcule calculer calcul combien font multiplie divise somme calculate compute multiply divide sum",
+    "weather_tool": "meteo temps temperature prevision pluie vent weather forecast rain wind",
+    "query_stac_catalog_with_retry": "image satellite sentinel landsat stac scene imagery",
+    "detect_fire_tool": "incendie feu feux brule fire wildfire burning",
+    "query_disaster_events_tool": "inondation seisme tremblement tempete secheresse catastrophe evenement "
+                                  "flood earthquake storm drought disaster event",
+    "estimate_surface_water_ingress_tool": "infiltration ruissellement eau surface ecoulement ingress runoff water drainage",
+    "think_hazard": "alea risque naturel menace hazard threaten threat natural",
+    "geo_info_tool": "information pays capitale population monnaie country capital currency about",
+    "get_route_info": "itineraire trajet route aller conduire distance drive trip directions",
+    "date_subtract": "avant soustrais before ago subtract",
+    "adjust_date": "veille hier previous yesterday eve",
+}
+
+_FRENCH_WORDS = {"le", "la", "les", "des", "du", "de", "et", "est", "une", "quel", "quelle", "quels", "quelles",
+                 "donne", "moi", "entre", "y", "a", "t", "il", "sur", "dans", "pour", "au", "aux", "en"}
+_ENGLISH_WORDS = {"the", "is", "are", "what", "which", "how", "in", "on", "of", "and", "to", "from", "between",
+                  "there", "do", "does", "tell", "me", "about", "near", "any", "it"}
+
+def _normalise(word):
+    # Minuscules sans accents, pluriel simple retiré : "Incendies" -> "incendie", "floods" -> "flood"
+    word = "".join(c for c in unicodedata.normalize("NFKD", word.lower()) if not unicodedata.combining(c))
+    return word[:-1] if len(word) > 4 and word[-1] in "sx" else word
+
+def _tokens(text):
+    words = [_normalise(w) for w in re.findall(r"\w{3,}", text)]
+    if re.search(r"\d\s*[*/+×÷]\s*\d", re.sub(r"\d+[/-]\d+[/-]\d+", " ", text)):
+        words.append("calcul")  # "23 * 17" sans mot-clé (les dates 01/03/2024 ne comptent pas)
+    return words
+
+def _language(text):
+    words = re.findall(r"\w+", text.lower())
+    french = sum(w in _FRENCH_WORDS for w in words)
+    english = sum(w in _ENGLISH_WORDS for w in words)
+    return "fr" if french > english else "en" if english > french else None
+
+def _example_terms(example):
+    terms = _tokens(example["question"])
+    for tool_name, _, _ in example["steps"]:
+        terms += _tokens(TOOL_INTENT_TERMS.get(tool_name, ""))
+    return terms
+
+def _build_example_index(examples):
+    vocabulary = sorted({word for terms in TOOL_INTENT_TERMS.values() for word in _tokens(terms)})
+    vocabulary = {word: i for i, word in enumerate(vocabulary)}
+    matrix = np.zeros((len(examples), len(vocabulary)), dtype=np.float32)
+    for row, example in enumerate(examples):
+        for word in _example_terms(example):
+            if word in vocabulary:
+                matrix[row, vocabulary[word]] += 1
+    df = (matrix > 0).sum(axis=0)
+    idf = np.log((1 + len(examples)) / (1 + df)) + 1
+    matrix *= idf
+    matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    return vocabulary, idf, matrix
+
+_vocabulary, _idf, _example_matrix = _build_example_index(agent_examples)
+_example_languages = np.array([_language(e["question"]) or "" for e in agent_examples])
+_example_tools = [tuple(sorted({step[0] for step in e["steps"]})) for e in agent_examples]
+_formatted_examples = [_format_agent_example(e) for e in agent_examples]
+
+def example_tools(i):
+    """Tools called by agent example i"""
+    return _example_tools[i]
+
+def rank_examples(query, k=PROMPT_EXAMPLE_K):
+    """
+    Indices of the k examples most relevant to the query (cosine on intent-term TF-IDF), best first; [] if no
+    intent term matches. One example per tool combination first, so a multi-tool query covers every tool.
+    """
+    vector = np.zeros(len(_vocabulary), dtype=np.float32)
+    for word in _tokens(query):
+        if word in _vocabulary:
+            vector[_vocabulary[word]] += _idf[_vocabulary[word]]
+    if not vector.any():
+        return []
+    scores = _example_matrix @ vector
+    scores /= np.linalg.norm(vector)
+    language = _language(query)
+    if language:
+        scores += PROMPT_LANGUAGE_BONUS * ((_example_languages == language) & (scores > 0))
+
+    ranked = [int(i) for i in np.argsort(-scores, kind="stable") if scores[i] > 0]
+    first, rest, seen = [], [], set()
+    for i in ranked:
+        (rest if _example_tools[i] in seen else first).append(i)
+        seen.add(_example_tools[i])
+    return (first + rest)[:k]
+
+def select_examples(query, k=PROMPT_EXAMPLE_K, budget=PROMPT_EXAMPLE_BUDGET):
+    """Formatted top-k few-shot examples for the query, within `budget` characters"""
+    separator = few_shot_prompt.example_separator
+    chosen, size = [], 0
+    for i in rank_examples(query, k):
+        text = _formatted_examples[i]
+        extra = len(text) + (len(separator) if chosen else 0)
+        if text in chosen or size + extra > budget:
+            continue
+        chosen.append(text)
+        size += extra
+    return separator.join(chosen)
+
 # Simple prompt for basic queries
 simple_prompt = PromptTemplate(
     input_variables=["input"],
@@ -657,6 +912,44 @@ Réponse concise:
 """
 )
 
+# Planner prompt: decides up front which independent tool calls can run in parallel
+planner_prompt = PromptTemplate(
+    input_variables=["tools", "input"],
+    template="""
+You are the planning step of an assistant. Decide which tool calls are needed to answer the question.
+
+Available tools:
+{tools}
+
+Rules:
+- Only plan calls that are independent of each other (no call needs the output of another call).
+- If the question needs chained reasoning (one tool's output feeds another), or no tool at all, return [].
+- Use at most 4 calls. Each "input" is the plain string argument of the tool.
+- Answer with a JSON array only, for example:
+  [{{"tool": "weather_tool", "input": "Paris"}}, {{"tool": "detect_fire_tool", "input": "incendies à Paris le 2025-08-01"}}]
+
+Question: {input}
+JSON:
+"""
+)
+
+# Synthesis prompt: single LLM call over the merged tool results
+synthesis_prompt = PromptTemplate(
+    input_variables=["input", "results"],
+    template="""
+{system_prompt}
+
+Question: {input}
+
+Tool results:
+{results}
+
+Using only these results, write the final answer. Keep every URL, value and map file name from the results.
+Final Answer:
+""",
+    partial_variables={"system_prompt": system_prompt}
+)
+
 def get_prompt_config(mode="few_shot"):
     """Returns the requested prompt configuration"""
     return {
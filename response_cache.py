@@ -0,0 +1,197 @@
+#response_cache.py
+# Cache des réponses complètes (routeur ou agent), indexé sur les paramètres normalisés de l'intention
+# (tool, lieu, dates, collection) plutôt que sur le texte brut. Les cartes HTML citées dans la réponse
+# sont conservées avec elle et restaurées lors d'un hit.
+import asyncio
+import contextvars
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+
+from artifacts import artifact_path, resolve_artifact, is_pending
+from router import route_query, answer_query, aanswer_query
+from tools_parsing import extract_params_from_text
+from tools_risk import extract_bbox_and_dates
+
+RESPONSE_CACHE_DIR = os.getenv("RESPONSE_CACHE_DIR", "response_cache")
+
+# Durée de vie (secondes) par type de requête ; None : durée du module source (voir _ttl)
+RESPONSE_TTL = {
+    "fire_nrt": None,                    # détections NRT du jour : suivent le rafraîchissement FIRMS
+    "fire_archive": 30 * 24 * 3600,      # archives figées
+    "weather": 30 * 60,
+    "satellite": 24 * 3600,
+    "disaster": None,                    # suit le cache EM-DAT
+    "route": 7 * 24 * 3600,
+    "agent": 3600,
+}
+
+# Réponses de l'agent qui périment aussitôt (heure, date, météo) : jamais mises en cache
+VOLATILE_TOOLS = {"get_time", "get_date", "get_weather_data", "weather_tool"}
+
+_agent_tools = contextvars.ContextVar("agent_tools", default=())
+_memory = {}
+_stats = {"hits": 0, "misses": 0}
+
+
+# ---------- Clé normalisée ----------
+def _normalize_text(text):
+    return " ".join(re.sub(r"[^\w\s\-]", " ", text.lower()).split())
+
+def cache_key(text):
+    """Retourne (clé, catégorie de TTL) pour une requête utilisateur."""
+    intent = route_query(text)
+    if intent is None:
+        return ("agent", _normalize_text(text)), "agent"
+
+    path, _, tool_input = intent
+    if path == "fire":
+        from fire_detection import should_use_api  # import différé (pandas, folium)
+        date_str, ville, radius_km = extract_params_from_text(tool_input)
+        try:
+            ttl = "fire_nrt" if should_use_api(date_str) else "fire_archive"
+        except ValueError:
+            # Date invalide ("2025-13-45") : le tool répondra par son message d'erreur, non mis en cache
+            return ("agent", _normalize_text(text)), "agent"
+        return ("fire", _normalize_text(ville), date_str, radius_km), ttl
+    if path == "satellite":
+        params = extract_bbox_and_dates(tool_input)
+        if "error" in params:
+            return ("satellite", _normalize_text(text)), "satellite"
+        return ("satellite", params["collection"], params["bbox"], params["start_date"], params["end_date"]), "satellite"
+    if path == "weather":
+        return ("weather", _normalize_text(tool_input["city_name"])), "weather"
+    if path == "route":
+        start, _, end = tool_input.partition("->")
+        return ("route", _normalize_text(start), _normalize_text(end)), "route"
+    return (path, *tool_input.lower().split()), path
+
+def _ttl(ttl_kind):
+    # Modules des tools importés à la première écriture seulement (déjà chargés par le tool à ce stade)
+    if ttl_kind == "fire_nrt":
+        from fire_nrt import NRT_REFRESH_SECONDS
+        return NRT_REFRESH_SECONDS
+    if ttl_kind == "disaster":
+        from flood_detection import EMDAT_CACHE_TTL
+        return EMDAT_CACHE_TTL
+    return RESPONSE_TTL[ttl_kind]
+
+def _entry_dir(key):
+    digest = hashlib.sha1(json.dumps(key, ensure_ascii=False).encode("utf-8")).hexdigest()
+    return os.path.join(RESPONSE_CACHE_DIR, digest)
+
+
+# ---------- Lecture / écriture ----------
+def _is_error(result):
+    if isinstance(result, dict):
+        return "error" in result
+    return isinstance(result, str) and result.lstrip().startswith("❌")
+
+def find_artifacts(result):
+    """Cartes HTML existantes citées dans un résultat (mêmes noms que ceux affichés par l'interface Streamlit)."""
+    text = result if isinstance(result, str) else json.dumps(result, ensure_ascii=False, default=str)
+    names = set(re.findall(r"([\w\-]+\.html)", text))
+    return sorted(name for name in names if resolve_artifact(name, render=False) or is_pending(name))
+
+def _lookup(key):
+    entry = _memory.get(key)
+    if entry is None:
+        entry_path = os.path.join(_entry_dir(key), "entry.json")
+        if os.path.exists(entry_path):
+            with open(entry_path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            _memory[key] = entry
+    if entry is None or time.time() - entry["created"] > entry["ttl"]:
+        return None
+
+    for name in entry["artifacts"]:
+        cached_copy = os.path.join(_entry_dir(key), name)
+        path = resolve_artifact(name, render=False)
+        if path:
+            # Carte rendue depuis la mise en cache : copie conservée avec la réponse
+            if not os.path.exists(cached_copy):
+                shutil.copyfile(path, cached_copy)
+        elif os.path.exists(cached_copy):
+            # Carte évincée du stockage d'artefacts : restaurée
+            os.makedirs(os.path.dirname(artifact_path(name)), exist_ok=True)
+            shutil.copyfile(cached_copy, artifact_path(name))
+        elif not is_pending(name):
+            # Carte jamais rendue et perdue (redémarrage, limite des rendus en attente) : la réponse est recalculée
+            return None
+    return entry["result"]
+
+def note_agent_tools(steps):
+    """Retient les tools appelés par l'agent pour la requête en cours (étapes (appel, observation) du graphe)."""
+    names = []
+    for call, _ in steps or []:
+        names.append(call["tool"] if isinstance(call, dict) else getattr(call, "tool", None))
+    _agent_tools.set(tuple(names))
+
+def store_answer(key, ttl_kind, result, tools=None):
+    """
+    Enregistre une réponse (et ses cartes) sous la clé renvoyée par cache_key.
+    `tools` : tools appelés par l'agent (par défaut, ceux notés par note_agent_tools).
+    """
+    if _is_error(result):
+        return
+    tools = _agent_tools.get() if tools is None else tools
+    if ttl_kind == "agent" and VOLATILE_TOOLS.intersection(tools):
+        return
+    try:
+        payload = json.dumps(result, ensure_ascii=False)
+    except TypeError:
+        return  # résultat non sérialisable (objet carte, etc.) : pas de mise en cache
+
+    entry_dir = _entry_dir(key)
+    os.makedirs(entry_dir, exist_ok=True)
+    artifacts = find_artifacts(result)
+    for name in artifacts:
+        # Cartes encore en attente de rendu : seul leur identifiant est gardé, la copie est faite
+        # par _lookup une fois la carte rendue (sinon, l'entrée devient un miss)
+        if resolve_artifact(name, render=False):
+            shutil.copyfile(artifact_path(name), os.path.join(entry_dir, name))
+
+    entry = {"created": time.time(), "ttl": _ttl(ttl_kind), "artifacts": artifacts, "result": json.loads(payload)}
+    with open(os.path.join(entry_dir, "entry.json"), "w", encoding="utf-8") as f:
+        json.dump(entry, f, ensure_ascii=False)
+    _memory[key] = entry
+
+
+# ---------- API publique ----------
+def lookup_answer(text):
+    """Retourne (clé, catégorie de TTL, réponse en cache ou None) ; la clé sert ensuite à store_answer."""
+    key, ttl_kind = cache_key(text)
+    result = _lookup(key)
+    _stats["hits" if result is not None else "misses"] += 1
+    return key, ttl_kind, result
+
+def cached_answer(text, fallback):
+    """answer_query précédé du cache de réponses. Retourne (résultat, chemin) ; chemin vaut "cache" sur un hit."""
+    key, ttl_kind, result = lookup_answer(text)
+    if result is not None:
+        return result, "cache"
+
+    _agent_tools.set(())
+    result, path = answer_query(text, fallback)
+    store_answer(key, ttl_kind, result)
+    return result, path
+
+async def acached_answer(text, afallback):
+    """Variante async de cached_answer."""
+    # cache_key peut géocoder (requêtes satellite) : hors de la boucle d'événements
+    key, ttl_kind, result = await asyncio.to_thread(lookup_answer, text)
+    if result is not None:
+        return result, "cache"
+
+    _agent_tools.set(())
+    result, path = await aanswer_query(text, afallback)
+    store_answer(key, ttl_kind, result)
+    return result, path
+
+def get_response_cache_stats():
+    """Compteurs de hits/misses du cache de réponses."""
+    total = _stats["hits"] + _stats["misses"]
+    return {**_stats, "hit_ratio": _stats["hits"] / total if total else 0.0}
@@ -0,0 +1,159 @@
+#router.py
+# Routeur déterministe : les requêtes structurées (satellite, incendies, itinéraire, météo,
+# catastrophes) sont envoyées directement au tool, sans LLM ni traduction.
+# L'agent n'est utilisé que si l'analyse échoue.
+import asyncio
+import re
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from tools_parsing import extract_params_from_text, find_place
+from tools_risk import extract_dates_from_text, get_all_tools
+from nodes import run_query_direct
+
+SATELLITE_KEYWORDS = ["sentinel", "modis", "viirs", "ndvi", "stac"]
+FIRE_KEYWORDS = ["incendie", "feu ", "feux", "fire", "wildfire"]
+WEATHER_KEYWORDS = ["météo", "meteo", "weather", "prévision", "forecast", "température actuelle"]
+DISASTER_KEYWORDS = {
+    "flood": ["inondation", "inondé", "crue", "flood"],
+    "storm": ["tempête", "cyclone", "ouragan", "storm", "hurricane"],
+    "earthquake": ["séisme", "tremblement de terre", "earthquake"],
+    "temperature": ["canicule", "vague de chaleur", "heatwave", "extreme temperature"],
+    "drought": ["sécheresse", "drought"],
+    "accident": ["accident industriel", "industrial accident"],
+}
+
+# Intervalle de dates ("between X and Y", "entre X et Y", "du X au Y")
+_DATE_RANGE = re.compile(r"\b(?:between|entre|from|du|until|jusqu)\b", re.IGNORECASE)
+# Lieux pour la météo : "à Paris" / "in Paris" avant "de Paris" ("météo de demain à Paris")
+_WEATHER_PLACE = re.compile(r"\b(?:à|in|at|pour|for|near|around)\s+([A-Za-zÀ-ÖØ-öø-ÿ\s\-']+)")
+_WEATHER_PLACE_DE = re.compile(r"\bde\s+([A-Za-zÀ-ÖØ-öø-ÿ\s\-']+)")
+# Réponse d'un tool dont le lieu n'a pas été géocodé : la requête est confiée à l'agent
+_GEOCODE_MISS = re.compile(r"^❌ (?:Ville '.*'|Lieu) introuvable")
+
+_latencies = defaultdict(list)
+_tools = None
+
+
+def _get_tool(name):
+    # Mêmes objets que ceux de l'agent (variantes async attachées)
+    global _tools
+    if _tools is None:
+        _tools = {t.name: t for t in get_all_tools()}
+    return _tools[name]
+
+
+# ---------- Détection d'intention ----------
+def _route_intent(text):
+    if "->" not in text:
+        return None
+    start, _, end = text.partition("->")
+    if not start.strip() or not end.strip():
+        return None
+    return "route", "get_route_info", f"{start.strip()} -> {end.strip()}"
+
+def _satellite_intent(text):
+    if any(k in text.lower() for k in SATELLITE_KEYWORDS):
+        return "satellite", None, text
+    return None
+
+def _fire_intent(text):
+    if not any(k in text.lower() for k in FIRE_KEYWORDS):
+        return None
+    date_str, ville, _ = extract_params_from_text(text, require_preposition=True)
+    if not date_str or not ville:
+        return None
+    return "fire", "detect_fire_tool", text
+
+def _disaster_intent(text):
+    lower = text.lower()
+    disaster_type = next((t for t, words in DISASTER_KEYWORDS.items() if any(w in lower for w in words)), None)
+    if not disaster_type:
+        return None
+    iso_dates = re.findall(r"\b\d{4}-\d{2}-\d{2}\b", text)
+    if len(iso_dates) >= 2:
+        start_date, end_date = iso_dates[0], iso_dates[1]
+    else:
+        start_date, end_date = extract_dates_from_text(text)
+    if not start_date:
+        return None
+    # Intervalle dont une seule borne est reconnue : l'agent plutôt qu'une réponse sur un seul jour
+    if start_date == end_date and _DATE_RANGE.search(text):
+        return None
+    # Pays : premier mot capitalisé reconnu par pycountry (évite les codes courts comme "de" ou "in").
+    # Import différé : flood_detection (pycountry, dateparser, folium) n'est chargé qu'à la première requête de ce type.
+    from flood_detection import get_iso3_from_country_name
+    country = next((w for w in re.findall(r"\b[A-ZÀ-Ý][\w\-]{3,}\b", text) if get_iso3_from_country_name(w)), None)
+    if not country:
+        return None
+    return "disaster", "query_disaster_events_tool", f"{country} {start_date} {end_date} {disaster_type}"
+
+def _weather_intent(text):
+    if not any(k in text.lower() for k in WEATHER_KEYWORDS):
+        return None
+    city = find_place(text, _WEATHER_PLACE) or find_place(text, _WEATHER_PLACE_DE)
+    if not city:
+        return None
+    return "weather", "weather_tool", {"city_name": city}
+
+# Ordre d'évaluation : du plus spécifique au plus général
+INTENT_PARSERS = [_route_intent, _satellite_intent, _fire_intent, _disaster_intent, _weather_intent]
+
+def route_query(text):
+    """Retourne (intention, nom_du_tool, entrée) si la requête est reconnue, sinon None."""
+    for parser in INTENT_PARSERS:
+        intent = parser(text)
+        if intent:
+            return intent
+    return None
+
+
+# ---------- Exécution ----------
+def _geocode_miss(result):
+    return isinstance(result, str) and bool(_GEOCODE_MISS.match(result))
+
+def answer_query(text, fallback):
+    """
+    Répond via le tool reconnu par le routeur, sinon via `fallback(text)` (agent LLM), également utilisé
+    si le tool n'a pas trouvé le lieu. Retourne (résultat, chemin) où chemin vaut le nom de l'intention ou "agent".
+    Sans `fallback`, le résultat vaut None quand l'agent est nécessaire.
+    """
+    start = time.perf_counter()
+    intent = route_query(text)
+    if intent:
+        path, tool_name, tool_input = intent
+        result = run_query_direct(tool_input) if path == "satellite" else _get_tool(tool_name).invoke(tool_input)
+    if not intent or _geocode_miss(result):
+        path, result = "agent", fallback(text) if fallback else None
+    _latencies[path].append(time.perf_counter() - start)
+    return result, path
+
+async def aanswer_query(text, afallback):
+    """Variante async de answer_query (tools appelés via ainvoke)."""
+    start = time.perf_counter()
+    intent = route_query(text)
+    if intent:
+        path, tool_name, tool_input = intent
+        if path == "satellite":
+            result = await asyncio.to_thread(run_query_direct, tool_input)
+        else:
+            result = await _get_tool(tool_name).ainvoke(tool_input)
+    if not intent or _geocode_miss(result):
+        path, result = "agent", await afallback(text) if afallback else None
+    _latencies[path].append(time.perf_counter() - start)
+    return result, path
+
+def get_router_stats():
+    """Part des requêtes servies sans LLM et latences (p50/p95, secondes) par chemin."""
+    total = sum(len(v) for v in _latencies.values())
+    fast = total - len(_latencies.get("agent", []))
+    return {
+        "total": total,
+        "fast_path_ratio": fast / total if total else 0.0,
+        "latency": {
+            path: {"count": len(values), "p50": float(np.percentile(values, 50)), "p95": float(np.percentile(values, 95))}
+            for path, values in _latencies.items() if values
+        },
+    }
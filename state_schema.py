@@ -6,4 +6,6 @@ from typing import Optional
 class MyStateSchema(BaseModel):
     input: str
     output: Optional[str] = None  # <--- ligne clé
+    plan: Optional[list] = None  # appels [{tool, input}] décidés par le planner
+    intermediate_steps: Optional[list] = None  # (appel, observation) des tools exécutés
 
@@ -1,10 +1,9 @@
 import streamlit as st
 from PIL import Image
-from nodes import run_query_direct, create_agent_executor
+from graph_main import stream_query
 import streamlit.components.v1 as components
 import re
-import os
-from translate import detect_and_translate_to_english, translate_from_english
+from artifacts import resolve_artifact
 
 # Configuration de la page
 st.set_page_config(page_title="STAC & Fire Chatbot", layout="centered")
@@ -21,74 +20,56 @@ st.title("🛰️🔥 Metaplanet Earth Agent")
 # Input utilisateur
 user_input = st.text_input("📥 Entrez votre requête :")
 
-# Initialiser l’agent une seule fois
-if "agent_executor" not in st.session_state:
-    st.session_state.agent_executor = create_agent_executor()
-agent_executor = st.session_state.agent_executor
-
 # Stocker le dernier résultat pour éviter réexécution
 if "last_result" not in st.session_state:
     st.session_state.last_result = None
 
-# Détection si c’est une requête satellite
-def is_satellite_query(text: str) -> bool:
-    text = text.lower()
-    return any(k in text for k in ["sentinel", "modis", "viirs", "ndvi", "stac"])
-
-# Fonction traduction + traitement agent
-def translate_query_and_response(user_input: str, agent):
-    english_input, detected_lang = detect_and_translate_to_english(user_input)
-    response = agent.invoke({"input": english_input})
-    if isinstance(response, dict):
-        output_text = response.get("output", str(response))
-    else:
-        output_text = str(response)
-    return translate_from_english(output_text, detected_lang)
-
 # Extraction des noms de fichiers HTML
 def extract_all_html_filenames(text: str):
     return re.findall(r'([\w\-]+\.html)', text)
 
-# Affichage d’un fichier HTML
-def display_html_file(filename: str):
-    if os.path.exists(filename):
-        with open(filename, "r", encoding="utf-8") as f:
+# Affichage d’un artefact HTML (identifiant renvoyé par les tools)
+def display_html_file(art_id: str):
+    path = resolve_artifact(art_id)
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
             html_content = f.read()
         components.html(html_content, height=600, width=800)
     else:
-        st.warning(f"⚠️ Le fichier HTML `{filename}` n'existe pas.")
+        st.warning(f"⚠️ La carte `{art_id}` n'existe pas (ou plus).")
 
 # Affichage de tous les HTML détectés
 def display_all_html_from_text(text: str):
-    filenames_in_text = extract_all_html_filenames(text)
-    all_html_files = [f for f in os.listdir(".") if f.endswith(".html")]
-
-    for name in filenames_in_text:
-        if name in all_html_files:
-            st.write(f"### Affichage de `{name}` :")
-            display_html_file(name)
-        else:
-            possible_matches = [f for f in all_html_files if name.split("_")[-1] in f]
-            if possible_matches:
-                st.write(f"### Nom dans le texte `{name}` introuvable. Affichage du fichier similaire `{possible_matches[0]}` :")
-                display_html_file(possible_matches[0])
-            else:
-                st.warning(f"⚠️ Aucun fichier HTML correspondant à `{name}` n'a été trouvé.")
+    for name in dict.fromkeys(extract_all_html_filenames(text)):
+        st.write(f"### Affichage de `{name}` :")
+        display_html_file(name)
 
 # Bouton exécution
 if st.button("🔍 Rechercher") and user_input:
-    with st.spinner("⏳ Traitement de la requête..."):
-        try:
-            if is_satellite_query(user_input):
-                result = run_query_direct(user_input)
-            else:
-                result = translate_query_and_response(user_input, agent_executor)
-
-            st.session_state.last_result = result  # 🔑 Sauvegarde résultat
-            st.success("✅ Requête traitée avec succès !")
-
-        except Exception as e:
-            st.error(f"❌ Erreur lors du traitement : {str(e)}")
+    # Affichage au fil de l'eau : tools appelés, texte partiel du LLM, cartes générées
+    progress = st.status("⏳ Traitement de la requête...", expanded=True)
+    partial = st.empty()
+    try:
+        text = ""
+        for event in stream_query(user_input):
+            if event["type"] == "tool_start":
+                progress.write(f"🔧 `{event['tool']}` en cours...")
+            elif event["type"] == "tool_end":
+                progress.write(f"✔️ `{event['tool']}` terminé ({event['elapsed']:.1f} s)")
+            elif event["type"] == "artifact":
+                progress.write(f"🗺️ Carte générée : `{event['path']}`")
+            elif event["type"] == "token":
+                text += event["text"]
+                partial.markdown(text)
+            elif event["type"] == "final":
+                partial.empty()
+                st.session_state.last_result = event["output"]  # 🔑 Sauvegarde résultat
+                progress.update(label=f"✅ Requête traitée (premier retour {event['ttfb']:.1f} s, total {event['elapsed']:.1f} s)",
+                                state="complete", expanded=False)
+
+    except Exception as e:
+        progress.update(label="❌ Échec", state="error")
+        st.error(f"❌ Erreur lors du traitement : {str(e)}")
 
 # Affichage unique du dernier résultat (évite re-exécution)
 if st.session_state.last_result:
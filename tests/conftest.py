@@ -0,0 +1,6 @@
+#conftest.py
+import os
+import sys
+
+# Modules du projet à la racine du dépôt (pas de paquet installable)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,43 @@
+#test_artifacts.py
+import os
+
+import pytest
+
+import artifacts
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    # Répertoire d'artefacts temporaire, rendu paresseux, file d'attente vide
+    monkeypatch.setattr(artifacts, "ARTIFACT_DIR", str(tmp_path))
+    monkeypatch.setattr(artifacts, "ARTIFACT_RENDER", "lazy")
+    monkeypatch.setattr(artifacts, "ARTIFACT_PENDING_MAX_BYTES", 1000)
+    monkeypatch.setattr(artifacts, "_pending", artifacts.OrderedDict())
+    monkeypatch.setattr(artifacts, "_pending_bytes", 0)
+    return artifacts
+
+def writer(text):
+    def write(path):
+        with open(path, "w") as f:
+            f.write(text)
+    return write
+
+def test_pending_queue_is_bounded_in_bytes(store):
+    for i in range(4):
+        store.defer_artifact(f"map_{i}.html", writer(str(i)), nbytes=400)
+    # 4 × 400 octets > 1000 : les deux plus anciens rendus sont abandonnés
+    assert store.get_pending_stats() == {"pending": 2, "pending_bytes": 800}
+    assert not store.is_pending("map_0.html") and not store.is_pending("map_1.html")
+
+    path = store.resolve_artifact("map_3.html")
+    assert open(path).read() == "3"
+    assert store.get_pending_stats() == {"pending": 1, "pending_bytes": 400}
+
+def test_redeclared_artifact_is_counted_once(store):
+    store.defer_artifact("map.html", writer("a"), nbytes=300)
+    store.defer_artifact("map.html", writer("b"), nbytes=500)
+    assert store.get_pending_stats() == {"pending": 1, "pending_bytes": 500}
+
+def test_oversized_render_is_written_immediately(store):
+    store.defer_artifact("big.png", writer("x"), nbytes=5000)
+    assert not store.is_pending("big.png")
+    assert os.path.exists(store.artifact_path("big.png"))
@@ -0,0 +1,93 @@
+#test_fire_detection.py
+import numpy as np
+import pandas as pd
+import pytest
+
+import fire_detection
+from fire_detection import FireGridIndex, filter_within_radius, haversine
+
+def row_filter(df, lat, lon, radius_km):
+    # Filtre ligne à ligne de l'implémentation d'origine
+    df = df.copy()
+    df["distance"] = df.apply(lambda row: haversine(lat, lon, row["latitude"], row["longitude"]), axis=1)
+    return df[df["distance"] <= radius_km]
+
+def detections(lat, lon, n=2000, spread=5.0, seed=0):
+    rng = np.random.default_rng(seed)
+    lons = (lon + rng.uniform(-spread, spread, n) + 180.0) % 360.0 - 180.0
+    lats = np.clip(lat + rng.uniform(-spread, spread, n), -90, 90)
+    return pd.DataFrame({"latitude": lats, "longitude": lons, "acq_time": np.arange(n)})
+
+@pytest.mark.parametrize("lat, lon, radius_km", [
+    (36.8, 10.18, 100),    # Tunis
+    (48.85, 2.35, 250),
+    (-16.5, 179.9, 150),   # de part et d'autre de l'antiméridien
+    (78.2, 15.6, 300),     # haute latitude
+])
+def test_filter_matches_row_filter(lat, lon, radius_km):
+    df = detections(lat, lon)
+    expected = row_filter(df, lat, lon, radius_km)
+    got = filter_within_radius(df, lat, lon, radius_km)
+    assert list(got.index) == list(expected.index)
+    np.testing.assert_allclose(got["distance"], expected["distance"])
+
+def test_filter_empty_frame():
+    df = pd.DataFrame({"latitude": [], "longitude": []})
+    assert filter_within_radius(df, 0.0, 0.0, 50).empty
+
+# ---------- Index spatial par journée ----------
+def ring(lat, lon, distance_km, n=72):
+    # Points à distance_km de (lat, lon) selon n azimuts (formule de destination sur la sphère)
+    R = 6371
+    phi1, lam1, delta = np.radians(lat), np.radians(lon), distance_km / R
+    theta = np.linspace(0, 2 * np.pi, n, endpoint=False)
+    phi2 = np.arcsin(np.sin(phi1) * np.cos(delta) + np.cos(phi1) * np.sin(delta) * np.cos(theta))
+    lam2 = lam1 + np.arctan2(np.sin(theta) * np.sin(delta) * np.cos(phi1), np.cos(delta) - np.sin(phi1) * np.sin(phi2))
+    return np.degrees(phi2), (np.degrees(lam2) + 180.0) % 360.0 - 180.0
+
+def day_with_edges(lat, lon, radius_km, seed=0):
+    # Détections aléatoires + anneaux juste à l'intérieur et juste à l'extérieur du rayon
+    df = detections(lat, lon, n=3000, spread=8.0, seed=seed)
+    rings = [ring(lat, lon, radius_km * f) for f in (0.999999, 1.000001)]
+    edges = pd.DataFrame({"latitude": np.concatenate([r[0] for r in rings]),
+                          "longitude": np.concatenate([r[1] for r in rings])})
+    df = pd.concat([df, edges], ignore_index=True)
+    df["id"] = np.arange(len(df))
+    return df
+
+@pytest.mark.parametrize("lat, lon, radius_km", [
+    (36.8, 10.18, 100),
+    (-16.5, 179.9, 150),    # antiméridien, côté est
+    (10.0, -179.6, 300),    # antiméridien, côté ouest
+    (64.1, -21.9, 250),     # cellules étroites en longitude
+    (52.0, 4.0, 0.5),       # rayon plus petit qu'une cellule
+])
+def test_grid_index_matches_filter(lat, lon, radius_km):
+    df = day_with_edges(lat, lon, radius_km)
+    expected = filter_within_radius(df, lat, lon, radius_km).sort_values("id")
+    got = FireGridIndex(df).query(lat, lon, radius_km).sort_values("id")
+    assert list(got["id"]) == list(expected["id"])
+    np.testing.assert_allclose(got["distance"], expected["distance"])
+    # Anneau intérieur (ids 3000-3071) gardé en entier, anneau extérieur (3072-3143) exclu
+    assert set(range(3000, 3072)) <= set(got["id"])
+    assert not set(range(3072, 3144)) & set(got["id"])
+
+def test_grid_index_on_empty_day():
+    df = pd.DataFrame({"latitude": pd.Series(dtype=float), "longitude": pd.Series(dtype=float)})
+    got = FireGridIndex(df).query(36.8, 10.18, 100)
+    assert got.empty and "distance" in got
+
+def test_fire_index_cached_per_day(monkeypatch):
+    df = day_with_edges(36.8, 10.18, 100)
+    loads = []
+    def load_fire_day(date_str, bbox=None):
+        loads.append(date_str)
+        return ("archive.csv", df) if date_str == "2024-07-01" else (None, None)
+
+    monkeypatch.setattr(fire_detection, "_fire_index_cache", {})
+    monkeypatch.setattr(fire_detection, "fire_source_for_date", lambda date_str: "archive.csv")
+    monkeypatch.setattr(fire_detection, "load_fire_day", load_fire_day)
+    index = fire_detection.get_fire_index("2024-07-01")
+    assert fire_detection.get_fire_index("2024-07-01") is index
+    assert fire_detection.get_fire_index("2024-07-02") is None  # journée sans détection
+    assert loads == ["2024-07-01", "2024-07-02"]
@@ -0,0 +1,165 @@
+#test_fire_nrt.py
+# Cache NRT contre un serveur HTTP local qui joue le rôle de l'API FIRMS (fixtures CSV, ETag / Last-Modified)
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import fire_nrt
+
+HEADER = "latitude,longitude,bright_ti4,acq_date,acq_time\n"
+
+def fixture_csv(date_str, n):
+    rows = "".join(f"{36.0 + i * 0.01:.2f},{10.0 + i * 0.01:.2f},330.5,{date_str},{1200 + i}\n" for i in range(n))
+    return (HEADER + rows).encode("utf-8")
+
+class FirmsStandIn(BaseHTTPRequestHandler):
+    slices = {}       # (zone, date) -> contenu CSV
+    mode = "ok"       # "ok", "error" (500) ou "html" (page d'erreur en 200)
+    log = []          # (zone, date, en-têtes conditionnels, statut)
+
+    def do_GET(self):
+        *_, area, _, date_str = self.path.split("/")
+        body = self.slices.get((area, date_str), b"")
+        etag = f'"{hash(body) & 0xffffffff:x}"'
+        conditional = {k: self.headers[k] for k in ("If-None-Match", "If-Modified-Since") if self.headers[k]}
+        if self.mode == "error":
+            status, body = 500, b"Internal Server Error"
+        elif self.mode == "html":
+            status, body = 200, b"<html>Invalid MAP_KEY.</html>"
+        elif conditional.get("If-None-Match") == etag:
+            status, body = 304, b""
+        else:
+            status = 200
+        self.log.append((area, date_str, conditional, status))
+        self.send_response(status)
+        if status == 200 and self.mode == "ok":
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", "Mon, 01 Jul 2024 06:00:00 GMT")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def firms(tmp_path, monkeypatch):
+    FirmsStandIn.slices, FirmsStandIn.mode, FirmsStandIn.log = {}, "ok", []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FirmsStandIn)
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    session = requests.Session()
+    session.trust_env = False  # pas de proxy pour le serveur local
+    monkeypatch.setattr(fire_nrt, "FIRMS_API_URL", f"http://127.0.0.1:{server.server_port}/api/area/csv")
+    monkeypatch.setattr(fire_nrt, "NRT_CACHE_DIR", str(tmp_path / "nrt"))
+    monkeypatch.setattr(fire_nrt, "_session", session)
+    monkeypatch.setattr(fire_nrt, "_stats", dict.fromkeys(fire_nrt._stats, 0))
+    yield FirmsStandIn
+    server.shutdown()
+    server.server_close()
+
+def utc_day(offset):
+    return (datetime.now(timezone.utc).date() - timedelta(days=offset)).isoformat()
+
+def expire(monkeypatch, seconds):
+    # Avance l'horloge de fire_nrt sans attendre
+    now = time.time() + seconds
+    monkeypatch.setattr(fire_nrt.time, "time", lambda: now)
+
+BBOX = (9.5, 35.5, 10.8, 36.9)
+AREA = fire_nrt._area_key(BBOX)
+
+def test_bbox_query_downloads_only_its_area(firms):
+    today = utc_day(0)
+    firms.slices[(AREA, today)] = fixture_csv(today, 5)
+    firms.slices[("world", today)] = fixture_csv(today, 5000)
+
+    df = fire_nrt.load_nrt_day(today, BBOX)
+    assert len(df) == 5
+    assert [(area, status) for area, _, _, status in firms.log] == [(AREA, 200)]
+    # Octets par requête : tranche de la zone seulement, pas le CSV mondial
+    assert fire_nrt.get_nrt_stats()["bytes_downloaded"] == len(firms.slices[(AREA, today)])
+
+def test_fresh_slice_is_served_without_request(firms):
+    today = utc_day(0)
+    firms.slices[(AREA, today)] = fixture_csv(today, 5)
+    fire_nrt.load_nrt_day(today, BBOX)
+    fire_nrt.load_nrt_day(today, BBOX)
+    assert len(firms.log) == 1
+    assert fire_nrt.get_nrt_stats()["cache_hits"] == 1
+
+def test_expired_slice_is_revalidated_with_304(firms, monkeypatch):
+    today = utc_day(0)
+    firms.slices[(AREA, today)] = fixture_csv(today, 5)
+    fire_nrt.load_nrt_day(today, BBOX)
+
+    expire(monkeypatch, fire_nrt.NRT_REFRESH_SECONDS + 1)
+    df = fire_nrt.load_nrt_day(today, BBOX)
+    assert len(df) == 5
+    _, _, conditional, status = firms.log[-1]
+    assert status == 304
+    assert set(conditional) == {"If-None-Match", "If-Modified-Since"}
+    stats = fire_nrt.get_nrt_stats()
+    assert stats["not_modified"] == 1
+    assert stats["bytes_downloaded"] == len(firms.slices[(AREA, today)])
+
+def test_changed_slice_is_downloaded_again(firms, monkeypatch):
+    today = utc_day(0)
+    firms.slices[(AREA, today)] = fixture_csv(today, 5)
+    fire_nrt.load_nrt_day(today, BBOX)
+
+    firms.slices[(AREA, today)] = fixture_csv(today, 8)
+    expire(monkeypatch, fire_nrt.NRT_REFRESH_SECONDS + 1)
+    assert len(fire_nrt.load_nrt_day(today, BBOX)) == 8
+    assert firms.log[-1][3] == 200
+
+def test_closed_day_fetched_after_latency_is_final(firms, monkeypatch):
+    past = utc_day(3)
+    firms.slices[("world", past)] = fixture_csv(past, 5)
+    fire_nrt.load_nrt_day(past)
+    assert fire_nrt.nrt_slice_version(past) == "final"
+
+    expire(monkeypatch, 30 * 24 * 3600)
+    fire_nrt.load_nrt_day(past, BBOX)  # la tranche mondiale sert aussi les bbox
+    assert len(firms.log) == 1
+
+def test_slice_fetched_before_day_closed_is_refreshed(firms, monkeypatch):
+    yesterday = utc_day(1)
+    firms.slices[("world", yesterday)] = fixture_csv(yesterday, 5)
+    # Téléchargée avant la clôture UTC de la journée : pas encore définitive
+    monkeypatch.setattr(fire_nrt.time, "time", lambda: fire_nrt._final_after(yesterday) - 3600)
+    fire_nrt.load_nrt_day(yesterday)
+
+    # Re-vérifiée à l'échéance normale, puis définitive puisque obtenue après la clôture
+    final_check = fire_nrt._final_after(yesterday) - 3600 + fire_nrt.NRT_REFRESH_SECONDS + 1
+    monkeypatch.setattr(fire_nrt.time, "time", lambda: final_check)
+    fire_nrt.load_nrt_day(yesterday)
+    monkeypatch.setattr(fire_nrt.time, "time", lambda: final_check + 30 * 24 * 3600)
+    fire_nrt.load_nrt_day(yesterday)
+    assert [status for *_, status in firms.log] == [200, 304]
+
+@pytest.mark.parametrize("mode", ["error", "html"])
+def test_failure_falls_back_to_cached_slice(firms, monkeypatch, mode):
+    today = utc_day(0)
+    firms.slices[(AREA, today)] = fixture_csv(today, 5)
+    fire_nrt.load_nrt_day(today, BBOX)
+
+    firms.mode = mode
+    expire(monkeypatch, fire_nrt.NRT_REFRESH_SECONDS + 1)
+    df = fire_nrt.load_nrt_day(today, BBOX)
+    assert len(df) == 5
+    assert fire_nrt.get_nrt_stats()["stale_served"] == 1
+    # La réponse invalide n'a pas remplacé la tranche en cache
+    csv_path = fire_nrt._slice_paths(today, AREA)[0]
+    assert open(csv_path, "rb").read() == firms.slices[(AREA, today)]
+
+def test_invalid_body_without_cache_is_not_stored(firms):
+    today = utc_day(0)
+    firms.mode = "html"
+    with pytest.raises(ValueError):
+        fire_nrt.load_nrt_day(today, BBOX)
+    csv_path, meta_path = fire_nrt._slice_paths(today, AREA)
+    assert not fire_nrt.os.path.exists(csv_path) and not fire_nrt.os.path.exists(meta_path)
@@ -0,0 +1,162 @@
+#test_prompts.py
+import ast
+import re
+
+import pytest
+
+import prompts
+from prompts import agent_examples, example_tools, rank_examples, select_examples
+
+# Jeu d'évaluation hors ligne : requête -> tool attendu. Lieux absents des exemples, FR et EN mélangés.
+EVAL_QUERIES = [
+    ("Route from Tunis to Sousse", "get_route_info"),
+    ("Itinéraire de Lyon à Grenoble", "get_route_info"),
+    ("How long is the drive from Madrid to Valencia?", "get_route_info"),
+    ("Trajet entre Sfax et Gabès", "get_route_info"),
+    ("Are there fires near Tunis on 2025-07-21?", "detect_fire_tool"),
+    ("Incendies autour de Nabeul le 2025-08-02 dans un rayon de 50 km", "detect_fire_tool"),
+    ("Any wildfire in Athens on 2024-07-30?", "detect_fire_tool"),
+    ("What's the weather in Oslo?", "weather_tool"),
+    ("Météo à Sousse demain", "weather_tool"),
+    ("Weather forecast for Lima", "weather_tool"),
+    ("Floods in Italy in May 2023", "query_disaster_events_tool"),
+    ("Séismes en Turquie en février 2023", "query_disaster_events_tool"),
+    ("Storms in the Philippines in 2013", "query_disaster_events_tool"),
+    ("Sentinel-2 images of Rome in May 2024", "query_stac_catalog_with_retry"),
+    ("Images satellite de Sfax en mars 2022", "query_stac_catalog_with_retry"),
+    ("Surface water ingress risk in Lyon", "estimate_surface_water_ingress_tool"),
+    ("Risque de ruissellement et d'infiltration à Monastir", "estimate_surface_water_ingress_tool"),
+    ("What hazards threaten Manila?", "think_hazard"),
+    ("Aléas naturels à Agadir", "think_hazard"),
+    ("Tell me about Peru", "geo_info_tool"),
+    ("Quelle est la capitale et la population du Maroc ?", "geo_info_tool"),
+    ("What is 45 * 3?", "calculator"),
+    ("Calcule 1250 / 25", "calculator"),
+    ("Quelle heure est-il ?", "get_time"),
+    ("What is today's date?", "get_date"),
+    ("Quelle date était-il 90 jours avant le 2024-06-01 ?", "date_subtract"),
+    ("What date was it 7 days before 2025-01-10?", "date_subtract"),
+    ("Quelle est la veille du 2024-01-01 ?", "adjust_date"),
+]
+
+def test_selected_examples_cover_the_needed_tool():
+    missed = [(q, tool) for q, tool in EVAL_QUERIES if not any(tool in example_tools(i) for i in rank_examples(q))]
+    assert missed == []
+
+def test_best_example_uses_the_needed_tool():
+    missed = [(q, tool) for q, tool in EVAL_QUERIES if tool not in example_tools(rank_examples(q)[0])]
+    assert missed == []
+
+@pytest.mark.parametrize("template", ["Route from {} to Sousse", "Are there fires near {} on 2025-07-21?",
+                                      "Quel temps fait-il à {} ?"])
+def test_place_names_do_not_change_selection(template):
+    # "Tunis" et "Paris" figurent dans des exemples : ils ne doivent pas attirer ces exemples
+    selections = {tuple(rank_examples(template.format(place))) for place in ("Tunis", "Paris", "Ouagadougou")}
+    assert len(selections) == 1
+
+def test_examples_in_query_language_come_first():
+    english = rank_examples("Route from Tunis to Sousse")[0]
+    french = rank_examples("Itinéraire de Tunis à Sousse")[0]
+    assert example_tools(english) == example_tools(french) == ("get_route_info",)
+    assert prompts._language(agent_examples[english]["question"]) == "en"
+    assert prompts._language(agent_examples[french]["question"]) == "fr"
+
+def test_multi_tool_query_covers_each_tool():
+    tools = {t for i in rank_examples("Weather and fires in Tunis on 2025-07-21") for t in example_tools(i)}
+    assert {"weather_tool", "detect_fire_tool"} <= tools
+
+def test_every_agent_tool_has_intent_terms():
+    assert {step[0] for e in agent_examples for step in e["steps"]} <= set(prompts.TOOL_INTENT_TERMS)
+
+def test_no_intent_term_selects_nothing():
+    assert rank_examples("Tunis Paris Sousse") == []
+    assert select_examples("Tunis Paris Sousse") == ""
+
+def test_select_examples_respects_budget():
+    # Séparateurs compris
+    assert all(len(select_examples(q)) <= prompts.PROMPT_EXAMPLE_BUDGET for q, _ in EVAL_QUERIES)
+    text = select_examples("Weather and fires in Tunis on 2025-07-21", budget=1200)
+    assert 0 < len(text) <= 1200
+
+# ---------- Observations des exemples : format réel des tools ----------
+def observations(tool_name):
+    return [(tool_input, obs) for e in agent_examples for name, tool_input, obs in e["steps"] if name == tool_name]
+
+def test_every_tool_example_is_checked():
+    checked = {"get_date", "get_time", "calculator", "date_subtract", "adjust_date", "weather_tool", "detect_fire_tool",
+               "query_disaster_events_tool", "query_stac_catalog_with_retry", "estimate_surface_water_ingress_tool",
+               "think_hazard", "geo_info_tool", "get_route_info"}
+    assert {step[0] for e in agent_examples for step in e["steps"]} <= checked
+
+@pytest.mark.parametrize("tool_name", ["calculator", "date_subtract", "adjust_date"])
+def test_offline_tool_observations_are_the_tool_output(tool_name):
+    import tools_risk
+    tool = getattr(tools_risk, tool_name)
+    for tool_input, observation in observations(tool_name):
+        assert tool.invoke(tool_input) == observation
+
+def test_date_and_time_observations():
+    assert all(re.fullmatch(r"Today's date is \d{2}/\d{2}/\d{4}\.", obs) for _, obs in observations("get_date"))
+    assert all(re.fullmatch(r"The current time is \d{2}h\d{2}\.", obs) for _, obs in observations("get_time"))
+
+def test_weather_observations_are_format_weather_output():
+    from weather import _format_weather
+    for tool_input, observation in observations("weather_tool"):
+        current = re.search(r"à .+ : ([\d.]+)°C, vent ([\d.]+) km/h", observation)
+        days = re.findall(r"(\S+) : Max ([\d.]+)°C / Min ([\d.]+)°C / Pluie ([\d.]+) mm", observation)
+        data = {"current_weather": {"temperature": float(current[1]), "windspeed": float(current[2])},
+                "daily": {"time": [d[0] for d in days], "temperature_2m_max": [float(d[1]) for d in days],
+                          "temperature_2m_min": [float(d[2]) for d in days],
+                          "precipitation_sum": [float(d[3]) for d in days]}}
+        assert _format_weather(tool_input["city_name"], 5, data) == observation
+
+def test_fire_observations():
+    for _, observation in observations("detect_fire_tool"):
+        assert re.fullmatch(r"✅ \d+ incendie\(s\) détecté\(s\) autour de .+ le \d{4}-\d{2}-\d{2} dans un rayon de \d+ km\.\n"
+                            r"🗺️ Carte : incendies_[\w\-]+_[0-9a-f]{12}\.html", observation)
+
+def test_disaster_observations_are_formatted_events():
+    from flood_detection import format_event_human_readable
+    for _, observation in observations("query_disaster_events_tool"):
+        header, events, footer = re.fullmatch(r"(✅ Événements '.+' trouvés en .+ entre \S+ et \S+ :\n\n)(.+\n)"
+                                              r"(\n🗺️ Carte : \w+_map_[\w\-]+_[0-9a-f]{12}\.html)",
+                                              observation, re.DOTALL).groups()
+        for block in events.split("-" * 50 + "\n")[:-1]:
+            fields = re.fullmatch(r".+ \*\*(.+) en (.+) \(.+\)\*\*\n📍 Lieu : (.+)\n📅 Du (\d+)/(\d+)/(\d+) au "
+                                  r"(\d+)/(\d+)/(\d+)\n☠️ Décès : (.+)\n👥 Personnes affectées : (.+)\n"
+                                  r"🧭 Origine : (.+)\n", block).groups()
+            event = dict(zip(["disastertype", "country", "location", "startday", "startmonth", "startyear", "endday",
+                              "endmonth", "endyear", "totaldeaths", "totalaffected"], fields))
+            event["disastertype"] = event["disastertype"].lower()
+            if fields[-1] != "Non précisée":
+                event["origin"] = fields[-1]
+            assert format_event_human_readable(event) + "\n" == block + "-" * 50 + "\n"
+
+def test_dict_observations_have_the_tool_keys():
+    stac = [ast.literal_eval(obs) for _, obs in observations("query_stac_catalog_with_retry")]
+    assert all(list(o) == ["collection", "bbox", "start_date", "end_date", "images", "urls"] for o in stac)
+    assert all(list(img) == ["date", "cloud_cover", "thumbnail"] for o in stac for img in o["images"])
+
+    for _, obs in observations("estimate_surface_water_ingress_tool"):
+        result = ast.literal_eval(obs)
+        assert list(result) == ["Ingress_paths_estimate", "Mitigation_actions", "Statistics", "Maps", "Explanation", "error"]
+        assert list(result["Statistics"]) == ["DEM_shape", "Elevation_min", "Elevation_max", "Elevation_mean",
+                                              "Slope_mean", "Risk_zone_percent"]
+        assert list(result["Maps"]) == ["Elevation", "Slope", "FlowAccumulation", "Risk", "Risk_Folium"]
+
+def test_geo_info_observations_are_country_info_lines():
+    from geographic_info import _country_info
+    for _, observation in observations("geo_info_tool"):
+        keys = [line.split(" : ", 1)[0] for line in observation.splitlines()]
+        assert keys == list(_country_info({}))
+
+def test_return_direct_tools_end_the_example():
+    for e in agent_examples:
+        if e["steps"][-1][0] in ("think_hazard", "get_route_info"):
+            assert "answer" not in e
+    for _, observation in observations("think_hazard"):
+        assert re.fullmatch(r"Top 5 hazards for this location \(.+\):\n(- .+: (High|Medium|Low)\n){5}\n-{50}", observation)
+    for _, observation in observations("get_route_info"):
+        assert re.fullmatch(r"🚗 Itinéraire de .+ à .+\nDistance totale : [\d.]+ k?m\nDurée estimée   : .+\n\n"
+                            r"(\d+\. .+\n)+\n🗺️ Carte enregistrée dans le fichier : itineraire_[\w\-]+_[0-9a-f]{12}\.html",
+                            observation)
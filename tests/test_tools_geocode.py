@@ -0,0 +1,46 @@
+#test_tools_geocode.py
+import threading
+import time
+
+import pytest
+
+import tools_geocode
+
+@pytest.fixture
+def geocode_cache(tmp_path, monkeypatch):
+    # Cache SQLite temporaire, cache mémoire et compteurs vides
+    monkeypatch.setattr(tools_geocode, "GEOCODE_CACHE_DB", str(tmp_path / "geocode.sqlite"))
+    monkeypatch.setattr(tools_geocode, "_db", None)
+    monkeypatch.setattr(tools_geocode, "_memory", tools_geocode.OrderedDict())
+    monkeypatch.setattr(tools_geocode, "_stats", {"memory_hits": 0, "disk_hits": 0, "misses": 0})
+    yield tools_geocode
+    tools_geocode._db.close()
+
+def test_disk_hit_keeps_original_timestamp(geocode_cache, monkeypatch):
+    ttl = geocode_cache.GEOCODE_CACHE_TTL
+    now = time.time()
+    monkeypatch.setattr(geocode_cache.time, "time", lambda: now)
+    geocode_cache._disk_put("search?q=tunis", '[{"lat": "36.8", "lon": "10.18"}]')
+
+    # Relu depuis le disque peu avant l'expiration : l'entrée mémoire garde l'horodatage disque
+    monkeypatch.setattr(geocode_cache.time, "time", lambda: now + ttl - 10)
+    assert geocode_cache._cache_lookup("search?q=tunis") == [{"lat": "36.8", "lon": "10.18"}]
+    assert geocode_cache._memory["search?q=tunis"][0] == now
+
+    monkeypatch.setattr(geocode_cache.time, "time", lambda: now + ttl + 10)
+    assert geocode_cache._cache_lookup("search?q=tunis") is None
+    assert geocode_cache.get_cache_stats()["misses"] == 1
+
+def test_stats_are_thread_safe(geocode_cache):
+    geocode_cache._cache_store("search?q=paris", [])
+
+    def lookups():
+        for _ in range(2000):
+            geocode_cache._cache_lookup("search?q=paris")
+
+    threads = [threading.Thread(target=lookups) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert geocode_cache.get_cache_stats()["memory_hits"] == 8 * 2000
@@ -0,0 +1,268 @@
+#test_water_ingress.py
+import heapq
+import math
+from collections import deque
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+
+import dem_tiles
+import water_ingress
+from water_ingress import (
+    D8_NEIGHBORS, NO_FLOW, DiskRaster, blockwise_percentile, d8_flow_accumulation, d8_flow_direction,
+    d8_flow_direction_and_accum, fill_levels, palette_indices, priority_flood, raise_ulps, windowed_d8,
+    windowed_priority_flood,
+)
+
+# ---------- Références ----------
+def loop_flow_direction(dem):
+    # Boucle par cellule de l'implémentation d'origine (-1 : pas de voisin plus bas, bords)
+    h, w = dem.shape
+    dir_idx = np.full((h, w), -1, dtype=int)
+    for y in range(1, h - 1):
+        for x in range(1, w - 1):
+            zmin, kmin = dem[y, x], -1
+            for k, (dy, dx) in enumerate(D8_NEIGHBORS):
+                if dem[y + dy, x + dx] < zmin:
+                    zmin, kmin = dem[y + dy, x + dx], k
+            dir_idx[y, x] = kmin
+    return dir_idx
+
+def path_accumulation(dir_idx):
+    # Chaque cellule suit son chemin d'écoulement et ajoute 1 à toutes les cellules traversées
+    h, w = dir_idx.shape
+    acc = np.zeros((h, w), dtype=np.float64)
+    for y in range(h):
+        for x in range(w):
+            yy, xx = y, x
+            while True:
+                acc[yy, xx] += 1
+                k = dir_idx[yy, xx]
+                if k == NO_FLOW:
+                    break
+                dy, dx = D8_NEIGHBORS[k]
+                yy, xx = yy + dy, xx + dx
+    return acc
+
+def heap_priority_flood(dem):
+    # Priority-Flood d'origine (file de priorité cellule par cellule, Barnes 2014), sans epsilon
+    h, w = dem.shape
+    W = w + 2
+    filled = np.pad(dem.astype(np.float64), 1).ravel().tolist()
+    closed_mask = np.zeros((h + 2, W), dtype=bool)
+    closed_mask[[0, -1], :] = closed_mask[:, [0, -1]] = True
+    edge = np.zeros((h + 2, W), dtype=bool)
+    edge[1, 1:-1] = edge[-2, 1:-1] = edge[1:-1, 1] = edge[1:-1, -2] = True
+    closed_mask |= edge
+    closed = bytearray(closed_mask.ravel().tobytes())
+    offsets = [dy * W + dx for dy, dx in D8_NEIGHBORS]
+    heap = [(filled[c], c) for c in np.flatnonzero(edge.ravel()).tolist()]
+    heapq.heapify(heap)
+    pit = deque()
+    while heap or pit:
+        z, c = pit.popleft() if pit else heapq.heappop(heap)
+        for off in offsets:
+            n = c + off
+            if closed[n]:
+                continue
+            closed[n] = 1
+            if filled[n] <= z:
+                filled[n] = z
+                pit.append((z, n))
+            else:
+                heapq.heappush(heap, (filled[n], n))
+    return np.array(filled).reshape(h + 2, W)[1:-1, 1:-1]
+
+def random_dems():
+    rng = np.random.default_rng(0)
+    yield rng.random((17, 23))
+    yield rng.integers(0, 4, size=(15, 12)).astype(float)  # nombreux ex aequo et plats
+    y, x = np.mgrid[0:20, 0:20]
+    yield (x - 10.0) ** 2 + (y - 10.0) ** 2 + rng.random((20, 20))  # cuvette centrale
+    yield np.zeros((2, 5))
+
+def fill_dems():
+    yield from random_dems()
+    rng = np.random.default_rng(4)
+    yield rng.random((1, 9))
+    yield rng.integers(0, 3, size=(2, 11)).astype(float)
+    y, x = np.mgrid[0:40, 0:50]
+    yield -((x - 25.0) ** 2 + (y - 20.0) ** 2)  # dôme : aucune dépression
+    yield np.round(30 * np.sin(x / 5.0) * np.cos(y / 7.0) + rng.normal(size=(40, 50)).cumsum(axis=0))
+    yield rng.integers(-5, 5, size=(64, 64)).astype(np.float32)
+
+def windowed_dems():
+    y, x = np.mgrid[0:300, 0:300]
+    yield (x - 150.0) ** 2 + (y - 150.0) ** 2  # cuvette plus large que les fenêtres
+    yield -np.hypot(x - 150.0, y - 150.0)
+    yield np.round(-np.hypot(x - 150.0, y - 150.0) / 10)  # terrasses plates
+    yield np.zeros((200, 300))
+    rng = np.random.default_rng(5)
+    yield rng.integers(0, 5, size=(257, 190)).astype(float)
+    y, x = np.mgrid[0:65, 0:700]
+    yield np.round(30 * np.sin(x / 23.0) + rng.normal(size=(65, 700)).cumsum(axis=1) * 0.5)
+
+def write_tile(directory, row, col, values):
+    west, _, _, north = dem_tiles.tile_bounds(row, col)
+    with rasterio.open(directory / dem_tiles.tile_name(row, col), "w", driver="GTiff", height=values.shape[0],
+                       width=values.shape[1], count=1, dtype="float32", crs="EPSG:4326", nodata=np.nan,
+                       transform=from_origin(west, north, 1 / 1200, 1 / 1200)) as dst:
+        dst.write(values, 1)
+
+# ---------- Tests ----------
+@pytest.mark.parametrize("dem", list(random_dems()))
+def test_direction_matches_loop(dem):
+    expected = loop_flow_direction(dem)
+    expected = np.where(expected < 0, NO_FLOW, expected)
+    np.testing.assert_array_equal(d8_flow_direction(dem), expected)
+
+@pytest.mark.parametrize("dem", list(random_dems()))
+def test_accumulation_matches_reference(dem):
+    dir_idx = d8_flow_direction(dem)
+    np.testing.assert_allclose(d8_flow_accumulation(dir_idx), path_accumulation(dir_idx))
+
+@pytest.mark.parametrize("dem", list(fill_dems()))
+def test_fill_levels_match_heap_priority_flood(dem):
+    np.testing.assert_array_equal(fill_levels(dem), heap_priority_flood(dem))
+
+@pytest.mark.parametrize("dem", list(fill_dems()))
+def test_fill_labels_are_border_outlets(dem):
+    levels, labels = fill_levels(dem, with_labels=True)
+    h, w = dem.shape
+    ly, lx = np.divmod(labels, w)
+    assert ((ly == 0) | (ly == h - 1) | (lx == 0) | (lx == w - 1)).all()
+    assert (dem.astype(np.float64)[ly, lx] <= levels).all()
+
+@pytest.mark.parametrize("dem", list(fill_dems()))
+def test_resolved_flats_drain_to_border(dem):
+    conditioned = priority_flood(dem)
+    filled = fill_levels(dem)
+    assert (conditioned >= filled).all()
+    np.testing.assert_allclose(conditioned, filled, rtol=1e-9, atol=1e-9)
+    dir_idx = d8_flow_direction(conditioned)
+    if min(dem.shape) >= 3:
+        assert (dir_idx[1:-1, 1:-1] != NO_FLOW).all()
+    # Toute l'eau finit sur une cellule de bord sans direction
+    acc = d8_flow_accumulation(dir_idx)
+    assert acc[dir_idx == NO_FLOW].sum() == dem.size
+
+def test_raise_ulps_keeps_float_order():
+    values = np.array([-2.5, -0.0, 0.0, 1e-300, 3.0, -1e-300])
+    raised = raise_ulps(values, np.full(values.size, 3))
+    assert (raised > values).all()
+    np.testing.assert_array_equal(raise_ulps(values, np.zeros(values.size, dtype=np.int64)), values)
+
+@pytest.mark.parametrize("values, cmap", [
+    (np.random.default_rng(1).random((60, 80)).astype(np.float32) * 500, "terrain"),
+    (np.random.default_rng(2).random((40, 30)), "inferno"),
+    (np.random.default_rng(3).random((30, 30)) > 0.7, "Reds"),
+    (np.ones((10, 10), dtype=np.float32), "Blues"),
+])
+def test_palette_indices_render_same_image(tmp_path, values, cmap):
+    # Les rendus différés ne gardent que les indices de palette : l'image doit rester identique
+    plt.imsave(tmp_path / "full.png", values, cmap=cmap)
+    plt.imsave(tmp_path / "compact.png", palette_indices(values), cmap=cmap, vmin=0, vmax=255)
+    np.testing.assert_array_equal(plt.imread(tmp_path / "full.png"), plt.imread(tmp_path / "compact.png"))
+
+@pytest.mark.parametrize("dem", list(windowed_dems()))
+def test_windowed_conditioning_matches_whole_grid(dem):
+    # Fenêtres de 64 cellules : cuvettes et plats traversent plusieurs raccords
+    acc, dirs = windowed_d8(lambda r0, r1, c0, c1: dem[r0:r1, c0:c1], dem.shape, memory_mb=1, condition=True)
+    expected_acc, expected_dirs = d8_flow_direction_and_accum(dem, condition=True)
+    np.testing.assert_array_equal(dirs, expected_dirs)
+    np.testing.assert_array_equal(acc, expected_acc)
+
+@pytest.mark.parametrize("dem", list(windowed_dems())[:3])
+def test_windowed_priority_flood_matches_whole_grid(tmp_path, dem):
+    raster = DiskRaster(str(tmp_path / "conditioned.f64"), np.float64, dem.shape)
+    windowed_priority_flood(lambda r0, r1, c0, c1: dem[r0:r1, c0:c1], dem.shape, raster, memory_mb=1)
+    np.testing.assert_array_equal(raster[:, :], priority_flood(dem))
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["conditioned.f64"]
+
+def test_windowed_d8_keeps_results_on_disk(tmp_path):
+    dem = next(windowed_dems())
+    acc, dirs = windowed_d8(lambda r0, r1, c0, c1: dem[r0:r1, c0:c1], dem.shape, memory_mb=1, condition=True,
+                            workdir=str(tmp_path))
+    assert isinstance(acc, DiskRaster) and isinstance(dirs, DiskRaster)
+    expected_acc, _ = d8_flow_direction_and_accum(dem, condition=True)
+    np.testing.assert_array_equal(acc[:, :], expected_acc)
+
+@pytest.mark.parametrize("values", [
+    np.random.default_rng(6).random((130, 90)).astype(np.float32) * 100,
+    np.round(np.random.default_rng(7).normal(size=(70, 110)) * 3).astype(np.float32),
+    np.r_[np.ones(10000), np.arange(100)].reshape(101, 100).astype(np.float32),  # un rang occupé par 10 000 ex aequo
+    np.where(np.random.default_rng(8).random((60, 60)) < 0.3, np.nan, 1.5).astype(np.float32),
+])
+def test_blockwise_percentile_matches_numpy(tmp_path, values):
+    raster = DiskRaster(str(tmp_path / "values.f32"), np.float32, values.shape)
+    raster[:, :] = values
+    for q in (0, 5, 15, 50, 90, 95, 100):
+        assert blockwise_percentile(lambda: raster.blocks(37), q) == np.nanpercentile(values, q)
+
+def test_windowed_analysis_matches_in_memory(tmp_path, monkeypatch):
+    rng = np.random.default_rng(9)
+    for row in range(360, 363):
+        for col in range(100, 103):
+            y, x = np.mgrid[0:120, 0:120]
+            z = 80 * np.sin((col * 120 + x) / 60) + 60 * np.cos((row * 120 + 119 - y) / 45) + rng.normal(size=(120, 120))
+            z = np.round(z + 200).astype(np.float32)
+            if (row, col) == (361, 101):
+                z[10:20, 10:20] = np.nan
+            write_tile(tmp_path, row, col, z)
+    monkeypatch.setattr(dem_tiles, "DEM_FIXTURE_DIR", str(tmp_path))
+    lat, lon, buffer_deg = 36.15, 10.15, 0.12
+
+    stats, actions, images, risk, _ = water_ingress._analyse_in_memory(lat, lon, buffer_deg)
+    w_stats, w_actions, w_images, w_risk, _ = water_ingress._analyse_windowed(
+        (lon - buffer_deg, lat - buffer_deg, lon + buffer_deg, lat + buffer_deg), memory_mb=1)
+    assert w_stats["DEM_shape"] == stats["DEM_shape"]
+    for field in ("Elevation_min", "Elevation_max", "Elevation_mean", "Slope_mean", "Risk_zone_percent"):
+        assert w_stats[field] == pytest.approx(stats[field], rel=1e-6)
+    assert w_actions == actions
+    np.testing.assert_array_equal(w_risk, risk)
+    for name in images:
+        np.testing.assert_array_equal(w_images[name], images[name])
+
+def write_screening_tiles(directory):
+    rng = np.random.default_rng(10)
+    for row in (360, 361):
+        for col in (100, 101):
+            y, x = np.mgrid[0:120, 0:120]
+            z = 40 * np.sin((col * 120 + x) / 30) + 30 * np.cos((row * 120 + 119 - y) / 20) + rng.normal(size=(120, 120))
+            write_tile(directory, row, col, np.round(z + 100).astype(np.float32))
+
+SITES = [(36.03, 10.03), (36.05, 10.05), (36.07, 10.04), (36.15, 10.15), (36.12, 10.17), (36.04, 10.16),
+         (45.0, 3.0)]  # dernier site : tuile absente
+
+def test_screen_sites_chunks_keep_site_order(tmp_path, monkeypatch):
+    write_screening_tiles(tmp_path)
+    monkeypatch.setattr(dem_tiles, "DEM_FIXTURE_DIR", str(tmp_path))
+    serial = water_ingress.screen_sites(SITES, workers=1)
+    pooled = water_ingress.screen_sites(SITES, workers=2, chunk_size=2)
+    assert list(pooled["site"]) == [str(s) for s in SITES]
+    assert pooled.drop(columns="error").iloc[:-1].equals(serial.drop(columns="error").iloc[:-1])
+    assert pooled["error"].iloc[-1].startswith("Tuile DEM absente") and pooled["error"].iloc[:-1].isna().all()
+
+def test_screen_sites_writes_maps_per_site(tmp_path, monkeypatch):
+    write_screening_tiles(tmp_path)
+    monkeypatch.setattr(dem_tiles, "DEM_FIXTURE_DIR", str(tmp_path))
+    out_dir = tmp_path / "out"
+    table = water_ingress.screen_sites(SITES[:3], workers=2, out_dir=str(out_dir), chunk_size=1)
+    assert sorted(p.name for p in out_dir.iterdir()) == [water_ingress.site_dir_name(i, s) for i, s in enumerate(SITES[:3])]
+    for site_dir in table["output_dir"]:
+        names = sorted(p.name for p in (tmp_path / site_dir).iterdir())
+        assert [n.split("_")[1] for n in names] == ["elevation", "flowacc", "risk", "risk", "slope"]
+
+def test_artifact_output_restores_directory_and_policy(tmp_path):
+    import artifacts
+    saved = artifacts.ARTIFACT_DIR, artifacts.ARTIFACT_RENDER
+    with pytest.raises(RuntimeError):
+        with artifacts.artifact_output(str(tmp_path)):
+            assert (artifacts.ARTIFACT_DIR, artifacts.ARTIFACT_RENDER) == (str(tmp_path), "eager")
+            raise RuntimeError
+    assert (artifacts.ARTIFACT_DIR, artifacts.ARTIFACT_RENDER) == saved
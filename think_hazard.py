@@ -1,7 +1,7 @@
 # think_hazard.py
 from typing import Dict, List
 from langchain.tools import tool
-from geopy.geocoders import Nominatim
+from tools_geocode import nominatim_search, nominatim_reverse
 import random
 
 
@@ -19,22 +19,20 @@ def resolve_location(query: str) -> str:
     str
         The resolved location name (city, country, or both).
     """
-    geolocator = Nominatim(user_agent="hazard_locator")
-
     # Case: query looks like coordinates
     if "," in query:
         try:
             lat, lon = map(float, query.split(","))
-            location = geolocator.reverse((lat, lon), language="en")
-            if location:
-                return location.address
+            location = nominatim_reverse(lat, lon, **{"accept-language": "en"})
+            if location.get("display_name"):
+                return location["display_name"]
         except ValueError:
             pass  # Not valid coords, continue below
 
     # Case: query is a city or country name
-    location = geolocator.geocode(query, language="en")
-    if location:
-        return location.address
+    locations = nominatim_search(query, **{"accept-language": "en"})
+    if locations:
+        return locations[0]["display_name"]
 
     return "Unknown location"
 
@@ -1,14 +1,202 @@
 #tools_geocode.py
+# Géocodage Nominatim partagé par tous les outils :
+# cache LRU en mémoire + cache SQLite persistant (avec TTL) + limiteur de débit commun (1 req/s).
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+
 import requests
 
+from async_http import get_async_client
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org"
+NOMINATIM_USER_AGENT = "MetaplanetEarthAgent/1.0"
+NOMINATIM_MIN_INTERVAL = 1.0  # politique Nominatim : 1 requête par seconde maximum
+
+GEOCODE_CACHE_DB = os.getenv("GEOCODE_CACHE_DB", "geocode_cache.sqlite")
+GEOCODE_CACHE_TTL = float(os.getenv("GEOCODE_CACHE_TTL", 30 * 24 * 3600))  # 30 jours
+GEOCODE_MEMORY_SIZE = 1024
+
+_memory = OrderedDict()
+_memory_lock = threading.Lock()
+_db_lock = threading.Lock()
+_db = None
+_rate_lock = threading.Lock()
+_last_request = 0.0
+_stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+_stats_lock = threading.Lock()
+
+
+# ---------- Cache SQLite ----------
+def _get_db():
+    global _db
+    if _db is None:
+        _db = sqlite3.connect(GEOCODE_CACHE_DB, check_same_thread=False)
+        _db.execute("CREATE TABLE IF NOT EXISTS geocode_cache (key TEXT PRIMARY KEY, payload TEXT, created REAL)")
+        _db.commit()
+    return _db
+
+def _disk_get(key):
+    with _db_lock:
+        row = _get_db().execute("SELECT payload, created FROM geocode_cache WHERE key = ?", (key,)).fetchone()
+    if row is None or time.time() - row[1] > GEOCODE_CACHE_TTL:
+        return None
+    return row  # (payload, created) : l'horodatage d'origine borne aussi l'entrée mémoire
+
+def _disk_put(key, payload):
+    with _db_lock:
+        db = _get_db()
+        db.execute("INSERT OR REPLACE INTO geocode_cache (key, payload, created) VALUES (?, ?, ?)", (key, payload, time.time()))
+        db.commit()
+
+
+# ---------- Cache mémoire (LRU) ----------
+def _memory_get(key):
+    with _memory_lock:
+        entry = _memory.get(key)
+        if entry is None:
+            return None
+        created, value = entry
+        if time.time() - created > GEOCODE_CACHE_TTL:
+            del _memory[key]
+            return None
+        _memory.move_to_end(key)
+        return value
+
+def _memory_put(key, value, created=None):
+    with _memory_lock:
+        _memory[key] = (time.time() if created is None else created, value)
+        _memory.move_to_end(key)
+        while len(_memory) > GEOCODE_MEMORY_SIZE:
+            _memory.popitem(last=False)
+
+
+# ---------- Limiteur de débit partagé ----------
+def _wait_rate_limit():
+    global _last_request
+    with _rate_lock:
+        delay = NOMINATIM_MIN_INTERVAL - (time.time() - _last_request)
+        if delay > 0:
+            time.sleep(delay)
+        _last_request = time.time()
+
+
+def _count(name):
+    # Appelé depuis plusieurs threads (outils parallèles, asyncio.to_thread)
+    with _stats_lock:
+        _stats[name] += 1
+
+def _cache_lookup(key):
+    value = _memory_get(key)
+    if value is not None:
+        _count("memory_hits")
+        return value
+
+    row = _disk_get(key)
+    if row is not None:
+        _count("disk_hits")
+        payload, created = row
+        value = json.loads(payload)
+        _memory_put(key, value, created=created)
+        return value
+
+    _count("misses")
+    return None
+
+def _cache_store(key, value):
+    # Les résultats vides (lieu inconnu) sont aussi mis en cache ; les erreurs réseau non.
+    _disk_put(key, json.dumps(value))
+    _memory_put(key, value)
+
+def _cached_request(endpoint, params):
+    key = f"{endpoint}?{urlencode(sorted(params.items()))}"
+    value = _cache_lookup(key)
+    if value is not None:
+        return value
+
+    _wait_rate_limit()
+    response = requests.get(f"{NOMINATIM_URL}/{endpoint}", params=params,
+                            headers={"User-Agent": NOMINATIM_USER_AGENT}, timeout=10)
+    response.raise_for_status()
+    value = response.json()
+    _cache_store(key, value)
+    return value
+
+async def _acached_request(endpoint, params):
+    key = f"{endpoint}?{urlencode(sorted(params.items()))}"
+    value = _cache_lookup(key)
+    if value is not None:
+        return value
+
+    # Même limiteur que la version synchrone, attendu hors de la boucle d'événements
+    await asyncio.to_thread(_wait_rate_limit)
+    response = await get_async_client().get(f"{NOMINATIM_URL}/{endpoint}", params=params,
+                                            headers={"User-Agent": NOMINATIM_USER_AGENT}, timeout=10)
+    response.raise_for_status()
+    value = response.json()
+    _cache_store(key, value)
+    return value
+
+
+# ---------- API publique ----------
+def nominatim_search(query=None, **params):
+    """Recherche Nominatim (nom → résultats JSON), via le cache. Retourne une liste, vide si rien n'est trouvé."""
+    params = {"format": "json", "limit": 1, **params}
+    if query is not None:
+        params["q"] = query
+    return _cached_request("search", params)
+
+def nominatim_reverse(lat, lon, **params):
+    """Géocodage inversé Nominatim (lat/lon → adresse JSON), via le cache."""
+    params = {"format": "json", "lat": lat, "lon": lon, **params}
+    return _cached_request("reverse", params)
+
+def geocode_coordinates(query):
+    """Raccourci : retourne (lat, lon) du premier résultat, ou (None, None)."""
+    data = nominatim_search(query)
+    if not data:
+        return None, None
+    return float(data[0]["lat"]), float(data[0]["lon"])
+
+async def anominatim_search(query=None, **params):
+    """Variante async de nominatim_search (même cache, même limiteur)."""
+    params = {"format": "json", "limit": 1, **params}
+    if query is not None:
+        params["q"] = query
+    return await _acached_request("search", params)
+
+async def anominatim_reverse(lat, lon, **params):
+    """Variante async de nominatim_reverse."""
+    params = {"format": "json", "lat": lat, "lon": lon, **params}
+    return await _acached_request("reverse", params)
+
+async def ageocode_coordinates(query):
+    """Variante async de geocode_coordinates."""
+    data = await anominatim_search(query)
+    if not data:
+        return None, None
+    return float(data[0]["lat"]), float(data[0]["lon"])
+
+def get_cache_stats():
+    """Compteurs de hits/misses du cache de géocodage."""
+    with _stats_lock:
+        stats = dict(_stats)
+    hits = stats["memory_hits"] + stats["disk_hits"]
+    total = hits + stats["misses"]
+    return {**stats, "hits": hits, "hit_ratio": hits / total if total else 0.0}
+
+
 def get_city_bbox(city_name):
-    url = f'https://nominatim.openstreetmap.org/search?q={city_name}&format=json&limit=1'
     try:
-        response = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'})
-        data = response.json()
+        data = nominatim_search(city_name)
         if not data:
             return None, None, None, None, city_name
-        
+
         bbox = data[0].get('boundingbox', None)
         if bbox:
             lat_min = float(bbox[0])
@@ -22,6 +210,3 @@ def get_city_bbox(city_name):
             return None, None, None, None, city_name
     except Exception:
         return None, None, None, None, city_name
-
-
-
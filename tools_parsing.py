@@ -0,0 +1,48 @@
+#tools_parsing.py
+# Analyse légère des requêtes (lieu, date, rayon) : sans dépendance lourde, utilisable par le routeur
+# et le cache de réponses sans charger les modules des tools.
+import re
+
+# Dates relatives : jamais un nom de lieu ("Paris demain" → "Paris")
+_RELATIVE_DATE = r"demain|aujourd'hui|aujourd’hui|hier|ce soir|cette semaine|tomorrow|today|yesterday|tonight|this week|next week"
+# Mots de liaison qui terminent un nom de lieu ("Tunis le 2025-07-28" → "Tunis")
+_PLACE_STOP = re.compile(r"\s+(?:le|la|les|du|au|en|on|the|dans|sur|pour|for|within|in|at|near|depuis|entre|between|from|"
+                         + _RELATIVE_DATE + r")\b")
+# Candidats à écarter : date relative seule, article indéfini ("dans un rayon de 20 km"), rayon
+_NOT_A_PLACE = re.compile(r"^(?:(?:" + _RELATIVE_DATE + r")$|(?:un|une|a|an)\b)|rayon|radius", re.IGNORECASE)
+# Lieu introduit par une préposition ; "in"/"at" seulement devant une majuscule ("fires in Paris")
+PLACE_PREPOSITION = re.compile(r"(?:\b(?:à|dans|autour de|près de|proche de|vers|near|around|close to)"
+                               r"|\b(?:in|at)(?=\s+[A-ZÀ-Ý]))\s+([A-Za-zÀ-ÖØ-öø-ÿ\s\-']+)")
+
+def clean_place(text):
+    place = _PLACE_STOP.split(text.strip())[0]
+    return place.strip(" ?!.,;:'\"")
+
+def find_place(text, pattern=PLACE_PREPOSITION):
+    """Premier lieu introduit par une préposition de `pattern` (groupe 1), nettoyé ; None si aucun."""
+    pos = 0
+    while (match := pattern.search(text, pos)):
+        place = clean_place(match.group(1))
+        if place and not _NOT_A_PLACE.search(place):
+            return place
+        # Reprise à l'intérieur du groupe : "for tomorrow in New York" → "New York"
+        pos = match.start(1)
+    return None
+
+def extract_params_from_text(text, require_preposition=False):
+    """
+    Extrait une date (YYYY-MM-DD), une ville, et un rayon depuis un texte libre.
+    Avec require_preposition=True, la ville doit être introduite par une préposition (« à Tunis », « near Paris »).
+    """
+    date_match = re.search(r'\b(\d{4}-\d{2}-\d{2})\b', text)
+    date_str = date_match.group(1) if date_match else None
+
+    rayon_match = re.search(r'(\d+)\s?km', text)
+    rayon_km = int(rayon_match.group(1)) if rayon_match else 100  # défaut 100 km
+
+    ville = find_place(text)
+    if ville is None and date_match and not require_preposition:
+        # Si pas de préposition, on tente de prendre le texte avant la date ("Marseille 2023-07-21")
+        ville = clean_place(text[:date_match.start()]) or None
+
+    return date_str, ville, rayon_km
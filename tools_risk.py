@@ -1,19 +1,22 @@
 # tools_risk.py
+# Les modules des tools lourds (rasterio, matplotlib, pandas, folium, pycountry, dateparser...) ne sont pas
+# importés ici : get_all_tools renvoie des descripteurs qui chargent leur module au premier appel.
+import ast
+import asyncio
+import importlib
+import textwrap
 from datetime import date, datetime, timedelta
-from tools_stac import query_stac_catalog
+from functools import lru_cache
+from importlib.util import find_spec
+from typing import Optional
+from pydantic import create_model
+from langchain_core.tools import BaseTool
+from tools_stac import query_stac_catalog, aquery_stac_catalog
 from langchain.tools import tool
 import calendar
 import re
 from tools_geocode import get_city_bbox
-from tools_weather import get_weather_data
-from fire_detection import detect_fire_tool
-from flood_detection import query_disaster_events_tool
-from water_ingress import estimate_surface_water_ingress_tool
 from calendar import monthrange
-from think_hazard import think_hazard
-from geographic_info import geo_info_tool   
-from itinerary import get_route_info
-from weather import weather_tool
 mois_map = {
     "janvier": "01", "février": "02", "mars": "03", "avril": "04",
     "mai": "05", "juin": "06", "juillet": "07", "août": "08",
@@ -299,21 +302,81 @@ def query_stac_catalog_with_retry(params: str) -> dict:
 
 
 
+def with_coroutine(sync_tool, coroutine):
+    """
+    Copie d'un tool LangChain à laquelle on attache une implémentation async :
+    `invoke` garde la version synchrone, `ainvoke` utilise la coroutine (client httpx partagé).
+    Les tools sans coroutine sont exécutés par LangChain dans un thread de travail lors d'un `ainvoke`.
+    """
+    return sync_tool.model_copy(update={"coroutine": coroutine})
+
+
+# ---------- Registre paresseux ----------
+_ANNOTATIONS = {"str": str, "int": int, "float": float, "bool": bool, "dict": dict}
+
+def _annotation(node):
+    if isinstance(node, ast.Subscript) and getattr(node.value, "id", None) == "Optional":
+        return Optional[_annotation(node.slice)]
+    return _ANNOTATIONS[node.id]
+
+@lru_cache(maxsize=None)
+def _tool_spec(module, attr):
+    """
+    Nom, description, return_direct et schéma d'entrée du tool `module.attr` (décoré par @tool),
+    lus par analyse syntaxique du source, sans importer le module.
+    """
+    with open(find_spec(module).origin, encoding="utf-8") as f:
+        func = next(n for n in ast.parse(f.read()).body if isinstance(n, ast.FunctionDef) and n.name == attr)
+    decorator = next(d for d in func.decorator_list if getattr(getattr(d, "func", d), "id", None) == "tool")
+    name, return_direct = attr, False
+    if isinstance(decorator, ast.Call):
+        name = decorator.args[0].value if decorator.args else name
+        return_direct = any(k.arg == "return_direct" and ast.literal_eval(k.value) for k in decorator.keywords)
+
+    # Même description et mêmes champs que ceux produits par @tool
+    description = textwrap.dedent(ast.get_docstring(func, clean=False) or "").strip()
+    args = func.args.args
+    defaults = [...] * (len(args) - len(func.args.defaults)) + [ast.literal_eval(d) for d in func.args.defaults]
+    fields = {a.arg: (_annotation(a.annotation), d) for a, d in zip(args, defaults)}
+    return name, description, return_direct, create_model(name, **fields)
+
+class LazyTool(BaseTool):
+    """Descripteur de tool : le module d'implémentation n'est importé qu'au premier appel."""
+    module: str
+    attr: str
+    async_attr: Optional[str] = None  # coroutine de même signature (client httpx partagé)
+
+    def _run(self, *args, **kwargs):
+        return getattr(importlib.import_module(self.module), self.attr).func(*args, **kwargs)
+
+    async def _arun(self, *args, **kwargs):
+        # Premier import (souvent plusieurs centaines de ms) hors de la boucle d'événements
+        module = await asyncio.to_thread(importlib.import_module, self.module)
+        if self.async_attr is None:
+            return await asyncio.to_thread(getattr(module, self.attr).func, *args, **kwargs)
+        return await getattr(module, self.async_attr)(*args, **kwargs)
+
+def lazy_tool(module, attr, async_attr=None):
+    name, description, return_direct, args_schema = _tool_spec(module, attr)
+    return LazyTool(name=name, description=description, return_direct=return_direct, args_schema=args_schema,
+                    module=module, attr=attr, async_attr=async_attr)
+
+
 def get_all_tools():
     return [
         get_date,
         get_time,
         calculator,
-        query_stac_catalog,
+        with_coroutine(query_stac_catalog, aquery_stac_catalog),
         query_stac_catalog_with_retry,
         adjust_date,
-        get_weather_data,
+        lazy_tool("tools_weather", "get_weather_data"),
         date_subtract,
-        detect_fire_tool,
-        query_disaster_events_tool,
-        estimate_surface_water_ingress_tool,
-        think_hazard,
-        geo_info_tool,
-        get_route_info,
-        weather_tool
+        lazy_tool("fire_detection", "detect_fire_tool"),
+        lazy_tool("flood_detection", "query_disaster_events_tool", "aquery_disaster_events_tool"),
+        lazy_tool("water_ingress", "estimate_surface_water_ingress_tool"),
+        lazy_tool("think_hazard", "think_hazard"),
+        lazy_tool("geographic_info", "geo_info_tool", "ageo_info_tool"),
+        lazy_tool("itinerary", "get_route_info", "aget_route_info"),
+        lazy_tool("weather", "weather_tool", "aweather_tool")
     ]
\ No newline at end of file
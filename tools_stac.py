@@ -1,10 +1,197 @@
 # tools_stac.py
 from langchain_core.tools import tool
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+import asyncio
 import re
+import httpx
+from async_http import get_async_client
 
 STAC_API_URL = "https://earth-search.aws.element84.com/v1"
+STAC_PAGE_LIMIT = 100      # items par page pour la recherche sur l'intervalle complet
+STAC_MAX_PAGES = 20        # garde-fou sur la pagination (au-delà : jours manquants en requêtes journalières)
+STAC_MAX_WORKERS = 8       # requêtes journalières simultanées (mode de repli)
+
+# Session partagée : réutilise les connexions HTTP entre les appels
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=STAC_MAX_WORKERS, pool_maxsize=STAC_MAX_WORKERS))
+
+
+def _image_from_item(item, date_str):
+    return {
+        "date": date_str,
+        "cloud_cover": item["properties"].get("eo:cloud_cover", "N/A"),
+        "thumbnail": item["assets"].get("thumbnail", {}).get("href", "No thumbnail")
+    }
+
+
+def _interval_body(bbox, start_date, end_date, collection):
+    return {
+        "collections": [collection],
+        "bbox": bbox,
+        "datetime": f"{start_date}T00:00:00Z/{end_date}T23:59:59Z",
+        "limit": STAC_PAGE_LIMIT
+    }
+
+def _collect_page(page, by_day):
+    for item in page.get("features", []):
+        date_str = (item.get("properties", {}).get("datetime") or "")[:10]
+        if date_str and date_str not in by_day:
+            by_day[date_str] = _image_from_item(item, date_str)
+
+def _next_request(page, body):
+    """(url, méthode, corps) de la page suivante, ou None si la pagination est terminée."""
+    # Lien "next" : soit un POST avec un corps fusionné, soit un GET avec token dans l'URL
+    next_link = next((l for l in page.get("links", []) if l.get("rel") == "next"), None)
+    if not next_link or not page.get("features"):
+        return None
+    method = next_link.get("method", "GET").upper()
+    if method == "POST" and next_link.get("merge"):
+        body = {**body, **next_link.get("body", {})}
+    elif method == "POST":
+        body = next_link.get("body", body)
+    return next_link["href"], method, body
+
+def _day_list(start_date, end_date):
+    date_format = "%Y-%m-%d"
+    start = datetime.strptime(start_date, date_format)
+    end = datetime.strptime(end_date, date_format)
+    return [(start + timedelta(days=i)).strftime(date_format) for i in range((end - start).days + 1)]
+
+def _day_body(bbox, date_str, collection):
+    return {
+        "collections": [collection],
+        "bbox": bbox,
+        "datetime": f"{date_str}T00:00:00Z/{date_str}T23:59:59Z",
+        "limit": 1
+    }
+
+
+def search_stac_interval(bbox, start_date, end_date, collection, session=_session):
+    """
+    Une seule recherche STAC paginée sur tout l'intervalle, puis regroupement des items
+    par jour d'acquisition (premier item retenu par jour, comme l'ancien `limit: 1`).
+    Si la pagination dépasse STAC_MAX_PAGES, les jours sans image sont complétés par search_stac_per_day.
+    """
+    body = _interval_body(bbox, start_date, end_date, collection)
+    by_day = {}
+    url, method = f"{STAC_API_URL}/search", "POST"
+    for _ in range(STAC_MAX_PAGES):
+        if method == "POST":
+            response = session.post(url, json=body, timeout=30)
+        else:
+            response = session.get(url, timeout=30)
+        response.raise_for_status()
+        page = response.json()
+        _collect_page(page, by_day)
+
+        next_request = _next_request(page, body)
+        if next_request is None:
+            break
+        url, method, body = next_request
+    else:
+        # Pagination interrompue : les jours absents ne sont pas forcément sans image
+        missing = [d for d in _day_list(start_date, end_date) if d not in by_day]
+        for img in search_stac_per_day(bbox, start_date, end_date, collection, session=session, days=missing):
+            by_day[img["date"]] = img
+
+    return [by_day[d] for d in sorted(by_day)]
+
+
+def search_stac_per_day(bbox, start_date, end_date, collection, session=_session, max_workers=STAC_MAX_WORKERS, days=None):
+    """
+    Mode de repli : une requête `limit: 1` par jour (tous ceux de l'intervalle, ou `days`),
+    exécutées en parallèle sur la session partagée avec un nombre borné de workers.
+    """
+    days = _day_list(start_date, end_date) if days is None else days
+    if not days:
+        return []
+
+    def fetch(date_str):
+        response = session.post(f"{STAC_API_URL}/search", json=_day_body(bbox, date_str, collection), timeout=30)
+        if response.status_code == 200:
+            items = response.json().get("features", [])
+            if items:
+                return _image_from_item(items[0], date_str)
+        return None
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(days)))) as pool:
+        return [img for img in pool.map(fetch, days) if img]
+
+
+# ---------- Variantes async (client httpx partagé) ----------
+async def asearch_stac_interval(bbox, start_date, end_date, collection):
+    """Variante async de search_stac_interval."""
+    client = get_async_client()
+    body = _interval_body(bbox, start_date, end_date, collection)
+    by_day = {}
+    url, method = f"{STAC_API_URL}/search", "POST"
+    for _ in range(STAC_MAX_PAGES):
+        if method == "POST":
+            response = await client.post(url, json=body)
+        else:
+            response = await client.get(url)
+        response.raise_for_status()
+        page = response.json()
+        _collect_page(page, by_day)
+
+        next_request = _next_request(page, body)
+        if next_request is None:
+            break
+        url, method, body = next_request
+    else:
+        missing = [d for d in _day_list(start_date, end_date) if d not in by_day]
+        for img in await asearch_stac_per_day(bbox, start_date, end_date, collection, days=missing):
+            by_day[img["date"]] = img
+
+    return [by_day[d] for d in sorted(by_day)]
+
+async def asearch_stac_per_day(bbox, start_date, end_date, collection, max_workers=STAC_MAX_WORKERS, days=None):
+    """Variante async de search_stac_per_day : requêtes simultanées bornées par un sémaphore."""
+    client = get_async_client()
+    semaphore = asyncio.Semaphore(max(1, max_workers))
+
+    async def fetch(date_str):
+        async with semaphore:
+            response = await client.post(f"{STAC_API_URL}/search", json=_day_body(bbox, date_str, collection))
+        if response.status_code == 200:
+            items = response.json().get("features", [])
+            if items:
+                return _image_from_item(items[0], date_str)
+        return None
+
+    days = _day_list(start_date, end_date) if days is None else days
+    images = await asyncio.gather(*(fetch(d) for d in days))
+    return [img for img in images if img]
+
+
+def _parse_stac_params(params):
+    # Regex robuste pour séparer les 4 parties du paramètre
+    match = re.match(r"([\d\.\,\-]+)\s+(\d{4}-\d{2}-\d{2})\s+(\d{4}-\d{2}-\d{2})\s+([\w\-]+)", params.strip())
+    return match.groups() if match else None
+
+def _stac_result(bbox_str, start_date, end_date, collection, all_images):
+    if not all_images:
+        return {
+            "message": f"📭 Aucune image trouvée pour {collection} entre {start_date} et {end_date}.",
+            "collection": collection,
+            "bbox": bbox_str,
+            "start_date": start_date,
+            "end_date": end_date,
+            "images": []
+        }
+
+    return {
+        "collection": collection,
+        "bbox": bbox_str,
+        "start_date": start_date,
+        "end_date": end_date,
+        "images": all_images,
+        "urls": [img["thumbnail"] for img in all_images if "thumbnail" in img]
+    }
+
 
 @tool
 def query_stac_catalog(params: str) -> dict:
@@ -16,61 +203,41 @@ def query_stac_catalog(params: str) -> dict:
     Exemple : "10.1,36.7,10.3,36.9 2023-07-01 2023-07-10 sentinel-2-l2a"
     """
     try:
-        # Regex robuste pour séparer les 4 parties du paramètre
-        match = re.match(r"([\d\.\,\-]+)\s+(\d{4}-\d{2}-\d{2})\s+(\d{4}-\d{2}-\d{2})\s+([\w\-]+)", params.strip())
-        if not match:
+        parsed = _parse_stac_params(params)
+        if not parsed:
             return {"error": f"❌ Format invalide pour les paramètres STAC : {params}"}
 
-        bbox_str, start_date, end_date, collection = match.groups()
+        bbox_str, start_date, end_date, collection = parsed
         bbox = [float(x) for x in bbox_str.split(",")]
-        date_format = "%Y-%m-%d"
-        start = datetime.strptime(start_date, date_format)
-        end = datetime.strptime(end_date, date_format)
-
-        all_images = []
-        current = start
-
-        while current <= end:
-            date_str = current.strftime(date_format)
-            body = {
-                "collections": [collection],
-                "bbox": bbox,
-                "datetime": f"{date_str}T00:00:00Z/{date_str}T23:59:59Z",
-                "limit": 1
-            }
-
-            response = requests.post(f"{STAC_API_URL}/search", json=body)
-            if response.status_code == 200:
-                items = response.json().get("features", [])
-                if items:
-                    item = items[0]
-                    image_data = {
-                        "date": date_str,
-                        "cloud_cover": item["properties"].get("eo:cloud_cover", "N/A"),
-                        "thumbnail": item["assets"].get("thumbnail", {}).get("href", "No thumbnail")
-                    }
-                    all_images.append(image_data)
-
-            current += timedelta(days=1)
-
-        if not all_images:
-            return {
-                "message": f"📭 Aucune image trouvée pour {collection} entre {start_date} et {end_date}.",
-                "collection": collection,
-                "bbox": bbox_str,
-                "start_date": start_date,
-                "end_date": end_date,
-                "images": []
-            }
 
-        return {
-            "collection": collection,
-            "bbox": bbox_str,
-            "start_date": start_date,
-            "end_date": end_date,
-            "images": all_images,
-            "urls": [img["thumbnail"] for img in all_images if "thumbnail" in img]
-        }
+        try:
+            all_images = search_stac_interval(bbox, start_date, end_date, collection)
+        except requests.RequestException:
+            # Serveur qui refuse la recherche sur intervalle : requêtes journalières parallèles
+            all_images = search_stac_per_day(bbox, start_date, end_date, collection)
+
+        return _stac_result(bbox_str, start_date, end_date, collection, all_images)
+
+    except Exception as e:
+        return {"error": f"❌ Erreur lors de la requête STAC: {str(e)}"}
+
+
+async def aquery_stac_catalog(params: str) -> dict:
+    """Implémentation async de query_stac_catalog (utilisée via ainvoke)."""
+    try:
+        parsed = _parse_stac_params(params)
+        if not parsed:
+            return {"error": f"❌ Format invalide pour les paramètres STAC : {params}"}
+
+        bbox_str, start_date, end_date, collection = parsed
+        bbox = [float(x) for x in bbox_str.split(",")]
+
+        try:
+            all_images = await asearch_stac_interval(bbox, start_date, end_date, collection)
+        except httpx.HTTPError:
+            all_images = await asearch_stac_per_day(bbox, start_date, end_date, collection)
+
+        return _stac_result(bbox_str, start_date, end_date, collection, all_images)
 
     except Exception as e:
         return {"error": f"❌ Erreur lors de la requête STAC: {str(e)}"}
@@ -1,24 +1,141 @@
+#translate.py
+# Traduction avec cache persistant (SQLite) par segment : chaque ligne est traduite une seule fois
+# pour un couple (source, cible), les lignes manquantes sont envoyées en lots à un backend interchangeable.
+import os
+import re
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+
 from langdetect import detect
-from deep_translator import GoogleTranslator
 
+TRANSLATE_CACHE_DB = os.getenv("TRANSLATE_CACHE_DB", "translate_cache.sqlite")
+TRANSLATE_BACKEND = os.getenv("TRANSLATE_BACKEND", "google")  # "google" ou "offline" (aucune requête réseau)
+TRANSLATE_BATCH_CHARS = 4500  # limite GoogleTranslator : 5000 caractères par requête
+
+# Segments sans texte à traduire : vides, nombres/dates/ponctuation/emojis, URL, noms de fichiers
+_UNTRANSLATABLE = re.compile(r"^(?:[\W\d_]*|\s*https?://\S+\s*|\s*[\w\-]+\.(?:html|png|tif|csv)\s*)$")
+
+_db = None
+_db_lock = threading.Lock()
+_stats = {"segments": 0, "cache_hits": 0, "backend_calls": 0, "seconds": 0.0}
+
+
+# ---------- Backends ----------
+def _google_backend(texts, source, target):
+    from deep_translator import GoogleTranslator
+    return [GoogleTranslator(source=source, target=target).translate(t) for t in texts]
+
+def _offline_backend(texts, source, target):
+    return list(texts)
+
+BACKENDS = {"google": _google_backend, "offline": _offline_backend}
+_backend = BACKENDS[TRANSLATE_BACKEND]
+
+def set_translation_backend(backend):
+    """Remplace le backend : nom connu de BACKENDS ou fonction (textes, source, cible) -> textes traduits."""
+    global _backend
+    _backend = BACKENDS[backend] if isinstance(backend, str) else backend
+
+
+# ---------- Cache SQLite ----------
+def _get_db():
+    global _db
+    if _db is None:
+        _db = sqlite3.connect(TRANSLATE_CACHE_DB, check_same_thread=False)
+        _db.execute("CREATE TABLE IF NOT EXISTS translations (source TEXT, target TEXT, text TEXT, translated TEXT, "
+                    "PRIMARY KEY (source, target, text))")
+        _db.commit()
+    return _db
+
+def _cache_get_many(texts, source, target):
+    found = {}
+    with _db_lock:
+        db = _get_db()
+        for text in texts:
+            row = db.execute("SELECT translated FROM translations WHERE source = ? AND target = ? AND text = ?",
+                             (source, target, text)).fetchone()
+            if row is not None:
+                found[text] = row[0]
+    return found
+
+def _cache_put_many(pairs, source, target):
+    with _db_lock:
+        db = _get_db()
+        db.executemany("INSERT OR REPLACE INTO translations (source, target, text, translated) VALUES (?, ?, ?, ?)",
+                       [(source, target, text, translated) for text, translated in pairs])
+        db.commit()
+
+
+# ---------- Traduction par lots ----------
+def _batches(texts):
+    # Regroupe les segments en requêtes de moins de TRANSLATE_BATCH_CHARS caractères
+    batch, size = [], 0
+    for text in texts:
+        if batch and size + len(text) + 1 > TRANSLATE_BATCH_CHARS:
+            yield batch
+            batch, size = [], 0
+        batch.append(text)
+        size += len(text) + 1
+    if batch:
+        yield batch
+
+def _translate_batch(texts, source, target):
+    # Un seul appel par lot (segments joints par des retours à la ligne) ;
+    # si le découpage n'est pas préservé, repli segment par segment.
+    _stats["backend_calls"] += 1
+    joined = _backend(["\n".join(texts)], source, target)[0] or ""
+    parts = joined.split("\n")
+    if len(parts) == len(texts):
+        return parts
+    _stats["backend_calls"] += len(texts)
+    return _backend(texts, source, target)
+
+def translate_segments(text, source, target):
+    """Traduit `text` ligne par ligne en réutilisant le cache ; seules les lignes inconnues partent au backend."""
+    start = time.perf_counter()
+    lines = text.split("\n")
+    todo = sorted({line for line in lines if not _UNTRANSLATABLE.match(line)})
+    _stats["segments"] += len(todo)
+
+    translated = _cache_get_many(todo, source, target)
+    _stats["cache_hits"] += len(translated)
+    missing = [line for line in todo if line not in translated]
+    for batch in _batches(missing):
+        results = _translate_batch(batch, source, target)
+        pairs = [(line, result) for line, result in zip(batch, results) if result]
+        _cache_put_many(pairs, source, target)
+        translated.update(pairs)
+
+    _stats["seconds"] += time.perf_counter() - start
+    return "\n".join(translated.get(line, line) for line in lines)
+
+def get_translation_stats():
+    """Segments traduits, hits du cache, appels au backend et temps cumulé de traduction."""
+    return dict(_stats)
+
+
+# ---------- API publique ----------
+@lru_cache(maxsize=1024)
 def detect_language(text: str) -> str:
     try:
         return detect(text)
-    except:
+    except Exception:
         return "en"
 
 def translate_to_english(text: str) -> str:
     try:
-        return GoogleTranslator(source='auto', target='en').translate(text)
-    except:
+        return translate_segments(text, "auto", "en")
+    except Exception:
         return text
 
 def translate_from_english(text: str, target_lang: str) -> str:
     try:
         if target_lang == "en":
             return text
-        return GoogleTranslator(source='en', target=target_lang).translate(text)
-    except:
+        return translate_segments(text, "en", target_lang)
+    except Exception:
         return text
 
 def detect_and_translate_to_english(text: str):
@@ -1,90 +1,659 @@
+import math
 import os
-import requests
+import re
+import tempfile
+from collections import deque
+from contextlib import ExitStack
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
 import rasterio
+from rasterio.windows import Window
+
 import numpy as np
 import matplotlib.pyplot as plt
 import folium
 from langchain.tools import tool
-
-# ---------- Clé API OpenTopography ----------
-OPENTOP_API_KEY = os.getenv("OPENTOPO_API_KEY", "811d1f7cbb4522dc7e623ec70a657ed1")
+from map_render import add_mask_overlay
+from artifacts import artifact_id, artifact_output, defer_artifact
+from dem_tiles import dem_window_shape, get_tile, read_dem_around, tiles_for_window, write_dem_window
+from tools_geocode import nominatim_search, nominatim_reverse
 
 # ---------- Géocodage direct (nom → lat/lon) ----------
 def geocode_city(city_name: str):
-    url = "https://nominatim.openstreetmap.org/search"
-    params = {"q": city_name, "format": "json", "limit": 1}
-    r = requests.get(url, params=params, headers={"User-Agent": "SurfaceIngressTool"})
-    data = r.json()
+    data = nominatim_search(city_name)
     if not data:
         raise ValueError(f"Ville non trouvée: {city_name}")
     return float(data[0]["lat"]), float(data[0]["lon"])
 
 # ---------- Géocodage inversé (lat/lon → ville/pays) ----------
 def reverse_geocode(lat: float, lon: float):
-    url = "https://nominatim.openstreetmap.org/reverse"
-    params = {"lat": lat, "lon": lon, "format": "json", "zoom": 10, "addressdetails": 1}
-    r = requests.get(url, params=params, headers={"User-Agent": "SurfaceIngressTool"})
-    data = r.json()
+    data = nominatim_reverse(lat, lon, zoom=10, addressdetails=1)
     address = data.get("address", {})
     city = address.get("city") or address.get("town") or address.get("village") or address.get("hamlet")
     country = address.get("country")
     country_code = address.get("country_code")
     return {"city": city, "country": country, "country_iso": country_code.upper() if country_code else None}
 
-# ---------- Télécharger DEM ----------
-def download_dem_opentopo(lat: float, lon: float, buffer_deg=0.01, dem_file="dem_city.tif"):
-    min_lat, max_lat = lat - buffer_deg, lat + buffer_deg
-    min_lon, max_lon = lon - buffer_deg, lon + buffer_deg
-    url = "https://portal.opentopography.org/API/globaldem"
-    params = {
-        "demtype": "SRTMGL3",
-        "west": min_lon, "south": min_lat, "east": max_lon, "north": max_lat,
-        "outputFormat": "GTiff", "API_Key": OPENTOP_API_KEY
-    }
-    r = requests.get(url, params=params, stream=True)
-    if r.status_code != 200:
-        raise ValueError(f"Impossible de télécharger le DEM. Statut: {r.status_code}")
-    with open(dem_file, "wb") as f:
-        for chunk in r.iter_content(chunk_size=8192):
-            if chunk:
-                f.write(chunk)
-    return dem_file
-
 # ---------- D8 Flow Direction & Accumulation ----------
-def d8_flow_direction_and_accum(dem: np.ndarray):
-    neighbors = [(-1,-1),(-1,0),(-1,1),(0,-1),(0,1),(1,-1),(1,0),(1,1)]
+# Ordre des voisins D8 (dy, dx) : l'indice k est le code de direction renvoyé dans dir_idx.
+D8_NEIGHBORS = [(-1,-1),(-1,0),(-1,1),(0,-1),(0,1),(1,-1),(1,0),(1,1)]
+NO_FLOW = 255  # code uint8 des cellules sans voisin plus bas (et des bords)
+
+def d8_flow_direction(dem: np.ndarray):
+    """Direction D8 vectorisée (uint8) : indice du voisin le plus bas (strictement), NO_FLOW sinon et sur les bords."""
     h, w = dem.shape
-    dir_idx = np.full((h, w), -1, dtype=int)
-    for y in range(1, h-1):
-        for x in range(1, w-1):
-            z0 = dem[y, x]
-            zmin = z0
-            kmin = -1
-            for k, (dy, dx) in enumerate(neighbors):
-                z = dem[y + dy, x + dx]
-                if z < zmin:
-                    zmin = z
-                    kmin = k
-            dir_idx[y, x] = kmin
-    acc = np.ones_like(dem, dtype=np.float32)
-    indices = np.argsort(dem, axis=None)
-    ys, xs = np.unravel_index(indices, dem.shape)
-    for y, x in zip(ys, xs):
-        k = dir_idx[y, x]
-        if k >= 0:
-            dy, dx = neighbors[k]
-            yy, xx = y + dy, x + dx
-            if 0 <= yy < h and 0 <= xx < w:
-                acc[yy, xx] += acc[y, x]
+    dir_idx = np.full((h, w), NO_FLOW, dtype=np.uint8)
+    if h < 3 or w < 3:
+        return dir_idx
+    center = dem[1:-1, 1:-1]
+    shifted = np.stack([dem[1+dy:h-1+dy, 1+dx:w-1+dx] for dy, dx in D8_NEIGHBORS])
+    kmin = np.argmin(shifted, axis=0)  # premier minimum, comme la boucle d'origine
+    zmin = np.take_along_axis(shifted, kmin[None], axis=0)[0]
+    dir_idx[1:-1, 1:-1] = np.where(zmin < center, kmin, NO_FLOW)
+    return dir_idx
+
+def d8_flow_accumulation(dir_idx: np.ndarray, weights=None):
+    """
+    Accumulation par vagues topologiques (Kahn) : chaque itération traite en bloc toutes les cellules sans amont restant.
+    `weights` : apport propre de chaque cellule (1 par défaut).
+    """
+    h, w = dir_idx.shape
+    offsets = np.array([dy * w + dx for dy, dx in D8_NEIGHBORS])
+    flat_dir = dir_idx.ravel()
+    src = np.flatnonzero(flat_dir != NO_FLOW)
+    receivers = np.full(h * w, -1, dtype=np.int64)
+    receivers[src] = src + offsets[flat_dir[src]]
+
+    acc = np.ones(h * w, dtype=np.float32) if weights is None else weights.astype(np.float32).ravel()
+    indegree = np.bincount(receivers[src], minlength=h * w)
+    frontier = np.flatnonzero((indegree == 0) & (receivers >= 0))
+    while frontier.size:
+        targets = receivers[frontier]
+        np.add.at(acc, targets, acc[frontier])
+        np.subtract.at(indegree, targets, 1)
+        targets = np.unique(targets)
+        frontier = targets[(indegree[targets] == 0) & (receivers[targets] >= 0)]
+    return acc.reshape(h, w)
+
+# ---------- Conditionnement du DEM (Priority-Flood, Barnes et al. 2014) ----------
+# Niveau de remplissage d'une cellule = plus petite altitude de col d'un chemin vers le bord (chemin minimax),
+# soit ce que calcule Priority-Flood. Ici sans file de priorité cellule par cellule : contractions de Borůvka
+# sur tableaux numpy (chaque composante suit son arête sortante minimale, niveau = max(poids, niveau suivant)).
+D8_FORWARD = [(0, 1), (1, -1), (1, 0), (1, 1)]  # une direction par paire de voisins
+_INT64_MIN = np.int64(-2 ** 63)
+
+def _jump_to_roots(nxt, weight, label):
+    # Saut de pointeurs : racine de chaque arbre, poids maximal rencontré jusqu'à elle, premier label non nul
+    ptr, top, lab = nxt, weight, label
+    while True:
+        nxt2 = ptr[ptr]
+        if np.array_equal(nxt2, ptr):
+            return ptr, top, lab
+        top = np.maximum(top, top[ptr])
+        lab = np.where(lab >= 0, lab, lab[ptr])
+        ptr = nxt2
+
+def _contract(root, sink):
+    # Identifiants compacts des composantes (une par racine) ; retourne (composante de chaque nœud, puits, nombre)
+    ids = np.cumsum(root == np.arange(root.size), dtype=root.dtype) - 1
+    return ids[root], int(ids[sink]), int(ids[-1]) + 1
+
+def _dedupe_edges(a, b, w, o):
+    # Une arête par paire de composantes : celle de poids minimal, avec son origine
+    lo, hi = np.minimum(a, b), np.maximum(a, b)
+    if lo.size == 0:
+        return lo, hi, w, o
+    key = lo.astype(np.int64) * (int(hi.max()) + 1) + hi
+    order = np.argsort(key)
+    ks, ws = key[order], w[order]
+    first = np.empty(ks.size, dtype=bool)
+    first[0] = True
+    np.not_equal(ks[1:], ks[:-1], out=first[1:])
+    group = np.cumsum(first) - 1
+    cand = np.flatnonzero(ws == np.minimum.reduceat(ws, np.flatnonzero(first))[group])
+    keep = np.empty(cand.size, dtype=bool)
+    keep[0] = True
+    np.not_equal(group[cand][1:], group[cand][:-1], out=keep[1:])
+    sel = order[cand[keep]]
+    return lo[sel], hi[sel], w[sel], o[sel]
+
+def _resolve(nxt, weight, label, sink):
+    # Cycles de deux nœuds (même arête choisie des deux côtés) : le plus petit identifiant devient racine
+    node = np.arange(nxt.size)
+    nxt[sink] = sink
+    mutual = (nxt[nxt] == node) & (nxt != node) & (node < nxt)
+    nxt[mutual] = node[mutual]
+    is_root = nxt == node
+    weight = np.where(is_root, -np.inf, weight)
+    label = np.where(is_root, -1, label)
+    return _jump_to_roots(nxt, weight, label)
+
+def minimax_levels(n, sink, a, b, w, origin):
+    """
+    Niveau minimax vers `sink` de chaque nœud d'un graphe non orienté (arêtes a–b de poids w), et son label :
+    `origin` de la dernière arête empruntée vers le puits. Ex aequo départagés par l'indice d'arête (ordre total).
+    """
+    levels = np.full(n, -np.inf)
+    labels = np.full(n, -1, dtype=np.int64)
+    if n == 1:
+        return levels, labels
+    m = a.size
+    src, ww = np.concatenate([a, b]), np.concatenate([w, w])
+    eid = np.tile(np.arange(m), 2)
+    best_w = np.full(n, np.inf)
+    np.minimum.at(best_w, src, ww)
+    cand = ww == best_w[src]
+    best_e = np.full(n, m)
+    np.minimum.at(best_e, src[cand], eid[cand])
+    node = np.arange(n)
+    e = np.minimum(best_e, m - 1)
+    nxt = np.where(best_e < m, np.where(a[e] == node, b[e], a[e]), node)
+    root, top, lab = _resolve(nxt, best_w, np.where(nxt == sink, origin[e], -1), sink)
+
+    comp, csink, k = _contract(root, sink)
+    resolved = root == sink
+    ca, cb = comp[a], comp[b]
+    keep = ca != cb
+    # Au niveau suivant, une arête vers le puits hérite du label du côté déjà résolu
+    new_origin = np.where(b == sink, origin, np.where(resolved[b], lab[b], np.where(resolved[a], lab[a], -1)))
+    up_levels, up_labels = minimax_levels(k, csink, *_dedupe_edges(ca[keep], cb[keep], w[keep], new_origin[keep]))
+    levels = np.where(resolved, top, np.maximum(top, up_levels[comp]))
+    labels = np.where(resolved, lab, up_labels[comp])
+    levels[sink] = -np.inf
+    return levels, labels
+
+def fill_levels(dem: np.ndarray, with_labels=False):
+    """
+    Niveaux de remplissage (float64) de la grille, les cellules de bord servant d'exutoires.
+    Avec `with_labels`, aussi l'indice (à plat) de la cellule de bord par laquelle chaque cellule s'écoule.
+    """
+    h, w = dem.shape
+    n = h * w
+    dem = dem.astype(np.float64)
+    # Arête sortante minimale de chaque cellule (poids max(z, z_voisin)) : ex aequo départagés par l'identifiant
+    # du voisin (ordre D8_NEIGHBORS) ; l'arête vers l'extérieur ne l'emporte qu'à poids strictement inférieur
+    zpad = np.pad(dem, 1, constant_values=np.inf)
+    best_w = np.full((h, w), np.inf)
+    best_k = np.zeros((h, w), dtype=np.uint8)
+    wk, better = np.empty((h, w)), np.empty((h, w), dtype=bool)
+    for k, (dy, dx) in enumerate(D8_NEIGHBORS):
+        np.maximum(dem, zpad[1 + dy:h + 1 + dy, 1 + dx:w + 1 + dx], out=wk)
+        np.less(wk, best_w, out=better)
+        np.copyto(best_w, wk, where=better)
+        best_k[better] = k
+    del zpad, wk, better
+    border = np.zeros((h, w), dtype=bool)
+    border[[0, -1], :] = border[:, [0, -1]] = True
+    to_sink = (border & (dem < best_w)).ravel()
+
+    # Identifiants sur 32 bits dès que possible : la mémoire de travail est dominée par ces tableaux
+    idx = np.int32 if n < 2 ** 31 - 1 else np.int64
+    offsets = np.array([dy * w + dx for dy, dx in D8_NEIGHBORS], dtype=idx)
+    node = np.arange(n + 1, dtype=idx)
+    nxt = np.append(node[:n] + offsets[best_k.ravel()], idx(n))
+    nxt[:n][to_sink] = n
+    weight = np.append(np.where(to_sink, dem.ravel(), best_w.ravel()), -np.inf)
+    del best_w, best_k
+    root, top, lab = _resolve(nxt, weight, np.where(nxt == n, node, -1), n)
+    comp, csink, k = _contract(root, n)
+    resolved = root == n
+
+    # Graphe contracté : arêtes entre composantes voisines, et cellules de bord non résolues vers l'extérieur
+    comp2, res2, lab2 = comp[:n].reshape(h, w), resolved[:n].reshape(h, w), lab[:n].reshape(h, w)
+    parts = []
+    for dy, dx in D8_FORWARD:
+        su = (slice(0, h - dy), slice(max(0, -dx), w - max(0, dx)))
+        sv = (slice(dy, h), slice(max(0, dx), w + min(0, dx)))
+        cu, cv = comp2[su], comp2[sv]
+        keep = cu != cv
+        ew = np.maximum(dem[su][keep], dem[sv][keep])
+        if with_labels:
+            eo = np.where(res2[sv][keep], lab2[sv][keep], np.where(res2[su][keep], lab2[su][keep], -1))
+        else:
+            eo = np.full(ew.size, -1)
+        parts.append(_dedupe_edges(cu[keep], cv[keep], ew, eo))  # dédoublonnage par direction : pic mémoire réduit
+    edge = np.flatnonzero(border.ravel() & ~resolved[:n])
+    parts.append((comp[edge], np.full(edge.size, csink), dem.ravel()[edge], edge))
+    up_levels, up_labels = minimax_levels(k, csink, *_dedupe_edges(*(np.concatenate(p) for p in zip(*parts))))
+
+    levels = np.where(resolved, top, np.maximum(top, up_levels[comp]))[:n].reshape(h, w)
+    if not with_labels:
+        return levels
+    return levels, np.where(resolved, lab, up_labels[comp])[:n].reshape(h, w)
+
+def raise_ulps(values, steps):
+    """`values` (float64) relevées de `steps` ulps : ordre des flottants préservé, y compris sous zéro."""
+    bits = values.view(np.int64)
+    ordered = np.where(bits < 0, _INT64_MIN - bits, bits) + steps
+    return np.where(ordered < 0, _INT64_MIN - ordered, ordered).view(np.float64)
+
+def flat_distances(fpad, flat, seeds, seed_dist, dist=None):
+    """
+    BFS par fronts dans les plats (cellules `flat` de même niveau) : distance en cellules de chaque cellule plate
+    à l'exutoire le plus proche. `seeds` (indices à plat dans `fpad`) partent de la distance `seed_dist`.
+    `dist` : distances déjà connues (int32, à plat), seules celles qui diminuent sont propagées.
+    """
+    f, flat = fpad.ravel(), flat.ravel()
+    offsets = np.array([dy * fpad.shape[1] + dx for dy, dx in D8_NEIGHBORS])
+    dist = np.full(f.size, np.iinfo(np.int32).max, dtype=np.int32) if dist is None else dist
+    order = np.argsort(seed_dist, kind="stable")
+    seeds, seed_dist = seeds[order], seed_dist[order]
+    i, t = 0, 0
+    frontier = np.empty(0, dtype=np.int64)
+    while frontier.size or i < seeds.size:
+        if not frontier.size:
+            t = max(t, int(seed_dist[i]))
+        j = int(np.searchsorted(seed_dist, t, side="right"))
+        injected = seeds[i:j][dist[seeds[i:j]] > t]
+        i = j
+        dist[injected] = t
+        frontier = np.concatenate([frontier, injected])
+        nb = (frontier[:, None] + offsets).ravel()
+        ok = flat[nb] & (dist[nb] > t + 1) & (f[nb] == np.repeat(f[frontier], offsets.size))
+        frontier = np.unique(nb[ok])
+        dist[frontier] = t + 1
+        t += 1
+    return dist
+
+def _flat_cells(fpad):
+    # Cellules sans voisin strictement plus bas (niveaux `fpad` avec anneau de garde à +inf)
+    h, w = fpad.shape[0] - 2, fpad.shape[1] - 2
+    level = fpad[1:-1, 1:-1]
+    lower = np.zeros((h, w), dtype=bool)
+    for dy, dx in D8_NEIGHBORS:
+        lower |= fpad[1 + dy:h + 1 + dy, 1 + dx:w + 1 + dx] < level
+    return ~lower
+
+def priority_flood(dem: np.ndarray, resolve_flats=True):
+    """
+    Remplit les dépressions (niveaux identiques à Priority-Flood, O(n log n) en opérations numpy).
+    Avec `resolve_flats`, chaque cellule plate (remplie ou plate d'origine) est relevée d'autant d'ulps que
+    sa distance à l'exutoire du plat : toute cellule a alors un voisin strictement plus bas menant au bord,
+    D8 ne laisse plus de NO_FLOW à l'intérieur.
+    """
+    h, w = dem.shape
+    levels = fill_levels(dem)
+    if not resolve_flats or h < 3 or w < 3:
+        return levels
+    fpad = np.pad(levels, 1, constant_values=np.inf)
+    flat = _flat_cells(fpad)
+    flat[[0, -1], :] = flat[:, [0, -1]] = False
+    flat_pad = np.pad(flat, 1)
+    near_flat = np.zeros((h, w), dtype=bool)
+    for dy, dx in D8_NEIGHBORS:
+        near_flat |= flat_pad[1 + dy:h + 1 + dy, 1 + dx:w + 1 + dx]
+    seeds = np.flatnonzero(np.pad(~flat & near_flat, 1))
+    dist = flat_distances(fpad, flat_pad, seeds, np.zeros(seeds.size, dtype=np.int64))
+    steps = np.where(flat, dist.reshape(h + 2, w + 2)[1:-1, 1:-1], 0).astype(np.int64)
+    return raise_ulps(levels, steps)
+
+def d8_flow_direction_and_accum(dem: np.ndarray, condition=False):
+    # Avec condition=True, DEM conditionné (cuvettes remplies, plats drainés) avant D8 ; sinon D8 vectorisé seul
+    if condition:
+        dem = priority_flood(dem)
+    dir_idx = d8_flow_direction(dem)
+    acc = d8_flow_accumulation(dir_idx)
     return acc, dir_idx
 
+# ---------- Rasters sur disque ----------
+class DiskRaster:
+    """
+    Raster brut (lignes contiguës) dans un fichier, lu et écrit par blocs `raster[r0:r1, c0:c1]` comme un tableau :
+    seules les pages du bloc sont projetées en mémoire, le temps de l'accès.
+    """
+    def __init__(self, path, dtype, shape, fill=0):
+        self.path, self.dtype, self.shape = path, np.dtype(dtype), tuple(shape)
+        with open(path, "wb") as f:
+            f.truncate(self.shape[0] * self.shape[1] * self.dtype.itemsize)
+        if fill:
+            step = max(1, (1 << 22) // max(1, self.shape[1]))
+            for r0 in range(0, self.shape[0], step):
+                self[r0:r0 + step, :] = fill
+
+    def _rows(self, key, mode):
+        rows, cols = key
+        r0, r1, _ = rows.indices(self.shape[0])
+        c0, c1, _ = cols.indices(self.shape[1])
+        r1 = max(r0, r1)
+        view = np.memmap(self.path, dtype=self.dtype, mode=mode, offset=r0 * self.shape[1] * self.dtype.itemsize,
+                         shape=(r1 - r0, self.shape[1])) if r1 > r0 else np.empty((0, self.shape[1]), self.dtype)
+        return view[:, c0:c1]
+
+    def __getitem__(self, key):
+        return np.array(self._rows(key, "r"))
+
+    def __setitem__(self, key, values):
+        self._rows(key, "r+")[...] = values
+
+    def blocks(self, side):
+        """Blocs successifs d'au plus side x side cellules (statistiques en flux)."""
+        h, w = self.shape
+        for r0 in range(0, h, side):
+            for c0 in range(0, w, side):
+                yield self[r0:r0 + side, c0:c0 + side]
+
+def order_statistics(blocks, ranks, cap=1 << 22, bins=4096):
+    """
+    Valeurs de rang `ranks` (0 = minimum, NaN ignorés) des valeurs fournies par `blocks()` (itérable de tableaux,
+    relu à chaque passe) : histogrammes successifs sur l'intervalle qui contient le rang, puis tri des seules
+    valeurs de l'intervalle final (au plus `cap`). Mémoire bornée par un bloc et `cap`.
+    """
+    bounds = [(float(np.nanmin(b)), float(np.nanmax(b))) for b in blocks() if b.size and not np.isnan(b).all()]
+    lo, hi = min(b[0] for b in bounds), max(b[1] for b in bounds)
+    out = []
+    for rank in ranks:
+        a, b, below = lo, hi, 0
+        while a < b:
+            scale = bins / (b - a)
+            bin_of = lambda v: np.minimum(((v - a) * scale).astype(np.int64), bins - 1)
+            in_range = lambda: (blk[(blk >= a) & (blk <= b)] for blk in blocks())
+            hist = sum(np.bincount(bin_of(v), minlength=bins) for v in in_range())
+            cum = np.cumsum(hist)
+            j = int(np.searchsorted(cum, rank - below, side="right"))
+            below += int(cum[j - 1]) if j else 0
+            members = (v[bin_of(v) == j] for v in in_range())
+            if hist[j] <= cap:
+                a = b = float(np.partition(np.concatenate(list(members)), rank - below)[rank - below])
+            else:
+                extent = [(m.min(), m.max()) for m in members if m.size]
+                a, b = float(min(e[0] for e in extent)), float(max(e[1] for e in extent))
+        out.append(a)
+    return out
+
+def blockwise_percentile(blocks, q, dtype=np.float32, cap=1 << 22):
+    """np.nanpercentile(valeurs, q) (interpolation linéaire de numpy) calculé bloc par bloc par order_statistics."""
+    n = sum(int(np.count_nonzero(~np.isnan(b))) for b in blocks())
+    index = (n - 1) * (q / 100)
+    prev = min(max(math.floor(index), 0), n - 1)
+    gamma = index - prev
+    a, b = (np.dtype(dtype).type(v) for v in order_statistics(blocks, [prev, min(prev + 1, n - 1)], cap))
+    diff = b - a
+    return float(b - diff * (1 - gamma)) if gamma >= 0.5 else float(a + diff * gamma)
+
+# ---------- Traitement par fenêtres (grandes zones) ----------
+# Conditionnement exact sur toute la zone (remplissage local puis graphe des niveaux de débordement entre
+# fenêtres, plats drainés par itérations aux raccords), DEM conditionné sur disque ; puis D8 fenêtre par fenêtre,
+# accumulation locale et raccord des flux qui traversent les bords de fenêtres.
+WATER_MEMORY_TARGET_MB = float(os.getenv("WATER_MEMORY_TARGET_MB", 256))
+WINDOW_HALO = 2  # D8 ne lit que les voisins immédiats ; plats : anneau voisin et ses propres voisins
+_BYTES_PER_WINDOW_CELL = 160  # remplissage (identifiants, arêtes contractées), 8 voisins décalés, accumulation
+
+def window_side(memory_mb=WATER_MEMORY_TARGET_MB):
+    """Côté (en cellules) des fenêtres dont le traitement tient dans `memory_mb`, halo compris."""
+    return max(64, int(math.sqrt(memory_mb * 1024 ** 2 / _BYTES_PER_WINDOW_CELL)) - 2 * WINDOW_HALO)
+
+def _windows(shape, side):
+    h, w = shape
+    return [(r0, min(r0 + side, h), c0, min(c0 + side, w)) for r0 in range(0, h, side) for c0 in range(0, w, side)]
+
+def _border_mask(h, w):
+    border = np.zeros((h, w), dtype=bool)
+    border[[0, -1], :] = border[:, [0, -1]] = True
+    return border
+
+def _seam_pairs(shape, side):
+    # Paires de cellules voisines (D8) situées de part et d'autre d'un bord de fenêtre
+    h, w = shape
+    us, vs = [], []
+    for c in range(side, w, side):
+        rows = np.arange(h)
+        for dr in (-1, 0, 1):
+            r = rows[(rows + dr >= 0) & (rows + dr < h)]
+            us.append(np.stack([r, np.full(r.size, c - 1)]))
+            vs.append(np.stack([r + dr, np.full(r.size, c)]))
+    for r in range(side, h, side):
+        cols = np.arange(w)
+        for dc in (-1, 0, 1):
+            c = cols[(cols + dc >= 0) & (cols + dc < w)]
+            us.append(np.stack([np.full(c.size, r - 1), c]))
+            vs.append(np.stack([np.full(c.size, r), c + dc]))
+    if not us:
+        return np.empty((2, 0), dtype=np.int64), np.empty((2, 0), dtype=np.int64)
+    return np.concatenate(us, axis=1), np.concatenate(vs, axis=1)
+
+def windowed_priority_flood(read_block, shape, raster, memory_mb=WATER_MEMORY_TARGET_MB):
+    """
+    priority_flood de toute la zone, fenêtre par fenêtre, écrit dans `raster` (DiskRaster float64) : résultat
+    identique à la grille entière. Chaque fenêtre est remplie seule, avec pour chaque cellule la cellule de bord
+    de fenêtre par laquelle elle s'écoule ; les niveaux de débordement entre ces exutoires (graphe des bords de
+    fenêtres) donnent le niveau final max(niveau local, niveau de l'exutoire).
+    """
+    h, w = shape
+    side = window_side(memory_mb)
+    windows = _windows(shape, side)
+    labels = DiskRaster(raster.path + ".labels", np.int32, shape)
+    perims, bases, node_z, parts = [], [], [], []
+    base = 0
+    for r0, r1, c0, c1 in windows:
+        block = np.asarray(read_block(r0, r1, c0, c1), dtype=np.float64)
+        wh, ww = block.shape
+        levels, lab = fill_levels(block, with_labels=True)
+        perim = np.flatnonzero(_border_mask(wh, ww))
+        node = (base + np.searchsorted(perim, lab)).astype(np.int32)
+        raster[r0:r1, c0:c1] = levels
+        labels[r0:r1, c0:c1] = node
+        # Arêtes entre exutoires voisins dans la fenêtre, de poids max des niveaux locaux
+        local = []
+        for dy, dx in D8_FORWARD:
+            su = (slice(0, wh - dy), slice(max(0, -dx), ww - max(0, dx)))
+            sv = (slice(dy, wh), slice(max(0, dx), ww + min(0, dx)))
+            keep = node[su] != node[sv]
+            ew = np.maximum(levels[su][keep], levels[sv][keep])
+            local.append(_dedupe_edges(node[su][keep], node[sv][keep], ew, np.full(ew.size, -1, dtype=np.int32)))
+        parts.append(_dedupe_edges(*(np.concatenate(p) for p in zip(*local))))
+        # Chaque cellule de bord rejoint son exutoire à son niveau local ; les bords de la zone mènent au puits (-1)
+        own = base + np.arange(perim.size)
+        py, px = np.divmod(perim, ww)
+        outer = (r0 + py == 0) | (r0 + py == h - 1) | (c0 + px == 0) | (c0 + px == w - 1)
+        z = block.ravel()[perim]
+        parts.append((own, node.ravel()[perim], levels.ravel()[perim], np.full(perim.size, -1)))
+        parts.append((own[outer], np.full(int(outer.sum()), -1), z[outer], np.full(int(outer.sum()), -1)))
+        perims.append(perim)
+        bases.append(base)
+        node_z.append(z)
+        base += perim.size
+
+    # Arêtes entre fenêtres voisines : poids max des altitudes des deux cellules
+    n_wc = -(-w // side)
+    def node_at(rc):
+        wi = (rc[0] // side) * n_wc + rc[1] // side
+        ids = np.empty(rc.shape[1], dtype=np.int64)
+        for k in np.unique(wi).tolist():
+            sel = wi == k
+            r0, _, c0, c1 = windows[k]
+            ids[sel] = bases[k] + np.searchsorted(perims[k], (rc[0][sel] - r0) * (c1 - c0) + rc[1][sel] - c0)
+        return ids
+    node_z = np.concatenate(node_z)
+    u, v = _seam_pairs(shape, side)
+    nu, nv = node_at(u), node_at(v)
+    parts.append((nu, nv, np.maximum(node_z[nu], node_z[nv]), np.full(nu.size, -1)))
+
+    a, b, ew, eo = (np.concatenate(p) for p in zip(*parts))
+    a, b = np.where(a < 0, base, a), np.where(b < 0, base, b)
+    keep = a != b
+    spill, _ = minimax_levels(base + 1, base, *_dedupe_edges(a[keep], b[keep], ew[keep], eo[keep]))
+
+    for r0, r1, c0, c1 in windows:
+        raster[r0:r1, c0:c1] = np.maximum(raster[r0:r1, c0:c1], spill[labels[r0:r1, c0:c1]])
+    os.remove(labels.path)
+    if min(h, w) >= 3:
+        _windowed_flats(raster, windows)
+    return raster
+
+def _windowed_flats(raster, windows):
+    # Distances dans les plats par BFS fenêtre par fenêtre, les distances déjà connues de l'anneau voisin servant
+    # de sources : on recommence les fenêtres voisines tant que leurs bords changent (valeurs décroissantes)
+    h, w = raster.shape
+    unknown = np.iinfo(np.int32).max
+    dist = DiskRaster(raster.path + ".dist", np.int32, raster.shape, fill=unknown)
+    pending, queued = deque(range(len(windows))), set(range(len(windows)))
+    ring_seen = {}  # fenêtre -> distances de son anneau lors de son dernier passage
+    while pending:
+        k = pending.popleft()
+        queued.discard(k)
+        r0, r1, c0, c1 = windows[k]
+        R0, R1, C0, C1 = max(r0 - WINDOW_HALO, 0), min(r1 + WINDOW_HALO, h), max(c0 - WINDOW_HALO, 0), min(c1 + WINDOW_HALO, w)
+        fpad = np.pad(raster[R0:R1, C0:C1], 1, constant_values=np.inf)
+        flat = _flat_cells(fpad)
+        rows, cols = np.mgrid[R0:R1, C0:C1]
+        keep = (rows >= r0 - 1) & (rows <= r1) & (cols >= c0 - 1) & (cols <= c1)
+        flat &= keep & (rows > 0) & (rows < h - 1) & (cols > 0) & (cols < w - 1)
+        inner = (rows >= r0) & (rows < r1) & (cols >= c0) & (cols < c1)
+        flat_pad = np.pad(flat, 1)
+        # Reprise incrémentale : distances connues de la fenêtre conservées, seules les cellules de l'anneau dont
+        # la distance a baissé depuis le dernier passage servent de sources (sources locales : premier passage)
+        known = dist[R0:R1, C0:C1]
+        ring = flat & ~inner
+        ring_known = known[ring]
+        first = k not in ring_seen
+        improved = np.zeros(flat.shape, dtype=bool)
+        improved[ring] = ring_known < (np.full(ring_known.size, unknown) if first else ring_seen[k])
+        ring_seen[k] = ring_known
+        if not first and not improved.any():
+            continue
+        seeds = np.flatnonzero(np.pad(improved, 1))
+        seed_dist = np.pad(known, 1).ravel()[seeds]
+        if first:
+            near_flat = np.zeros(flat.shape, dtype=bool)
+            for dy, dx in D8_NEIGHBORS:
+                near_flat |= flat_pad[1 + dy:flat.shape[0] + 1 + dy, 1 + dx:flat.shape[1] + 1 + dx]
+            local = np.flatnonzero(np.pad(~flat & near_flat & keep, 1))
+            seeds = np.concatenate([local, seeds])
+            seed_dist = np.concatenate([np.zeros(local.size, dtype=np.int64), seed_dist])
+        d = flat_distances(fpad, flat_pad, seeds, seed_dist,
+                           np.pad(np.where(inner & flat, known, unknown), 1, constant_values=unknown).ravel())
+        d = d.reshape(fpad.shape)[1:-1, 1:-1]
+        old = known[r0 - R0:r1 - R0, c0 - C0:c1 - C0]
+        new = np.where(flat[r0 - R0:r1 - R0, c0 - C0:c1 - C0], d[r0 - R0:r1 - R0, c0 - C0:c1 - C0], old)
+        changed = new != old
+        if not changed.any():
+            continue
+        dist[r0:r1, c0:c1] = new
+        if changed[1:-1, 1:-1].sum() < changed.sum():  # un bord a changé : les fenêtres voisines le lisent
+            for j, (q0, q1, p0, p1) in enumerate(windows):
+                if j != k and j not in queued and q0 <= r1 and q1 >= r0 and p0 <= c1 and p1 >= c0:
+                    pending.append(j)
+                    queued.add(j)
+
+    for r0, r1, c0, c1 in windows:
+        d = dist[r0:r1, c0:c1]
+        raster[r0:r1, c0:c1] = raise_ulps(raster[r0:r1, c0:c1], np.where(d < unknown, d, 0).astype(np.int64))
+    os.remove(dist.path)
+
+def _window_receivers(d):
+    # Récepteur local (indice à plat) de chaque cellule, -1 si pas d'exutoire ou si le flux sort de la fenêtre
+    h, w = d.shape
+    rows, cols = np.divmod(np.arange(h * w), w)
+    codes = d.ravel()
+    has_flow = codes != NO_FLOW
+    dy = np.array([o[0] for o in D8_NEIGHBORS] + [0])[np.where(has_flow, codes, 8)]
+    dx = np.array([o[1] for o in D8_NEIGHBORS] + [0])[np.where(has_flow, codes, 8)]
+    tr, tc = rows + dy, cols + dx
+    inside = has_flow & (tr >= 0) & (tr < h) & (tc >= 0) & (tc < w)
+    return np.where(inside, tr * w + tc, -1), has_flow & ~inside, tr, tc
+
+def windowed_d8(read_block, shape, memory_mb=WATER_MEMORY_TARGET_MB, condition=False, workdir=None):
+    """
+    Directions (uint8) et accumulation (float32) D8 d'une zone de `shape` cellules, fenêtre par fenêtre.
+    `read_block(r0, r1, c0, c1)` retourne le DEM des lignes r0:r1 et colonnes c0:c1 (sans NaN).
+    Avec `condition`, la zone entière est d'abord conditionnée par windowed_priority_flood (DEM conditionné sur
+    disque) : résultats identiques à d8_flow_direction_and_accum(dem, condition=True).
+    Avec `workdir`, directions et accumulation sont des DiskRaster de ce répertoire, sinon des tableaux.
+    """
+    with ExitStack() as stack:
+        scratch = workdir or stack.enter_context(tempfile.TemporaryDirectory())
+        if condition:
+            conditioned = windowed_priority_flood(read_block, shape, DiskRaster(os.path.join(scratch, "conditioned.f64"),
+                                                                                np.float64, shape), memory_mb)
+            read_block = lambda r0, r1, c0, c1: conditioned[r0:r1, c0:c1]
+        if workdir:
+            dirs = DiskRaster(os.path.join(workdir, "dirs.u8"), np.uint8, shape, fill=NO_FLOW)
+            acc = DiskRaster(os.path.join(workdir, "acc.f32"), np.float32, shape)
+        else:
+            dirs, acc = np.full(shape, NO_FLOW, dtype=np.uint8), np.zeros(shape, dtype=np.float32)
+        _windowed_flow(read_block, shape, window_side(memory_mb), dirs, acc)
+        if condition:
+            os.remove(conditioned.path)
+    return acc, dirs
+
+def _windowed_flow(read_block, shape, side, dirs, acc):
+    h, w = shape
+    windows = _windows(shape, side)
+
+    # Passe 1 : directions, accumulation locale ; pour chaque cellule de bord, la sortie de fenêtre qu'elle rejoint
+    exits, exit_flux, exit_target = [], [], []   # sorties (indices globaux), flux local, cellule réceptrice hors fenêtre
+    edge_cells, edge_exit = [], []               # cellules de bord, sortie atteinte ou -1 (cuvette / bord de la zone)
+    for r0, r1, c0, c1 in windows:
+        R0, R1, C0, C1 = max(r0 - WINDOW_HALO, 0), min(r1 + WINDOW_HALO, h), max(c0 - WINDOW_HALO, 0), min(c1 + WINDOW_HALO, w)
+        d = d8_flow_direction(read_block(R0, R1, C0, C1))[r0 - R0:r1 - R0, c0 - C0:c1 - C0]
+        dirs[r0:r1, c0:c1] = d
+        wh, ww = d.shape
+
+        local, leaving, tr, tc = _window_receivers(d)
+        local_dirs = np.where(leaving.reshape(wh, ww), NO_FLOW, d).astype(np.uint8)
+        local_acc = d8_flow_accumulation(local_dirs)
+        acc[r0:r1, c0:c1] = local_acc
+
+        to_global = lambda flat: (r0 + flat // ww) * w + (c0 + flat % ww)
+        e = np.flatnonzero(leaving)
+        exits.append(to_global(e))
+        exit_flux.append(local_acc.ravel()[e].astype(np.float64))
+        exit_target.append((r0 + tr[e]) * w + (c0 + tc[e]))
+
+        # Saut de pointeurs : chaque cellule pointe vers le terminus de son chemin dans la fenêtre
+        ptr = np.where(local >= 0, local, np.arange(wh * ww))
+        while True:
+            nxt = ptr[ptr]
+            if np.array_equal(nxt, ptr):
+                break
+            ptr = nxt
+        p = np.flatnonzero(_border_mask(wh, ww))
+        end = ptr[p]
+        edge_cells.append(to_global(p))
+        edge_exit.append(np.where(leaving[end], to_global(end), -1))
+
+    # Raccord : graphe des sorties (sortie -> sortie atteinte dans la fenêtre voisine), cumulé par vagues topologiques
+    exits, flux, target = np.concatenate(exits), np.concatenate(exit_flux), np.concatenate(exit_target)
+    edge_cells, edge_exit = np.concatenate(edge_cells), np.concatenate(edge_exit)
+    order = np.argsort(exits)
+    exits, flux, target = exits[order], flux[order], target[order]
+    edge_order = np.argsort(edge_cells)
+    reached = edge_exit[edge_order][np.searchsorted(edge_cells[edge_order], target)]
+    downstream = np.where(reached >= 0, np.searchsorted(exits, reached), -1)
+    indegree = np.bincount(downstream[downstream >= 0], minlength=exits.size)
+    frontier = np.flatnonzero(indegree == 0)
+    while frontier.size:
+        frontier = frontier[downstream[frontier] >= 0]
+        nxt = downstream[frontier]
+        np.add.at(flux, nxt, flux[frontier])
+        np.subtract.at(indegree, nxt, 1)
+        nxt = np.unique(nxt)
+        frontier = nxt[indegree[nxt] == 0]
+
+    # Passe 2 : propagation des apports externes (flux cumulé de chaque sortie) le long des chemins de chaque fenêtre
+    t_rows, t_cols = np.divmod(target, w)
+    for r0, r1, c0, c1 in windows:
+        sel = (t_rows >= r0) & (t_rows < r1) & (t_cols >= c0) & (t_cols < c1)
+        if sel.any():
+            weights = np.zeros((r1 - r0, c1 - c0), dtype=np.float32)
+            np.add.at(weights, (t_rows[sel] - r0, t_cols[sel] - c0), flux[sel])
+            d = dirs[r0:r1, c0:c1]
+            _, leaving, _, _ = _window_receivers(d)
+            local_dirs = np.where(leaving.reshape(d.shape), NO_FLOW, d).astype(np.uint8)
+            acc[r0:r1, c0:c1] += d8_flow_accumulation(local_dirs, weights)
+
 # ---------- Actions d'atténuation ----------
 def mitigation_rules(dem, slope, acc, risk_mask):
-    actions = []
     risk_percent = 100.0 * np.sum(risk_mask) / risk_mask.size
     mean_slope_rel = np.nanmean(slope)
     high_acc_mask = acc >= np.percentile(acc, 95)
     low_mask = dem <= np.percentile(dem, 5)
+    return mitigation_actions(risk_percent, mean_slope_rel, np.any(high_acc_mask & risk_mask), np.any(low_mask & risk_mask))
+
+def mitigation_actions(risk_percent, mean_slope_rel, high_acc_at_risk, low_at_risk):
+    """Actions selon les agrégats de la zone (grandes zones : agrégats calculés fenêtre par fenêtre)."""
+    actions = []
 
     if risk_percent >= 10:
         actions += [{"description": "Créer des rigoles ou bermes pour détourner l’eau en amont.",
@@ -98,13 +667,13 @@ def mitigation_rules(dem, slope, acc, risk_mask):
                     {"description": "Ajouter un caniveau linéaire devant les seuils raccordé au réseau pluvial.",
                      "resource": "https://www.sdea.fr/images/SDEA/GEPU/Guide_pratique_particulier_WEB.pdf"}]
 
-    if np.any(high_acc_mask & risk_mask):
+    if high_acc_at_risk:
         actions += [{"description": "Installer un drain français le long des lignes d’écoulement.",
                      "resource": "https://www.sdea.fr/images/SDEA/GEPU/Guide_pratique_particulier_WEB.pdf"},
                     {"description": "Entretenir les caniveaux/avaloirs et vérifier les exutoires.",
                      "resource": "https://www.cerema.fr/fr/actualites/gestion-durable-eaux-pluviales-etude-benefices-apportes"}]
 
-    if np.any(low_mask & risk_mask):
+    if low_at_risk:
         actions += [{"description": "Créer un point bas contrôlé avec pompe.",
                      "resource": "https://www.biodiversite-centrevaldeloire.fr/comprendre/les-solutions-d-adaptation-fondees-sur-la-nature/des-solutions-pour-reduire-les-risques-inondations"},
                     {"description": "Remblayer légèrement les cuvettes proches des façades.",
@@ -130,85 +699,249 @@ def mitigation_rules(dem, slope, acc, risk_mask):
             seen.add(a["description"])
     return unique_actions
 
+# ---------- Entrées compactes des rendus différés ----------
+def palette_indices(values, lo=None, hi=None):
+    """
+    Indices de palette (uint8) que plt.imsave calcule pour `values` (normalisation min/max, palette de 256 couleurs) :
+    l'image est la même qu'avec le tableau flottant, pour 4 à 8 fois moins de mémoire retenue.
+    `lo`/`hi` : min/max de toute l'image quand `values` n'en est qu'un bloc.
+    """
+    lo = float(np.nanmin(values)) if lo is None else lo
+    hi = float(np.nanmax(values)) if hi is None else hi
+    if hi <= lo:
+        return np.zeros(values.shape, dtype=np.uint8)
+    idx = (values - lo) * (256.0 / (hi - lo))
+    return np.minimum(idx, 255).astype(np.uint8)
+
+def _defer_image(art_id, indices, cmap):
+    defer_artifact(art_id, lambda path: plt.imsave(path, indices, cmap=cmap, vmin=0, vmax=255), nbytes=indices.nbytes)
+
 # ---------- Estimation principale ----------
-def estimate_surface_water_ingress(location_input):
+def _analyse_in_memory(lat, lon, buffer_deg):
+    # DEM lu depuis le cache de tuiles (téléchargées une seule fois)
+    dem, transform = read_dem_around(lat, lon, buffer_deg)
+    dem[np.isnan(dem)] = np.nanmedian(dem)
+
+    gy, gx = np.gradient(dem)
+    slope = np.sqrt(gx**2 + gy**2)
+    del gy, gx
+    # DEM conditionné par Priority-Flood : les cuvettes ne coupent pas les chemins d'écoulement
+    acc, _ = d8_flow_direction_and_accum(dem, condition=True)
+
+    low_mask = dem <= np.nanpercentile(dem, 15)
+    flat_mask = slope <= 0.02
+    highacc = acc >= np.percentile(acc, 90)
+    risk_mask = (low_mask & flat_mask) | highacc
+
+    stats = {
+        "DEM_shape": dem.shape,
+        "Elevation_min": float(np.nanmin(dem)),
+        "Elevation_max": float(np.nanmax(dem)),
+        "Elevation_mean": float(np.nanmean(dem)),
+        "Slope_mean": float(np.nanmean(slope)),
+        "Risk_zone_percent": float(100.0 * np.sum(risk_mask) / risk_mask.size)
+    }
+    actions = mitigation_rules(dem, slope, acc, risk_mask)
+    images = {"Elevation": palette_indices(dem), "Slope": palette_indices(slope),
+              "FlowAccumulation": palette_indices(acc), "Risk": palette_indices(risk_mask)}
+    return stats, actions, images, risk_mask, transform
+
+def _analyse_windowed(bounds, memory_mb):
+    # Mêmes calculs que _analyse_in_memory, fenêtre par fenêtre sur des DiskRaster : seuls les indices de palette
+    # et le masque de risque (1 octet par cellule) restent en mémoire pour les rendus
+    side = window_side(memory_mb)
+    with tempfile.TemporaryDirectory() as workdir:
+        mosaic = os.path.join(workdir, "dem.tif")
+        transform = write_dem_window(*bounds, mosaic, mem_limit=max(1, int(memory_mb)))
+        with rasterio.Env(GDAL_CACHEMAX=max(1, int(memory_mb))), rasterio.open(mosaic) as src:
+            shape = src.shape
+            windows = _windows(shape, side)
+            dem = DiskRaster(os.path.join(workdir, "dem.f32"), np.float32, shape)
+            has_nan = False
+            for r0, r1, c0, c1 in windows:
+                block = src.read(1, window=Window(c0, r0, c1 - c0, r1 - r0))
+                has_nan |= bool(np.isnan(block).any())
+                dem[r0:r1, c0:c1] = block
+        os.remove(mosaic)
+        percentile = lambda raster, q: blockwise_percentile(lambda: raster.blocks(side), q, cap=side * side)
+        if has_nan:
+            median = np.float32(percentile(dem, 50))
+            for r0, r1, c0, c1 in windows:
+                block = dem[r0:r1, c0:c1]
+                dem[r0:r1, c0:c1] = np.where(np.isnan(block), median, block)
+
+        # Pente sur un halo d'une cellule (différences centrées de np.gradient, décentrées aux bords de la zone)
+        h, w = shape
+        slope = DiskRaster(os.path.join(workdir, "slope.f32"), np.float32, shape)
+        for r0, r1, c0, c1 in windows:
+            R0, R1, C0, C1 = max(r0 - 1, 0), min(r1 + 1, h), max(c0 - 1, 0), min(c1 + 1, w)
+            gy, gx = np.gradient(dem[R0:R1, C0:C1])
+            slope[r0:r1, c0:c1] = np.sqrt(gx**2 + gy**2)[r0 - R0:r1 - R0, c0 - C0:c1 - C0]
+        acc, _ = windowed_d8(lambda r0, r1, c0, c1: dem[r0:r1, c0:c1], shape, memory_mb, condition=True, workdir=workdir)
+
+        extent = {name: (min(float(b.min()) for b in raster.blocks(side)), max(float(b.max()) for b in raster.blocks(side)))
+                  for name, raster in (("dem", dem), ("slope", slope), ("acc", acc))}
+        low_level, floor_level = percentile(dem, 15), percentile(dem, 5)
+        high_acc, top_acc = percentile(acc, 90), percentile(acc, 95)
+        images = {name: np.empty(shape, dtype=np.uint8) for name in ("Elevation", "Slope", "FlowAccumulation")}
+        risk_mask = np.empty(shape, dtype=bool)
+        sums = {"dem": 0.0, "slope": 0.0}
+        high_acc_at_risk = low_at_risk = False
+        for r0, r1, c0, c1 in windows:
+            z, s, a = dem[r0:r1, c0:c1], slope[r0:r1, c0:c1], acc[r0:r1, c0:c1]
+            risk = ((z <= low_level) & (s <= 0.02)) | (a >= high_acc)
+            risk_mask[r0:r1, c0:c1] = risk
+            high_acc_at_risk |= bool(np.any((a >= top_acc) & risk))
+            low_at_risk |= bool(np.any((z <= floor_level) & risk))
+            sums["dem"] += float(z.sum(dtype=np.float64))
+            sums["slope"] += float(s.sum(dtype=np.float64))
+            for name, key, values in (("Elevation", "dem", z), ("Slope", "slope", s), ("FlowAccumulation", "acc", a)):
+                images[name][r0:r1, c0:c1] = palette_indices(values, *extent[key])
+
+    n = h * w
+    risk_cells = int(np.count_nonzero(risk_mask))
+    risk_percent = float(100.0 * risk_cells / n)
+    stats = {
+        "DEM_shape": shape,
+        "Elevation_min": extent["dem"][0],
+        "Elevation_max": extent["dem"][1],
+        "Elevation_mean": sums["dem"] / n,
+        "Slope_mean": sums["slope"] / n,
+        "Risk_zone_percent": risk_percent
+    }
+    actions = mitigation_actions(risk_percent, sums["slope"] / n, high_acc_at_risk, low_at_risk)
+    # palette_indices d'un masque : 0 / 255, ou 0 partout si le masque est uniforme (sans tableau flottant)
+    images["Risk"] = risk_mask.view(np.uint8) * np.uint8(255 if 0 < risk_cells < n else 0)
+    return stats, actions, images, risk_mask, transform
+
+def estimate_surface_water_ingress(location_input, buffer_deg=0.01, describe_location=True,
+                                   memory_mb=WATER_MEMORY_TARGET_MB):
     if isinstance(location_input, str):
         lat, lon = geocode_city(location_input)
     elif isinstance(location_input, (tuple, list)) and len(location_input) == 2:
         lat, lon = location_input
     else:
         raise ValueError("Input invalide. Utiliser un nom de ville ou un tuple (lat, lon).")
-    location_info = reverse_geocode(lat, lon)
+    # Géocodage inversé limité à 1 req/s : désactivable pour les traitements par lots
+    location_info = reverse_geocode(lat, lon) if describe_location else None
 
-    dem_file = download_dem_opentopo(lat, lon, buffer_deg=0.01)
-    try:
-        with rasterio.open(dem_file) as src:
-            dem = src.read(1).astype(np.float32)
-            if src.nodata is not None:
-                dem[dem == src.nodata] = np.nan
-            dem[np.isnan(dem)] = np.nanmedian(dem)
-            transform = src.transform
-
-        gy, gx = np.gradient(dem)
-        slope = np.sqrt(gx**2 + gy**2)
-        acc, _ = d8_flow_direction_and_accum(dem)
-
-        low_mask = dem <= np.nanpercentile(dem, 15)
-        flat_mask = slope <= 0.02
-        highacc = acc >= np.percentile(acc, 90)
-        risk_mask = (low_mask & flat_mask) | highacc
-
-        stats = {
-            "DEM_shape": dem.shape,
-            "Elevation_min": float(np.nanmin(dem)),
-            "Elevation_max": float(np.nanmax(dem)),
-            "Elevation_mean": float(np.nanmean(dem)),
-            "Slope_mean": float(np.nanmean(slope)),
-            "Risk_zone_percent": float(100.0 * np.sum(risk_mask) / risk_mask.size)
-        }
+    bounds = (lon - buffer_deg, lat - buffer_deg, lon + buffer_deg, lat + buffer_deg)
+    if max(dem_window_shape(*bounds)) <= window_side(memory_mb):
+        stats, actions, images, risk_mask, transform = _analyse_in_memory(lat, lon, buffer_deg)
+    else:
+        # Grande zone : DEM lu par fenêtres dans une mosaïque sur disque, statistiques en flux,
+        # mémoire de travail bornée par memory_mb
+        stats, actions, images, risk_mask, transform = _analyse_windowed(bounds, memory_mb)
 
-        actions = mitigation_rules(dem, slope, acc, risk_mask)
+    # Cartes nommées d'après la zone analysée (une requête ne remplace pas celles d'une autre)
+    area = {"lat": round(lat, 5), "lon": round(lon, 5), "buffer_deg": buffer_deg}
+    maps = {
+        "Elevation": artifact_id("map_elevation", area, "png"),
+        "Slope": artifact_id("map_slope", area, "png"),
+        "FlowAccumulation": artifact_id("map_flowacc", area, "png"),
+        "Risk": artifact_id("map_risk", area, "png"),
+        "Risk_Folium": artifact_id("map_risk_folium", area),
+    }
 
-        # Cartes Matplotlib
-        plt.imsave("map_elevation.png", dem, cmap="terrain")
-        plt.imsave("map_slope.png", slope, cmap="inferno")
-        plt.imsave("map_flowacc.png", acc, cmap="Blues")
-        plt.imsave("map_risk.png", risk_mask.astype(float), cmap="Reds")
+    # Cartes rendues seulement si elles sont consultées (voir artifacts.ARTIFACT_RENDER) ;
+    # les rendus en attente ne retiennent que des indices de palette uint8 et un masque compacté, pas les rasters
+    # Cartes Matplotlib
+    _defer_image(maps["Elevation"], images["Elevation"], "terrain")
+    _defer_image(maps["Slope"], images["Slope"], "inferno")
+    _defer_image(maps["FlowAccumulation"], images["FlowAccumulation"], "Blues")
+    _defer_image(maps["Risk"], images["Risk"], "Reds")
 
-        # Carte Folium
-        risk_coords = np.argwhere(risk_mask)
+    # Carte Folium : zones à risque en une seule image superposée
+    mask_bits, mask_shape = np.packbits(risk_mask), risk_mask.shape
+    def render_risk_map(path):
+        mask = np.unpackbits(mask_bits, count=mask_shape[0] * mask_shape[1]).reshape(mask_shape).astype(bool)
         folium_map = folium.Map(location=[lat, lon], zoom_start=14)
-        for y, x in risk_coords:
-            try:
-                rlon, rlat = rasterio.transform.xy(transform, y, x)
-                folium.CircleMarker(location=[rlat, rlon], radius=2, color='red', fill=True, fill_opacity=0.7).add_to(folium_map)
-            except Exception:
-                continue
-        folium_map.save("map_risk_folium.html")
+        add_mask_overlay(folium_map, mask, transform, name="Zones à risque")
+        folium_map.save(path)
+    defer_artifact(maps["Risk_Folium"], render_risk_map, nbytes=mask_bits.nbytes)
+
+    return {
+        "Ingress_paths_estimate": "L’eau suit les lignes d’écoulement (D8) vers les points bas.",
+        "Mitigation_actions": actions,
+        **stats,
+        "Maps": maps,
+        "Explanation": (
+            "📊 Comment lire les cartes :\n"
+            "1. Carte d’altitude : relief (zones sombres = basses).\n"
+            "2. Carte de pente : pentes fortes = écoulement rapide.\n"
+            "3. Carte de flux : chemins probables de l’eau.\n"
+            "4. Carte de risque : zones rouges = accumulation probable."
+        ),
+        "Location": location_info
+    }
+
+# ---------- Criblage par lots ----------
+SCREENING_FIELDS = ["DEM_shape", "Elevation_min", "Elevation_max", "Elevation_mean", "Slope_mean", "Risk_zone_percent"]
+
+def site_dir_name(index, site):
+    """Répertoire de sortie d'un site : rang dans la liste (unicité) et nom lisible."""
+    name = re.sub(r"[^\w\-]+", "_", str(site)).strip("_").lower()
+    return f"{index:04d}_{name[:60]}"
+
+def _screen_chunk(sites, buffer_deg, out_dir):
+    # Exécuté dans un processus du pool : sites partageant les mêmes tuiles DEM, traités à la suite ;
+    # avec out_dir, cartes rendues dans un répertoire par site
+    rows = []
+    for index, site, lat, lon in sites:
+        row = {"site": site, "lat": lat, "lon": lon}
+        try:
+            if out_dir:
+                with artifact_output(os.path.join(out_dir, site_dir_name(index, site))) as site_dir:
+                    result = estimate_surface_water_ingress((lat, lon), buffer_deg=buffer_deg, describe_location=False)
+                row["output_dir"] = site_dir
+            else:
+                result = estimate_surface_water_ingress((lat, lon), buffer_deg=buffer_deg, describe_location=False)
+            row.update({field: result.get(field) for field in SCREENING_FIELDS})
+        except Exception as e:
+            row["error"] = str(e)
+        rows.append((index, row))
+    return rows
+
+def screen_sites(sites, workers=4, buffer_deg=0.01, out_dir=None, chunk_size=None):
+    """
+    Analyse de risque pour une liste de sites (noms ou tuples (lat, lon)), en parallèle dans un pool de processus.
+    Les sites sont regroupés par tuiles DEM communes, tuiles téléchargées une seule fois avant le calcul ; les grands
+    groupes sont découpés en lots de `chunk_size` sites (par défaut ~4 lots par processus) répartis sur le pool.
+    Avec `out_dir`, les cartes de chaque site sont rendues dans out_dir/<rang>_<site> (colonne output_dir) ;
+    sinon pas de cartes (rendu paresseux, les rendus en attente resteraient dans les processus du pool).
+    Retourne un DataFrame dans l'ordre des sites : site, lat, lon, statistiques, Risk_zone_percent, error.
+    """
+    # Géocodage dans le processus principal (cache et limite de débit Nominatim partagés)
+    resolved, rows = [], []
+    for index, site in enumerate(sites):
+        try:
+            lat, lon = geocode_city(site) if isinstance(site, str) else site
+            resolved.append((index, str(site), float(lat), float(lon)))
+        except Exception as e:
+            rows.append((index, {"site": str(site), "error": str(e)}))
+
+    groups = {}
+    for index, site, lat, lon in resolved:
+        tiles = tuple(tiles_for_window(lon - buffer_deg, lat - buffer_deg, lon + buffer_deg, lat + buffer_deg))
+        groups.setdefault(tiles, []).append((index, site, lat, lon))
+    for tile in sorted({t for tiles in groups for t in tiles}):
+        try:
+            get_tile(*tile)
+        except Exception:
+            pass  # l'erreur sera remontée site par site
+
+    # Lots pris dans un seul groupe : un groupe de 200 sites sur la même tuile occupe tout le pool, pas un processus
+    chunk_size = chunk_size or max(1, math.ceil(len(resolved) / (4 * max(1, workers))))
+    chunks = [group[i:i + chunk_size] for group in groups.values() for i in range(0, len(group), chunk_size)]
+    if workers <= 1:
+        for chunk in chunks:
+            rows += _screen_chunk(chunk, buffer_deg, out_dir)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for chunk_rows in pool.map(_screen_chunk, chunks, [buffer_deg] * len(chunks), [out_dir] * len(chunks)):
+                rows += chunk_rows
+    return pd.DataFrame([row for _, row in sorted(rows, key=lambda r: r[0])])
 
-        return {
-            "Ingress_paths_estimate": "L’eau suit les lignes d’écoulement (D8) vers les points bas.",
-            "Mitigation_actions": actions,
-            **stats,
-            "Maps": {
-                "Elevation": "map_elevation.png",
-                "Slope": "map_slope.png",
-                "FlowAccumulation": "map_flowacc.png",
-                "Risk": "map_risk.png",
-                "Risk_Folium": "map_risk_folium.html"
-            },
-            "Explanation": (
-                "📊 Comment lire les cartes :\n"
-                "1. Carte d’altitude : relief (zones sombres = basses).\n"
-                "2. Carte de pente : pentes fortes = écoulement rapide.\n"
-                "3. Carte de flux : chemins probables de l’eau.\n"
-                "4. Carte de risque : zones rouges = accumulation probable."
-            ),
-            "Location": location_info
-        }
-    finally:
-        if os.path.exists(dem_file):
-            os.remove(dem_file)
 # ---------- Tool LangChain ----------
 @tool
 def estimate_surface_water_ingress_tool(location_input: str) -> dict:
@@ -236,7 +969,7 @@ def estimate_surface_water_ingress_tool(location_input: str) -> dict:
 
     Processus effectué :
     - Géocodage (nom de ville -> lat/lon) si nécessaire.
-    - Téléchargement du DEM via OpenTopography.
+    - Lecture du DEM (tuiles OpenTopography mises en cache localement).
     - Calcul de la pente et de l’accumulation de flux D8.
     - Identification des zones à risque selon faible élévation, faible pente, accumulation élevée.
     - Génération des cartes Matplotlib et Folium.
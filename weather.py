@@ -1,6 +1,20 @@
 import requests
 from typing import Optional
 from langchain.tools import tool
+from tools_geocode import nominatim_search, anominatim_search
+from async_http import get_async_client
+
+WEATHER_URL = "https://api.open-meteo.com/v1/forecast"
+
+def _weather_params(lat, lon):
+    return {
+        "latitude": lat,
+        "longitude": lon,
+        # httpx sérialise les booléens en "true"/"false" ; Open-Meteo attend "true"
+        "current_weather": "true",
+        "daily": ["temperature_2m_max", "temperature_2m_min", "precipitation_sum"],
+        "timezone": "auto"
+    }
 
 @tool
 def weather_tool(city_name: str, forecast_days: Optional[int] = 5) -> str:
@@ -10,10 +24,7 @@ def weather_tool(city_name: str, forecast_days: Optional[int] = 5) -> str:
     :param forecast_days: Nombre de jours de prévisions à afficher (par défaut 5)
     """
     # --- Géocodage via Nominatim ---
-    geo_url = "https://nominatim.openstreetmap.org/search"
-    geo_params = {"q": city_name, "format": "json", "limit": 1}
-    geo_resp = requests.get(geo_url, params=geo_params, headers={"User-Agent": "weather-app"})
-    geo_data = geo_resp.json()
+    geo_data = nominatim_search(city_name)
     
     if not geo_data:
         return f"❌ Ville '{city_name}' introuvable."
@@ -21,19 +32,28 @@ def weather_tool(city_name: str, forecast_days: Optional[int] = 5) -> str:
     lat, lon = float(geo_data[0]["lat"]), float(geo_data[0]["lon"])
 
     # --- Appel API Open-Meteo ---
-    weather_url = "https://api.open-meteo.com/v1/forecast"
-    weather_params = {
-        "latitude": lat,
-        "longitude": lon,
-        "current_weather": True,
-        "daily": ["temperature_2m_max", "temperature_2m_min", "precipitation_sum"],
-        "timezone": "auto"
-    }
-    weather_resp = requests.get(weather_url, params=weather_params)
+    weather_resp = requests.get(WEATHER_URL, params=_weather_params(lat, lon))
     if weather_resp.status_code != 200:
         return "❌ Impossible de récupérer la météo."
 
-    weather_data = weather_resp.json()
+    return _format_weather(city_name, forecast_days, weather_resp.json())
+
+
+async def aweather_tool(city_name: str, forecast_days: Optional[int] = 5) -> str:
+    """Implémentation async de weather_tool (utilisée via ainvoke)."""
+    geo_data = await anominatim_search(city_name)
+    if not geo_data:
+        return f"❌ Ville '{city_name}' introuvable."
+
+    lat, lon = float(geo_data[0]["lat"]), float(geo_data[0]["lon"])
+    weather_resp = await get_async_client().get(WEATHER_URL, params=_weather_params(lat, lon))
+    if weather_resp.status_code != 200:
+        return "❌ Impossible de récupérer la météo."
+
+    return _format_weather(city_name, forecast_days, weather_resp.json())
+
+
+def _format_weather(city_name, forecast_days, weather_data):
     current = weather_data.get("current_weather", {})
     daily = weather_data.get("daily", {})
 